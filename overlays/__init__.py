@@ -2,19 +2,100 @@
 Author: RedFantom
 License: GNU GPLv3
 Copyright (c) 2018 RedFantom
+
+The backends and other parts of the package are only imported when
+they are first accessed, so that importing the package does not import
+tkinter, PIL, numpy, gi or pywin32.
+
+overlays.Overlay is the Overlay class of the selected backend: the one
+named by the OVERLAYS_BACKEND environment variable, or else the first
+available of Windows, Gtk and Tkinter. Use get_backend() to select a
+backend explicitly, such as the "headless" backend that renders into
+NumPy arrays without a display.
 """
-from ._overlay import Overlay
-from ._tkinter import TkinterOverlay
-
-OVERLAYS = [
-    ("overlays._windows", "WindowsOverlay"),
-    ("overlays._gtk", "GtkOverlay")
-]
-
-for overlay in OVERLAYS:
-    try:
-        exec("from {} import {} as Overlay".format(*overlay))
-    except ImportError as e:
-        continue
-if "Overlay" not in locals():
+# Standard Library
+from importlib import import_module
+import os
+
+
+BACKENDS = {
+    "windows": ("._windows", "WindowsOverlay"),
+    "gtk": ("._gtk", "GtkOverlay"),
+    "tkinter": ("._tkinter", "TkinterOverlay"),
+    "headless": ("._headless", "HeadlessOverlay"),
+}
+PREFERENCE = ("windows", "gtk", "tkinter")
+ENVIRONMENT_VARIABLE = "OVERLAYS_BACKEND"
+
+EXPORTS = {
+    "AsyncOverlay": "._async",
+    "IMAGE_CACHE": "._imaging",
+    "OverlayManager": "._manager",
+    "Style": "._style",
+    "preload": "._imaging",
+    "Recorder": ".replay",
+}
+EXPORTS.update({cls: module for module, cls in BACKENDS.values()})
+
+_PROBED = dict()  # Backend name: Overlay class or the ImportError raised
+
+
+def get_backend(name: str = None) -> type:
+    """
+    Return the Overlay class of a backend
+
+    :param name: Name of the backend ("windows", "gtk", "tkinter" or
+        "headless").
+        If None, the backend named by the OVERLAYS_BACKEND environment
+        variable is used, or else the first available backend.
+    :raises ImportError: If the backend (or no backend) is available
+    """
+    if name is None:
+        name = os.environ.get(ENVIRONMENT_VARIABLE)
+    if name is not None:
+        result = _probe(name)
+        if isinstance(result, ImportError):
+            raise result
+        return result
+    for name in PREFERENCE:
+        result = _probe(name)
+        if not isinstance(result, ImportError):
+            return result
     raise ImportError("Could not import any Overlay implementation")
+
+
+def available_backends() -> list:
+    """Return the names of the backends that can be imported"""
+    return [name for name in BACKENDS if not isinstance(_probe(name), ImportError)]
+
+
+def _probe(name: str) -> (type, ImportError):
+    """Import a backend once and cache the result, successful or not"""
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend: {}".format(name))
+    if name not in _PROBED:
+        module, cls = BACKENDS[name]
+        try:
+            _PROBED[name] = getattr(import_module(module, __name__), cls)
+        except (ImportError, ValueError) as e:  # gi.require_version raises ValueError
+            _PROBED[name] = e if isinstance(e, ImportError) else ImportError(str(e))
+    return _PROBED[name]
+
+
+def __getattr__(name: str):
+    """Import the attributes of the package on first access"""
+    if name == "Overlay":
+        try:
+            value = get_backend()
+        except ImportError as error:  # hasattr() and getattr() with a default only catch AttributeError
+            raise AttributeError(str(error)) from error
+    elif name in EXPORTS:
+        value = getattr(import_module(EXPORTS[name], __name__), name)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(EXPORTS) | {"Overlay"})
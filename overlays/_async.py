@@ -0,0 +1,130 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides an asyncio facade for the Overlays
+"""
+# Standard Library
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+# Project Modules
+from ._overlay import Overlay
+from ._style import Style
+
+
+class AsyncOverlay(object):
+    """
+    asyncio facade for an Overlay
+
+    Label changes are written into the LabelStore of the Overlay from
+    the event loop thread without waiting for the GUI thread, which is
+    woken up without blocking (GLib main context, a pipe for Tkinter or
+    an event for Windows). The coroutines complete once the frame that
+    contains the change has been drawn, which the GUI thread signals
+    with loop.call_soon_threadsafe. No polling threads are involved.
+
+    Batches are tracked per task, so concurrent tasks may use separate
+    batches on the same Overlay.
+
+    :param overlay: Overlay to control, running in its own thread or
+        hosted by an OverlayManager
+    """
+
+    def __init__(self, overlay: Overlay):
+        """Wrap an existing Overlay"""
+        self.overlay = overlay
+        self._batch = ContextVar("batch", default=None)
+
+    async def add_label(
+            self, row: int, text: str, image: str = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None,
+            ttl: float = None, flash: float = None, fade: float = None) -> str:
+        """Create a new label and wait until it has been drawn"""
+        return await self._call(self.overlay.add_label, row, text, image, color, font, style, ttl, flash, fade)
+
+    async def remove_label(self, ident: str) -> None:
+        """Remove a label and wait until it has been removed from the window"""
+        await self._call(self.overlay.remove_label, ident)
+
+    async def update_label(
+            self, ident: str, text: str = None, image: str = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None) -> None:
+        """Change a label in place and wait until it has been drawn"""
+        await self._call(self.overlay.update_label, ident, text, image, color, font, style)
+
+    async def set_labels(self, labels: dict) -> list:
+        """Replace all labels and wait until they have been drawn"""
+        return await self._call(self.overlay.set_labels, labels)
+
+    @asynccontextmanager
+    async def batch(self):
+        """
+        Queue the label changes made in this task in a transaction
+
+        The changes are committed at once when the block exits, after
+        which the block waits until they have been drawn. Exceptions
+        discard the changes.
+        """
+        if self._changes() is not None:
+            yield
+            return
+        changes, timers = list(), dict()
+        token = self._batch.set((asyncio.current_task(), changes, timers))
+        try:
+            yield
+        finally:
+            self._batch.reset(token)
+        await self._commit(changes, timers)
+
+    def drawn(self) -> asyncio.Future:
+        """Return a Future that completes after the next frame has been drawn"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            """Called in the GUI thread after the frame"""
+            loop.call_soon_threadsafe(self._resolve, future)
+
+        self.overlay._scheduler.after_frame(resolve)
+        self.overlay._invalidate()
+        return future
+
+    @property
+    def rectangle(self) -> tuple:
+        return self.overlay.rectangle
+
+    def destroy(self):
+        self.overlay.destroy()
+
+    async def _call(self, method: callable, *args):
+        """Call a label method of the Overlay, queueing its changes"""
+        batch = self._changes()
+        if batch is not None:
+            with self.overlay._collect(*batch):
+                return method(*args)
+        result = method(*args)
+        await self.drawn()
+        return result
+
+    async def _commit(self, changes: list, timers: dict):
+        """Commit changes and timers to the Overlay and wait until they are drawn"""
+        if len(changes) == 0:
+            return
+        self.overlay._labels.commit(changes)
+        self.overlay._start(timers)
+        await self.drawn()
+
+    def _changes(self) -> (tuple, None):
+        """Return the changes and timers of the batch of the current task"""
+        batch = self._batch.get()
+        # Tasks created within a batch inherit the context, not the batch
+        if batch is None or batch[0] is not asyncio.current_task():
+            return None
+        return batch[1:]
+
+    @staticmethod
+    def _resolve(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
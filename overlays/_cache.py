@@ -0,0 +1,109 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides a thread-safe LRU cache with a size budget that is used for
+the resources (images, fonts) that the Overlay backends create.
+"""
+# Standard Library
+from collections import OrderedDict
+from threading import RLock
+
+
+class LRUCache(object):
+    """
+    Least-recently-used cache bounded by the total size of its values
+
+    Every value is stored with a size (bytes, or 1 to count entries).
+    When the total exceeds the budget, the least recently used values
+    are evicted and passed to the release callback, if given, so that
+    native resources can be freed.
+
+    :param budget: Maximum total size of the values in the cache
+    :param release: Callable called with every value that is removed
+    """
+
+    def __init__(self, budget: int, release: callable = None):
+        """Initialize the empty cache"""
+        self._values = OrderedDict()
+        self._budget = budget
+        self._release = release
+        self._lock = RLock()
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return a value and mark it as most recently used"""
+        with self._lock:
+            if key not in self._values:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._values.move_to_end(key)
+            return self._values[key][0]
+
+    def put(self, key, value, size: int = 1):
+        """Insert a value and evict values until within budget"""
+        with self._lock:
+            if key in self._values:
+                self._discard(key)
+            self._values[key] = (value, size)
+            self.size += size
+            self._evict()
+
+    def get_or_create(self, key, factory: callable, sizeof: callable = None):
+        """Return a cached value, creating it with factory() on a miss"""
+        value = self.get(key, self)
+        if value is not self:
+            return value
+        value = factory()  # Outside of the lock so factories may run in parallel
+        self.put(key, value, sizeof(value) if sizeof is not None else 1)
+        return value
+
+    def clear(self):
+        """Remove and release all values"""
+        with self._lock:
+            for key in list(self._values):
+                self._discard(key)
+
+    @property
+    def budget(self) -> int:
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget: int):
+        """Change the budget, evicting values if required"""
+        with self._lock:
+            self._budget = budget
+            self._evict()
+
+    @property
+    def stats(self) -> dict:
+        """Return a snapshot of the counters of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._values), "size": self.size, "budget": self._budget,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0}
+
+    def _evict(self):
+        """Evict least recently used values until within budget"""
+        # The most recently used value is kept, as it may still be in use
+        while self.size > self._budget and len(self._values) > 1:
+            self._discard(next(iter(self._values)))
+            self.evictions += 1
+
+    def _discard(self, key):
+        """Remove a value from the cache and release it"""
+        value, size = self._values.pop(key)
+        self.size -= size
+        if self._release is not None:
+            self._release(value)
+
+    def __contains__(self, key) -> bool:
+        return key in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,36 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides a bounded cache of the native font objects of a backend
+"""
+# Project Modules
+from ._cache import LRUCache
+from ._overlay import Overlay
+
+
+class FontCache(LRUCache):
+    """
+    Cache of native font objects keyed by normalized font
+
+    Each backend owns a FontCache that builds its native font objects
+    (HFONT, Pango.FontDescription, tkinter Font) only once for every
+    font key. Font objects are released when evicted or when the cache
+    is cleared upon destruction of the Overlay.
+
+    :param build: Callable building a native font from the font key
+        (family, size, bold, italic, dpi_scale)
+    :param release: Callable releasing a native font
+    :param capacity: Maximum number of native fonts to keep
+    """
+
+    def __init__(self, build: callable, release: callable = None, capacity: int = 32):
+        """Initialize the cache for a backend"""
+        LRUCache.__init__(self, capacity, release)
+        self._build = build
+
+    def font(self, font: (dict, tuple), dpi_scale: float = 1.0):
+        """Return the native font object for a font"""
+        key = Overlay._font_key(font, dpi_scale)
+        return self.get_or_create(key, lambda: self._build(*key))
@@ -6,52 +6,94 @@ Copyright (c) 2018 RedFantom
 Gtk-based overlay that provides a transparent, decoration-less (on most
 window managers) and topmost (on most window managers) window that can
 show labels (each occupying a single row) with images.
+
+In the "widgets" mode every row is a Gtk.HBox with a Gtk.Label and a
+Gtk.Image. In the "cairo" mode there are no child widgets: the text of
+the rows is rendered once with PangoCairo into cached sprites, which
+are painted onto the window surface, and only the rows that changed
+are redrawn.
 """
 # Standard Library
-import os
-from threading import Thread
+import math
+from threading import Lock, Thread
+import time
 # Packages
 import cairo
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk  # python3-gi
+gi.require_version("GdkPixbuf", "2.0")
+gi.require_version("Pango", "1.0")
+gi.require_version("PangoCairo", "1.0")
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib, Pango, PangoCairo  # python3-gi
+from PIL import Image
 # Project Modules
-from ._overlay import Overlay
+from ._fonts import FontCache
+from ._imaging import IMAGE_CACHE
+from ._layout import RowLayout
+from ._overlay import Label, Overlay, Row
+from ._pool import RowPool
+from ._sprites import SPRITE_CACHE
 
 
 class GtkOverlay(Gtk.Window, Thread, Overlay):
     """
     Gtk.Window that represents the actual Overlay and draws the text
 
-    Thread that runs Gtk.main to show the Gtk.Window
+    Thread that runs Gtk.main to show the Gtk.Window, unless the
+    Overlay is hosted by an OverlayManager that runs Gtk.main
 
-    Implements the Overlay interface
+    Implements the Overlay interface. In widgets mode, the widgets of
+    removed rows are kept in a pool of POOL_SIZE rows, to be reused by
+    rows added later.
     """
 
     DEFAULT_COLOR = (0, 0, 0)
     DEFAULT_FONT = ("normal", 11, False, False)
+    MODES = ("widgets", "cairo")
+    POOL_SIZE = 16
 
     _INSTANCES = list()
     _GTK_MAIN = None
 
-    def __init__(self, position: tuple, size: tuple, name: str):
-        """Initialize window and attributes"""
+    def __init__(self, position: tuple, size: tuple, name: str, loop: object = None, mode: str = "widgets"):
+        """
+        Initialize window and attributes
+
+        :param loop: Loop of the OverlayManager hosting the Overlay
+        :param mode: "widgets" to build a widget per row or "cairo" to
+            draw all rows on the window surface
+        """
+        if mode not in self.MODES:
+            raise ValueError("Unknown mode: {}".format(mode))
         Gtk.Window.__init__(self)
         Thread.__init__(self)
+        Overlay.__init__(self, position, size, name)
 
         self._position = position
         self._size = size
         self._name = name
+        self._loop = loop
+        self._mode = mode
 
         self.move(*position)
         self.set_border_width(0)
 
-        # Initialize Label
-        self._labels = dict()
-        self._vbox = Gtk.VBox()
-        self.add(self._vbox)
+        # Initialize Label widgets
+        self._rows = dict()  # Row number: Row owning an HBox, or with a text sprite and image surface
+        self._pool = RowPool(self.POOL_SIZE)
+        self._sprites = SPRITE_CACHE
+        self._layout = RowLayout()
+        self._fonts = FontCache(self._build_font)
+        self._pending = None  # (due time, source id) of the scheduled tick
+        self._paint_start = None
+        self._schedule_lock = Lock()
+        self._vbox = None
+        if mode == "widgets":
+            self._vbox = Gtk.VBox()
+            self.add(self._vbox)
         self._init_window()
-        self.start()
+        if loop is None:
+            self.start()
 
     def _init_window(self):
         """Initialize Window attributes"""
@@ -63,51 +105,175 @@ class GtkOverlay(Gtk.Window, Thread, Overlay):
         # Initialize other attributes
         self.set_app_paintable(True)
         self.set_resizable(False)
+        self.connect("draw", self._paint_started)
         self.connect("draw", self._redraw)
-        self.connect("destroy", Gtk.main_quit)
+        self.connect_after("draw", self._paint_finished)
+        if self._loop is None:
+            self.connect("destroy", Gtk.main_quit)
         self.set_keep_above(True)
         self.set_decorated(False)
         self.show_all()
 
-    def add_label(
-            self, row: int, text: str, image: str = None,
-            color: tuple = DEFAULT_COLOR, font: (dict, tuple) = DEFAULT_FONT) -> (str, None):
-        """Create a new Label for the specified row"""
-        hbox = Gtk.HBox()
+    def _apply(self, changed: dict, removed: set):
+        """Create or change the widgets of the changed rows and relayout once"""
+        if self._mode == "cairo":
+            self._apply_sprites(changed, removed)
+            return
+        for row in removed:
+            self._destroy_row(row)
+        created = [row for row in sorted(changed) if row not in self._rows]
+        for row in created:
+            self._create_row(changed[row])
+        for row, label in changed.items():
+            if row not in created:
+                self._change_row(label)
+        if len(created) == 0:
+            return
+        order = sorted(self._rows)
+        for row in created:
+            self._vbox.reorder_child(self._rows[row].widget, order.index(row))
+        self.show_all()
 
+    def _create_row(self, label: Label):
+        """Create the widgets for a new row, or reuse those of a removed row"""
+        row = self._pool.get()
+        if row is not None:
+            self._vbox.add(row.widget)
+            self._rows[label.row] = row
+            self._change_row(label)
+            return
+        hbox = Gtk.HBox()
+        image = self._build_image(label.image)
         if image is not None:
-            if not os.path.exists(image):
-                raise FileNotFoundError("Image file does not exist")
-            image = Gtk.Image.new_from_file(image)
             hbox.add(image)
+        widget = Gtk.Label(label=label.text)
+        widget.set_attributes(self._attributes(label.color, label.font))
+        widget.set_justify(Gtk.Justification.LEFT)
+        hbox.add(widget)
+        self._vbox.add(hbox)
+        row = self._rows[label.row] = Row(label, widget, image)
+        row.widget = row.own(hbox, self._release_box)
 
-        label = Gtk.Label()
-        label.set_use_markup(True)
-        label.set_markup(self._format_text(text, color, font))
-        label.set_justify(Gtk.Justification.LEFT)
-        hbox.add(label)
+    def _change_row(self, label: Label):
+        """Change only the properties of the widgets of a row that changed"""
+        row = self._rows[label.row]
+        fields = label.changed(row.label)
+        if "text" in fields:
+            row.text.set_text(label.text)
+        if "color" in fields or "font" in fields:
+            row.text.set_attributes(self._attributes(label.color, label.font))
+        if "image" in fields:
+            if row.image is not None:
+                row.widget.remove(row.image)
+                row.image.destroy()
+            row.image = self._build_image(label.image)
+            if row.image is not None:
+                row.widget.add(row.image)
+                row.widget.reorder_child(row.image, 0)
+                row.image.show()
+        row.label = label
 
-        self._vbox.add(hbox)
-        self._vbox.reorder_child(hbox, row)
-        self.show_all()
+    def _build_image(self, path: (str, None)) -> (Gtk.Image, None):
+        """Build a Gtk.Image from the cached GdkPixbuf of an image file"""
+        if path is None:
+            return None
+        return Gtk.Image.new_from_pixbuf(IMAGE_CACHE.load(path, "pixbuf", self._build_pixbuf))
+
+    def _apply_sprites(self, changed: dict, removed: set):
+        """Look up the sprites of the changed rows and damage them"""
+        for row in removed:
+            self._rows.pop(row, None)
+        for number, label in changed.items():
+            row = self._rows.get(number)
+            fields = label.changed(row.label) if row is not None else set(Label.FIELDS)
+            row = self._rows[number] = row if row is not None else Row(label)
+            row.label = label
+            if len(fields - {"image"}) > 0:
+                row.text = self._sprites.sprite(
+                    label.text, label.font, label.color, variant="surface", render=self._render_sprite)
+            if "image" in fields:
+                row.image = self._build_surface(label.image)
+        heights, width = dict(), 1
+        for number, row in self._rows.items():
+            w, h = row.text.get_width(), row.text.get_height()
+            if row.image is not None:
+                w, h = w + row.image.get_width(), max(h, row.image.get_height())
+            heights[number], width = h, max(width, w)
+        _, spans = self._layout.update(heights, set(changed))
+        height = max(self._layout.height, 1)
+        if (width, height) != tuple(self.get_size()):
+            self.resize(width, height)
+        width = max(width, self.get_allocated_width())
+        for top, h in spans:
+            self.queue_draw_area(0, top, width, h)
 
-        self._labels[row] = (label, image, hbox)
-        return str(row)
+    def _render_sprite(self, text: str, font: tuple, color: tuple) -> cairo.ImageSurface:
+        """Render text in a normalized font key into a cairo.ImageSurface with PangoCairo"""
+        layout = self.create_pango_layout(text)
+        layout.set_attributes(self._attributes(color, font[:4]))
+        w, h = layout.get_pixel_size()
+        sprite = cairo.ImageSurface(cairo.FORMAT_ARGB32, max(w, 1), max(h, 1))
+        PangoCairo.show_layout(cairo.Context(sprite), layout)
+        sprite.flush()
+        return sprite
 
-    def remove_label(self, ident: str) -> None:
-        """Remove a Label from the VBox"""
-        _, _, hbox = self._labels[ident]
-        self._vbox.remove(hbox)
-        hbox.do_destroy()  # Releases Child references
-        del self._labels[ident]
+    def _build_surface(self, path: (str, None)) -> (cairo.ImageSurface, None):
+        """Return the cached cairo.ImageSurface of an image file"""
+        if path is None:
+            return None
+        return IMAGE_CACHE.load(path, "surface", self._build_image_surface)
+
+    def _destroy_row(self, row: int):
+        """Remove the widgets of a row from the VBox and put them in the pool"""
+        if row not in self._rows:
+            return
+        row = self._rows.pop(row)
+        self._vbox.remove(row.widget)  # The Row keeps a reference, so the widgets are not destroyed
+        self._pool.put(row)
+
+    def _release_box(self, hbox: Gtk.HBox):
+        """Remove the HBox of a row from the VBox, if it is in it, and destroy it"""
+        if hbox.get_parent() is not None:
+            self._vbox.remove(hbox)
+        hbox.destroy()
+
+    def _invalidate(self):
+        """Request a frame and schedule it in the Gtk event loop"""
+        Overlay._invalidate(self)
+        self._schedule()
+
+    def _schedule(self):
+        """Schedule a tick of the FrameScheduler if a frame is required"""
+        with self._schedule_lock:
+            delay = self._scheduler.delay()
+            if delay is None:
+                return
+            due = self._scheduler.clock() + delay
+            if self._pending is not None:
+                if self._pending[0] <= due:
+                    return
+                GLib.source_remove(self._pending[1])  # Frame required before the deadline of a timer
+            self._pending = (due, GLib.timeout_add(int(math.ceil(delay * 1000)), self._tick))
+
+    def _tick(self) -> bool:
+        """Callback for GLib.timeout_add, which must return False"""
+        self._pending = None
+        self._scheduler.tick()
+        self._schedule()
+        return False
 
     def destroy(self):
         """Destroy the Overlay window and stop the Thread"""
+        rows, self._rows = self._rows, dict()
+        for row in rows.values():
+            row.release()
+        self._pool.clear()
+        self._fonts.clear()
         Gtk.Window.destroy(self)
 
     def update(self):
         """Update the state of the window"""
-        Gtk.Window.update(self)
+        self._flush()
 
     def start(self):
         """Check if it is safe to start the Thread before starting it"""
@@ -131,28 +297,69 @@ class GtkOverlay(Gtk.Window, Thread, Overlay):
     def rectangle(self):
         return (0, 0, 0, 0)
 
-    @staticmethod
-    def _redraw(_: Gtk.Widget, cr):
-        """Redraw this window with transparency"""
+    def _paint_started(self, *_) -> bool:
+        """Record the start of a paint if instrumented"""
+        if self._stats is not None:
+            self._paint_start = time.perf_counter()
+        return False
+
+    def _paint_finished(self, *_) -> bool:
+        """Record the duration of a paint, including children, if instrumented"""
+        if self._stats is not None and self._paint_start is not None:
+            self._stats.paint(time.perf_counter() - self._paint_start)
+        self._paint_start = None
+        return False
+
+    def _redraw(self, _: Gtk.Widget, cr):
+        """Redraw this window with transparency and, in cairo mode, the rows in the clip"""
         cr.set_source_rgba(0, 0, 0, 0)
         cr.set_operator(cairo.OPERATOR_SOURCE)
         cr.paint()
         cr.set_operator(cairo.OPERATOR_OVER)
+        if self._mode != "cairo":
+            return
+        _, top, _, bottom = cr.clip_extents()
+        for row, offset, _ in self._layout.rows(top, bottom):
+            row = self._rows[row]
+            x = 0
+            if row.image is not None:
+                cr.set_source_surface(row.image, 0, offset)
+                cr.paint()
+                x = row.image.get_width()
+            cr.set_source_surface(row.text, x, offset)
+            cr.paint()
 
     @staticmethod
-    def _format_text(text: str, color: tuple, font: (tuple, dict)) -> str:
-        """Format the text in a markup string for Gtk Label"""
-        font = GtkOverlay._process_font(font)
-        span = "<span face=\"{0}\" size=\"{1}\" weight=\"{2}\" style=\"{3}\" color=\"{4}\">". \
-            format(*font, Overlay._color_tuple_to_hex(color)) + "{}</span>"
-        return span.format(text)
+    def _build_pixbuf(image: Image.Image) -> GdkPixbuf.Pixbuf:
+        """Build a GdkPixbuf from a decoded image"""
+        w, h = image.size
+        data = GLib.Bytes.new(image.convert("RGBA").tobytes())
+        return GdkPixbuf.Pixbuf.new_from_bytes(data, GdkPixbuf.Colorspace.RGB, True, 8, w, h, w * 4)
+
+    @staticmethod
+    def _build_image_surface(image: Image.Image) -> cairo.ImageSurface:
+        """Build a premultiplied ARGB32 cairo.ImageSurface from a decoded image"""
+        w, h = image.size
+        stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, w)
+        # ARGB32 is native-endian, so BGRA in memory on little-endian machines
+        data = bytearray(image.convert("RGBA").tobytes("raw", "BGRa", stride))
+        return cairo.ImageSurface.create_for_data(data, cairo.FORMAT_ARGB32, w, h, stride)
+
+    def _attributes(self, color: tuple, font: (tuple, dict)) -> Pango.AttrList:
+        """Build the Pango attributes for the text of a Label"""
+        attributes = Pango.AttrList()
+        attributes.insert(Pango.attr_font_desc_new(self._fonts.font(font)))
+        attributes.insert(Pango.attr_foreground_new(*(c * 257 for c in color[:3])))
+        if len(color) == 4:  # Faded labels
+            attributes.insert(Pango.attr_foreground_alpha_new(color[3] * 257))
+        return attributes
 
     @staticmethod
-    def _process_font(font: (tuple, dict)) -> tuple:
-        """Process a font tuple or dictionary into a compatible tuple"""
-        if isinstance(font, dict):
-            font = Overlay._font_dict_to_tuple(font)
-        face, size, bold, italics = font
-        bold = "bold" if bold is True else "normal"
-        italics = "italic" if italics is True else "normal"
-        return face, size, bold, italics
+    def _build_font(family: str, size: int, bold: bool, italics: bool, _: float) -> Pango.FontDescription:
+        """Build a Pango.FontDescription from a normalized font key"""
+        description = Pango.FontDescription()
+        description.set_family(family)
+        description.set_size(size * Pango.SCALE)
+        description.set_weight(Pango.Weight.BOLD if bold else Pango.Weight.NORMAL)
+        description.set_style(Pango.Style.ITALIC if italics else Pango.Style.NORMAL)
+        return description
@@ -0,0 +1,139 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Headless Overlay that renders its labels into an RGBA NumPy frame
+buffer instead of a window, so that it works without a display. It is
+used to test and benchmark the package and as reference renderer.
+"""
+# Standard Library
+from threading import Lock
+# Packages
+import numpy as np
+# Project Modules
+from ._imaging import IMAGE_CACHE
+from ._layout import RowLayout
+from ._overlay import Label, Overlay, Row
+from ._sprites import SPRITE_CACHE, render_text
+
+
+def blend(destination: np.ndarray, source: np.ndarray):
+    """Composite straight-alpha RGBA pixels over others in place"""
+    alpha = source[..., 3:].astype(np.float32) / 255
+    below = destination[..., 3:].astype(np.float32) / 255 * (1 - alpha)
+    result = alpha + below
+    color = source[..., :3] * alpha + destination[..., :3] * below
+    np.divide(color, result, out=color, where=result > 0)
+    destination[..., :3] = np.rint(color)
+    destination[..., 3:] = np.rint(result * 255)
+
+
+class HeadlessOverlay(Overlay):
+    """
+    Overlay that draws its rows into an RGBA frame buffer
+
+    Rows are laid out as by the other backends: the image of a row,
+    followed by its text, rendered with PIL. Only the spans of the rows
+    that changed are drawn again in an update.
+
+    :param loop: Loop of the OverlayManager hosting the Overlay
+    :param diff: Whether to compute the mask of the pixels that changed
+        in every update, available as the diff attribute
+    """
+
+    DEFAULT_COLOR = (255, 255, 255)
+
+    def __init__(self, position: tuple, size: tuple, name: str, loop: object = None, diff: bool = False):
+        Overlay.__init__(self, position, size, name)
+        self._position, self._size = position, size
+        self._loop = loop
+        self._diff = diff
+        self._frame_buffer = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+        self._rows = dict()  # Row number: Row with the text sprite and image pixels
+        self._layout = RowLayout()
+        self._sprites = SPRITE_CACHE
+        self._lock = Lock()
+        self.damage = list()  # (top, height) spans drawn in the last update
+        self.diff = np.zeros(self._frame_buffer.shape[:2], dtype=bool) if diff else None
+
+    @property
+    def frame(self) -> np.ndarray:
+        """Read-only view of the frame buffer, which later updates change"""
+        view = self._frame_buffer.view()
+        view.flags.writeable = False
+        return view
+
+    def _apply(self, changed: dict, removed: set):
+        """Draw the spans of the rows that changed"""
+        with self._lock:
+            for row in removed:
+                self._rows.pop(row, None)
+            for row, label in changed.items():
+                self._rows[row] = self._prepare_row(label, self._rows.get(row))
+            heights = {
+                row: max(r.text.shape[0], r.image.shape[0] if r.image is not None else 0)
+                for row, r in self._rows.items()}
+            _, spans = self._layout.update(heights, set(changed))
+            previous = [self._frame_buffer[top:top + height].copy() for top, height in spans] if self._diff else None
+            for top, height in spans:
+                self._draw(top, height)
+            self.damage = spans
+            if self._diff:
+                self.diff[:] = False
+                for (top, height), pixels in zip(spans, previous):
+                    self.diff[top:top + height] = (self._frame_buffer[top:top + height] != pixels).any(axis=2)
+
+    def _prepare_row(self, label: Label, row: (Row, None)) -> Row:
+        """Look up the pixels of the text and image of a row, reusing those that did not change"""
+        fields = label.changed(row.label) if row is not None else set(Label.FIELDS)
+        row = row if row is not None else Row(label)
+        row.label = label
+        if len(fields - {"image"}) > 0:
+            row.text = self._sprites.sprite(
+                label.text, label.font, label.color, variant="RGBA", render=lambda *args: np.array(render_text(*args)))
+        if "image" in fields:
+            row.image = None
+            if label.image is not None:
+                row.image = IMAGE_CACHE.load(label.image, "RGBA", lambda decoded: np.array(decoded.convert("RGBA")))
+        return row
+
+    def _draw(self, top: int, height: int):
+        """Clear a span of the frame buffer and draw the rows overlapping it"""
+        bottom = min(top + height, self._frame_buffer.shape[0])
+        if top >= bottom:
+            return
+        self._frame_buffer[top:bottom] = 0
+        for row, y, _ in self._layout.rows(top, bottom):
+            row = self._rows[row]
+            x = 0
+            if row.image is not None:
+                self._blit(row.image, x, y, top, bottom)
+                x = row.image.shape[1]
+            self._blit(row.text, x, y, top, bottom)
+
+    def _blit(self, pixels: np.ndarray, x: int, y: int, top: int, bottom: int):
+        """Blend pixels into the frame buffer at (x, y), clipped to a span"""
+        y0, y1 = max(y, top), min(y + pixels.shape[0], bottom)
+        x1 = min(x + pixels.shape[1], self._frame_buffer.shape[1])
+        if y0 >= y1 or x >= x1:
+            return
+        blend(self._frame_buffer[y0:y1, x:x1], pixels[y0 - y:y1 - y, :x1 - x])
+
+    def _invalidate(self):
+        """Request a frame and wake up the loop of the OverlayManager"""
+        Overlay._invalidate(self)
+        if self._loop is not None:
+            self._loop.notify()
+
+    @property
+    def rectangle(self) -> tuple:
+        """Return the rectangle the Overlay would occupy"""
+        x, y = self._position
+        return x, y, x + self._size[0], y + self._size[1]
+
+    def destroy(self):
+        """Release the rows and clear the frame buffer"""
+        with self._lock:
+            self._rows.clear()
+            self._frame_buffer[:] = 0
@@ -0,0 +1,193 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Conversion of PIL images into the color-keyed pixel buffers that the
+Overlay backends can draw in a single call, and the cache of decoded
+images, which can be filled in parallel by preload().
+"""
+# Standard Library
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import os
+import sys
+from threading import Lock
+import time
+# Packages
+import numpy as np
+from PIL import Image
+# Project Modules
+from ._cache import LRUCache
+from ._stats import Histogram
+
+
+ORDERS = {
+    "RGB": [0, 1, 2],
+    "RGBA": [0, 1, 2, 3],
+    "BGR": [2, 1, 0],
+    "BGRA": [2, 1, 0, 3],
+}
+
+
+def to_bitmap(
+        image: Image.Image, color_key: tuple = (255, 255, 255), order: str = "BGRA", alpha: int = 1) -> np.ndarray:
+    """
+    Convert a PIL image into a color-keyed pixel buffer
+
+    Pixels with an alpha below the given alpha (by default, the fully
+    transparent pixels) are replaced by the color key with an alpha of
+    0, all other pixels are made opaque. The result is a
+    C-contiguous uint8 array of shape (height, width, len(order)) with
+    the channels in the given byte order.
+    """
+    if order not in ORDERS:
+        raise ValueError("Unsupported byte order: {}".format(order))
+    pixels = np.array(image.convert("RGBA"), dtype=np.uint8)
+    transparent = pixels[..., 3] < alpha
+    pixels[..., 3] = 255
+    pixels[transparent] = tuple(color_key) + (0,)
+    return np.ascontiguousarray(pixels[..., ORDERS[order]])
+
+
+def to_image(image: Image.Image, color_key: tuple) -> Image.Image:
+    """Return a color-keyed RGB copy of a PIL image"""
+    return Image.fromarray(to_bitmap(image, color_key, "RGB"), "RGB")
+
+
+def sizeof(value) -> int:
+    """Return the approximate memory size of a decoded image in bytes"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if hasattr(value, "get_byte_length"):  # GdkPixbuf.Pixbuf
+        return value.get_byte_length()
+    if hasattr(value, "get_stride"):  # cairo.ImageSurface
+        return value.get_stride() * value.get_height()
+    return sys.getsizeof(value)
+
+
+class ImageCache(LRUCache):
+    """
+    Process-wide cache of decoded and backend-converted images
+
+    Images are keyed by their absolute path, modification time and file
+    size, so that a changed file is decoded again. Every file is decoded
+    only once per size it is shrunk to, the backend-converted forms of the
+    file are stored as variants of the decoded image of that size. Cached
+    images are shared and must not be modified.
+    """
+
+    def load(self, path: str, variant: object = None, convert: callable = None, size: tuple = None):
+        """
+        Return the decoded image or its converted variant
+
+        :param path: Path to the image file
+        :param variant: Hashable identifier of the converted form
+        :param convert: Callable converting the decoded image into the
+            variant, called only on a cache miss
+        :param size: Maximum (width, height) to shrink the image to
+            when it is decoded, keeping its aspect ratio
+        """
+        stat = os.stat(path)
+        size = None if size is None else tuple(size)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, size)
+        image = self.get_or_create(key + (None,), lambda: self._decode(path, size), sizeof)
+        if variant is None:
+            return image
+        return self.get_or_create(key + (variant,), lambda: convert(image), sizeof)
+
+    @staticmethod
+    def _decode(path: str, size: tuple = None) -> Image.Image:
+        """Decode an image file completely so the file is closed"""
+        image = Image.open(path)
+        if size is not None:
+            image.draft(None, size)  # Decodes JPEG files at a reduced scale
+        image.load()
+        if size is not None:
+            image.thumbnail(size)
+        return image
+
+
+class Preload(object):
+    """
+    Images being decoded into the IMAGE_CACHE on a thread pool
+
+    PIL releases the GIL while decoding, so the images are decoded in
+    parallel with each other and with the GUI thread. The Future of an
+    image resolves to its path and may be passed to add_label as image,
+    which shows the row immediately and the image once it is decoded.
+
+    :param paths: Paths of the image files
+    :param size: Maximum (width, height) to shrink the images to
+    :param workers: Number of threads, by default chosen by the
+        ThreadPoolExecutor
+    """
+
+    def __init__(self, paths: list, size: tuple = None, workers: int = None):
+        self.latency = Histogram()  # Seconds from the start of the preload until an image is decoded
+        self.decode = Histogram()  # Seconds spent decoding an image
+        self.duration = None  # Seconds until all images were decoded
+        self.errors = 0
+        self._lock = Lock()
+        self._start = time.perf_counter()
+        paths = list(dict.fromkeys(paths))
+        self._remaining = len(paths)
+        if self._remaining == 0:
+            self.duration = 0.0
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="preload")
+        self.futures = {path: executor.submit(self._load, path, size) for path in paths}
+        executor.shutdown(wait=False)
+
+    def _load(self, path: str, size: tuple) -> str:
+        """Decode an image in a thread of the pool and return its path"""
+        start = time.perf_counter()
+        try:
+            IMAGE_CACHE.load(path, size=size)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.decode.add(end - start)
+                self.latency.add(end - self._start)
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self.duration = end - self._start
+        return path
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait until all images are decoded, returns whether they are"""
+        _, pending = wait(self.futures.values(), timeout)
+        return len(pending) == 0
+
+    def __getitem__(self, path: str) -> Future:
+        """Return the Future of the image with a path"""
+        return self.futures[path]
+
+    @property
+    def stats(self) -> dict:
+        """Return the number of images and errors, and the total and per-image timings"""
+        with self._lock:
+            return {
+                "images": len(self.futures), "errors": self.errors, "duration": self.duration,
+                "latency": self.latency.snapshot, "decode": self.decode.snapshot}
+
+
+def preload(paths: list, size: tuple = None, workers: int = None) -> Preload:
+    """
+    Decode image files into the IMAGE_CACHE on a thread pool
+
+    Images that are already cached are not decoded again. Returns a
+    Preload with the Future of every path, to pass to add_label, and
+    the timings of the decoding.
+
+    :param size: Maximum (width, height) to shrink the images to
+    :param workers: Number of threads
+    """
+    return Preload(paths, size, workers)
+
+
+IMAGE_CACHE = ImageCache(budget=32 * 1024 ** 2)
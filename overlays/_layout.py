@@ -0,0 +1,71 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Vertical layout of the rows of an Overlay, used by the backends that
+draw the rows themselves to repaint only the regions that changed.
+"""
+
+
+class RowLayout(object):
+    """
+    Offsets of rows stacked from the top in the order of their index
+
+    Every update returns the rows that must be drawn again and the
+    vertical spans of the window that must be repainted: the spans of
+    the rows that changed, moved or were removed, both before and after
+    the update.
+    """
+
+    def __init__(self):
+        self._offsets = dict()  # Row: (top, height), in the order of the rows
+
+    def update(self, heights: dict, changed: set) -> (set, list):
+        """
+        Recompute the offsets of the rows
+
+        :param heights: Dictionary of row: height of all rows
+        :param changed: Rows of which the contents changed
+        :return: Set of rows to draw and a sorted list of non-overlapping
+            (top, height) spans to repaint
+        """
+        offsets, top = dict(), 0
+        for row in sorted(heights):
+            offsets[row] = (top, heights[row])
+            top += heights[row]
+        previous, self._offsets = self._offsets, offsets  # Swapped to not change the dict during a paint
+        draw = {row for row, span in offsets.items() if row in changed or span != previous.get(row)}
+        spans = [offsets[row] for row in draw]
+        spans.extend(span for row, span in previous.items() if row in draw or row not in offsets)
+        return draw, self._merge(spans)
+
+    def rows(self, top: int, bottom: int) -> list:
+        """Return a list of (row, top, height) of the rows overlapping a span"""
+        return [(row, t, h) for row, (t, h) in self._offsets.items() if t < bottom and t + h > top]
+
+    @staticmethod
+    def _merge(spans: list) -> list:
+        """Merge overlapping and adjacent spans, skipping empty ones"""
+        merged = list()
+        for top, height in sorted(span for span in spans if span[1] > 0):
+            if len(merged) > 0 and top <= merged[-1][0] + merged[-1][1]:
+                last_top, last_height = merged[-1]
+                merged[-1] = (last_top, max(last_height, top + height - last_top))
+                continue
+            merged.append((top, height))
+        return merged
+
+    @property
+    def height(self) -> int:
+        """Total height of the rows"""
+        return sum(height for _, height in self._offsets.values())
+
+    def __getitem__(self, row: int) -> tuple:
+        return self._offsets[row]
+
+    def __contains__(self, row: int) -> bool:
+        return row in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
@@ -0,0 +1,73 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the Mailbox that coalesces high-rate label changes per row
+"""
+# Standard Library
+from threading import Lock
+
+
+class Mailbox(object):
+    """
+    Latest-value-wins slots for the contents of rows
+
+    Any number of threads put the newest contents of rows. The GUI
+    thread drains the slots once per frame and only gets the latest
+    contents of every row, so the work per frame depends on the number
+    of rows and not on the rate at which they are put. The lock only
+    guards a dictionary assignment, so producers do not wait for frames.
+    """
+
+    def __init__(self):
+        """Initialize the empty Mailbox"""
+        self._slots = dict()  # row: content
+        self._lock = Lock()
+        self.posted = self.superseded = self.drained = 0
+
+    def put(self, row: int, content: tuple) -> bool:
+        """Put the newest content of a row, returns whether the Mailbox was empty"""
+        with self._lock:
+            self.posted += 1
+            if row in self._slots:
+                self.superseded += 1
+            empty = len(self._slots) == 0
+            self._slots[row] = content
+            return empty
+
+    def discard(self, row: int) -> bool:
+        """Discard the pending content of a row, returns whether there was one"""
+        with self._lock:
+            if self._slots.pop(row, None) is None:
+                return False
+            self.superseded += 1
+            return True
+
+    def take(self, row: int) -> (tuple, None):
+        """Remove and return the pending content of a row, None if there is none"""
+        with self._lock:
+            content = self._slots.pop(row, None)
+            if content is not None:
+                self.drained += 1
+            return content
+
+    def drain(self) -> list:
+        """Return the latest (row, content) of every row and empty the Mailbox"""
+        if len(self._slots) == 0:  # Racy, but a put in between wakes up the next frame
+            return []
+        with self._lock:
+            slots, self._slots = self._slots, dict()
+            self.drained += len(slots)
+        return list(slots.items())
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def stats(self) -> dict:
+        """Return the numbers of contents put, superseded, drained and pending"""
+        with self._lock:
+            return {
+                "posted": self.posted, "superseded": self.superseded,
+                "drained": self.drained, "pending": len(self._slots)}
@@ -0,0 +1,235 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the OverlayManager that hosts any number of Overlays on a
+single GUI thread, instead of a thread (and for Tkinter, a Tcl
+interpreter) for every Overlay.
+"""
+# Standard Library
+from collections import deque
+from concurrent.futures import Future
+from queue import Empty, Queue
+from threading import current_thread, Event, Thread
+# Project Modules
+from ._overlay import Overlay
+
+
+class TkinterLoop(object):
+    """Runs the mainloop of a hidden Tk root that is master to TkinterOverlays"""
+
+    def __init__(self, manager: "OverlayManager"):
+        self._manager = manager
+        self._root = None
+
+    def run(self, ready: callable):
+        import tkinter as tk
+        self._root = tk.Tk()
+        self._root.withdraw()
+        ready()
+        self._root.mainloop()
+        self._root.destroy()
+
+    def wakeup(self, callback: callable):
+        """Schedule a callback in the GUI thread, marshalled by tkinter"""
+        self._root.after_idle(callback)
+
+    def create(self, position: tuple, size: tuple, name: str, **kwargs) -> Overlay:
+        from ._tkinter import TkinterOverlay
+        return TkinterOverlay(position, size, name, master=self._root, **kwargs)
+
+    def quit(self):
+        self._root.quit()
+
+
+class GtkLoop(object):
+    """Runs Gtk.main for GtkOverlays that do not start their own thread"""
+
+    def __init__(self, manager: "OverlayManager"):
+        self._manager = manager
+
+    def run(self, ready: callable):
+        from gi.repository import Gtk
+        ready()
+        Gtk.main()
+
+    def wakeup(self, callback: callable):
+        """Schedule a callback in the GUI thread with GLib.idle_add"""
+        from gi.repository import GLib
+        GLib.idle_add(self._once, callback)
+
+    @staticmethod
+    def _once(callback: callable) -> bool:
+        """Callback for GLib.idle_add, which must return False"""
+        callback()
+        return False
+
+    def create(self, position: tuple, size: tuple, name: str, **kwargs) -> Overlay:
+        from ._gtk import GtkOverlay
+        return GtkOverlay(position, size, name, loop=self, **kwargs)
+
+    def quit(self):
+        from gi.repository import Gtk
+        Gtk.main_quit()
+
+
+class HeadlessLoop(object):
+    """Draws the frames of HeadlessOverlays when they are due"""
+
+    IDLE_INTERVAL = 0.05  # Maximum seconds between checks when idle
+
+    def __init__(self, manager: "OverlayManager"):
+        self._manager = manager
+        self._callbacks = deque()
+        self._event = Event()
+        self._running = False
+
+    def run(self, ready: callable):
+        self._running = True
+        ready()
+        while self._running:
+            while len(self._callbacks) > 0:
+                self._callbacks.popleft()()
+            schedulers = [overlay._scheduler for overlay in self._manager.overlays]
+            for scheduler in schedulers:
+                scheduler.tick()
+            if self._pump():
+                break
+            delays = [scheduler.delay() for scheduler in schedulers]
+            self._event.wait(min([d for d in delays if d is not None] + [self.IDLE_INTERVAL]))
+            self._event.clear()
+
+    @staticmethod
+    def _pump() -> bool:
+        """Process the events of the windows, return True to stop"""
+        return False
+
+    def notify(self):
+        """Wake up the loop because a frame is required"""
+        self._event.set()
+
+    def wakeup(self, callback: callable):
+        """Schedule a callback in the GUI thread"""
+        self._callbacks.append(callback)
+        self._event.set()
+
+    def create(self, position: tuple, size: tuple, name: str, **kwargs) -> Overlay:
+        from ._headless import HeadlessOverlay
+        return HeadlessOverlay(position, size, name, loop=self, **kwargs)
+
+    def quit(self):
+        self._running = False
+        self._event.set()
+
+
+class WindowsLoop(HeadlessLoop):
+    """Draws the frames of WindowsOverlays and pumps the messages of their windows"""
+
+    @staticmethod
+    def _pump() -> bool:
+        """Pump the messages of the windows, return True on WM_QUIT"""
+        import win32gui as gui
+        return gui.PumpWaitingMessages()
+
+    def create(self, position: tuple, size: tuple, name: str, **kwargs) -> Overlay:
+        from ._windows import WindowsOverlay
+        return WindowsOverlay(position, size, name, loop=self, **kwargs)
+
+
+class OverlayManager(Thread):
+    """
+    Single GUI thread that hosts any number of Overlays of a backend
+
+    Overlays are created and destroyed through a command queue that is
+    executed in the GUI thread. The labels of the Overlays may be
+    changed from any thread, as the changes are drawn in frames that
+    are scheduled in the GUI thread.
+
+    :param backend: Backend to host: "tkinter", "gtk", "windows" or
+        "headless"
+    """
+
+    LOOPS = {
+        "tkinter": TkinterLoop,
+        "gtk": GtkLoop,
+        "windows": WindowsLoop,
+        "headless": HeadlessLoop,
+    }
+
+    def __init__(self, backend: str = "tkinter"):
+        """Start the GUI thread and wait until it is running"""
+        if backend not in self.LOOPS:
+            raise ValueError("Unsupported backend: {}".format(backend))
+        Thread.__init__(self, name="OverlayManager-{}".format(backend), daemon=True)
+        self.backend = backend
+        self.overlays = list()
+        self._loop = self.LOOPS[backend](self)
+        self._commands = Queue()
+        self._ready = Event()
+        self._error = None
+        self.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def run(self):
+        """Run the main loop of the backend in this thread"""
+        try:
+            self._loop.run(self._ready.set)
+        except Exception as e:
+            if self._ready.is_set():
+                raise
+            self._error = e  # Raised in the thread that created the manager
+            self._ready.set()
+
+    def call(self, function: callable, *args, **kwargs) -> Future:
+        """Execute a function in the GUI thread"""
+        future = Future()
+        if current_thread() is self:
+            future.set_result(function(*args, **kwargs))
+            return future
+        self._commands.put((future, function, args, kwargs))
+        self._loop.wakeup(self._process)
+        return future
+
+    def create(self, position: tuple, size: tuple, name: str, **kwargs) -> Overlay:
+        """Create a new Overlay in the GUI thread"""
+        return self.call(self._create, position, size, name, **kwargs).result()
+
+    def destroy(self, overlay: Overlay):
+        """Destroy an Overlay hosted by this manager"""
+        self.call(self._destroy, overlay).result()
+
+    def stop(self):
+        """Destroy all Overlays and stop the GUI thread"""
+        self.call(self._shutdown).result()
+        self.join()
+
+    def _create(self, position: tuple, size: tuple, name: str, **kwargs) -> Overlay:
+        overlay = self._loop.create(position, size, name, **kwargs)
+        self.overlays.append(overlay)
+        return overlay
+
+    def _destroy(self, overlay: Overlay):
+        self.overlays.remove(overlay)
+        overlay.destroy()
+
+    def _shutdown(self):
+        for overlay in list(self.overlays):
+            self._destroy(overlay)
+        self._loop.quit()
+
+    def _process(self):
+        """Execute the queued commands, called in the GUI thread"""
+        while True:
+            try:
+                future, function, args, kwargs = self._commands.get_nowait()
+            except Empty:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
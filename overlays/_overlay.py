@@ -5,55 +5,605 @@ Copyright (c) 2018 RedFantom
 
 Provides the abstract class the Overlay interface is based upon
 """
+# Standard Library
+from concurrent.futures import Future
+from contextlib import contextmanager
+import os
+from threading import Lock, local
+import time
+# Project Modules
+from ._cache import LRUCache
+from ._mailbox import Mailbox
+from ._scheduler import FrameScheduler
+from ._stats import Stats
+from ._style import font_tuple, Style
+from ._timers import Timed, TimerWheel
+
+
+class Label(object):
+    """Backend-neutral record of the contents of a single row"""
+
+    FIELDS = ("text", "image", "color", "font")
+    __slots__ = ("row", "text", "image", "style", "version")
+
+    def __init__(self, row: int, text: str, image: str, style: Style, version: int):
+        """Store the properties of the row"""
+        self.row = row
+        self.text = text
+        self.image = image
+        self.style = style
+        self.version = version
+
+    @property
+    def color(self) -> tuple:
+        return self.style.color
+
+    @property
+    def font(self) -> tuple:
+        """Normalized (family, size, bold, italic) tuple"""
+        return self.style.font
+
+    @property
+    def content(self) -> tuple:
+        """Return the properties that determine what the row looks like"""
+        return self.text, self.image, self.style.color, self.style.font
+
+    def changed(self, other: "Label") -> set:
+        """Return the names of the properties that differ from another Label"""
+        if self.style is other.style:  # Styles are interned
+            return {field for field, a, b in zip(
+                self.FIELDS, (self.text, self.image), (other.text, other.image)) if a != b}
+        return {field for field, a, b in zip(self.FIELDS, self.content, other.content) if a != b}
+
+
+class Row(object):
+    """
+    Record of the native resources a backend draws a Label with
+
+    The text, image and widget slots hold whatever the backend uses,
+    such as widgets, canvas items, bitmaps or cached sprites. A Row
+    only owns the resources passed to own(), which it releases when
+    the row is released. Shared resources, like cached images and
+    sprites, are referenced but not owned.
+    """
+
+    __slots__ = ("label", "text", "image", "widget", "_owned")
+
+    def __init__(self, label: Label, text: object = None, image: object = None, widget: object = None):
+        self.label = label
+        self.text = text
+        self.image = image
+        self.widget = widget
+        self._owned = list()  # (resource, release)
+
+    def own(self, resource: object, release: callable) -> object:
+        """Take ownership of a resource, returned for convenience"""
+        if resource is not None:
+            self._owned.append((resource, release))
+        return resource
+
+    def release(self, resource: object = None):
+        """Release an owned resource, or all owned resources in reverse order"""
+        owned, self._owned = self._owned, list()
+        for item in reversed(owned):
+            if resource is None or item[0] is resource:
+                item[1](item[0])
+            else:
+                self._owned.insert(0, item)
+
+    def disown(self, resource: object) -> (callable, None):
+        """Give up ownership of a resource without releasing it, returns its release callable"""
+        for i, (owned, release) in enumerate(self._owned):
+            if owned is resource:
+                del self._owned[i]
+                return release
+        return None
+
+    @property
+    def owned(self) -> list:
+        """Resources owned by the row"""
+        return [resource for resource, _ in self._owned]
+
+
+class LabelStore(object):
+    """
+    Retained, versioned model of the labels of an Overlay
+
+    Every change to a row gives it a new version. diff() returns only
+    the rows that have changed since the previous call, so a backend
+    does not have to rebuild or repaint rows that are unchanged.
+    """
+
+    def __init__(self):
+        """Initialize the empty store"""
+        self._rows = dict()
+        self._drawn = dict()  # row: version at the last diff
+        self._version = 0
+        self._lock = Lock()
+
+    def set(self, row: int, text: str, image: str, color: tuple, font: (dict, tuple)) -> Label:
+        """Set the contents of a row, bumping its version if changed"""
+        style = Style.of(color, font)
+        with self._lock:
+            return self._set(row, (text, image, style))
+
+    def remove(self, row: int) -> None:
+        """Remove a row from the store"""
+        with self._lock:
+            del self._rows[row]
+
+    def commit(self, changes: list):
+        """
+        Apply a list of changes at once
+
+        :param changes: List of (row, content) tuples, where content is
+            a (text, image, Style) tuple, a dictionary with only the
+            properties (text, image, style, color or font) to change, or
+            None to remove the row. Removing or changing a row that does
+            not exist is ignored.
+        """
+        with self._lock:
+            for row, content in changes:
+                if content is None:
+                    self._rows.pop(row, None)
+                elif isinstance(content, dict):
+                    label = self._rows.get(row)
+                    if label is None:
+                        continue
+                    style = content.get("style", label.style).replace(content.get("color"), content.get("font"))
+                    self._set(row, (content.get("text", label.text), content.get("image", label.image), style))
+                else:
+                    self._set(row, content)
+
+    def _set(self, row: int, content: tuple) -> Label:
+        """Set the contents of a row without acquiring the lock"""
+        label = self._rows.get(row)
+        if label is not None and label.text == content[0] and label.image == content[1] and label.style is content[2]:
+            return label
+        self._version += 1
+        label = Label(row, *content, self._version)
+        self._rows[row] = label
+        return label
+
+    def diff(self) -> (dict, set):
+        """Return the rows changed and removed since the last diff"""
+        with self._lock:
+            changed = {
+                row: label for row, label in self._rows.items()
+                if self._drawn.get(row) != label.version}
+            removed = set(self._drawn) - set(self._rows)
+            self._drawn = {row: label.version for row, label in self._rows.items()}
+        return changed, removed
+
+    def index(self, row: int) -> int:
+        """Return the position of a row among the rows in the store"""
+        return sorted(self._rows).index(row)
+
+    def rows(self) -> list:
+        """Return a snapshot of the labels ordered by row"""
+        with self._lock:
+            return [self._rows[row] for row in sorted(self._rows)]
+
+    def __getitem__(self, row: int) -> Label:
+        return self._rows[row]
+
+    def __contains__(self, row: int) -> bool:
+        return row in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
 
 
 class Overlay(object):
-    """Abstract class specifying Overlay interface"""
+    """
+    Abstract class specifying Overlay interface
+
+    Labels are kept in a LabelStore. Changes are only passed on to the
+    backend (through _apply) when a frame is drawn, and then only for
+    the rows that changed. Changes invalidate the FrameScheduler of the
+    Overlay, which the backend uses to draw at most FRAME_RATE frames
+    per second, and only when something changed.
+
+    The timers of timed labels are kept in a TimerWheel, which the
+    frames advance. The FrameScheduler is asked for a frame at the next
+    deadline of the wheel, so that the labels that expire at the same
+    time are removed in a single frame.
+    """
+
+    DEFAULT_COLOR = (0, 0, 0)
+    DEFAULT_FONT = ("default", 11, False, False)
+    FRAME_RATE = 30
+    FLASH_COLOR = (255, 255, 0)
+    FADE_STEPS = 8
 
     def __init__(self, position: tuple, size: tuple, name: str):
         """Initialize the transparent overlay at given position"""
         assert isinstance(position, tuple) and len(position) == 2
         assert isinstance(size, tuple) and len(size) == 2
         assert isinstance(name, str)
+        self._labels = LabelStore()
+        self._batches = local()
+        self._mailbox = Mailbox()
+        self._images = dict()  # row: Future of the image of the row, until it is done
+        self._images_lock = Lock()
+        self._scheduler = FrameScheduler(self._draw_frame, self.FRAME_RATE)
+        self._timers = TimerWheel(clock=self._scheduler.clock)
+        self._timed = dict()  # row: Timed, for the labels with timers
+        self._timed_lock = Lock()
+        self._stats = None
 
     def destroy(self):
         """Destroy the open Overlay"""
         raise NotImplementedError()
 
     def add_label(
-            self, row: int, text: str, image: str = None,
-            color: tuple = None, font: (dict, tuple) = None) -> (str, None):
-        """Create a new label in the grid with the specifications"""
-        raise NotImplementedError()
+            self, row: int, text: str, image: (str, Future) = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None,
+            ttl: float = None, flash: float = None, fade: float = None) -> (str, None):
+        """
+        Create a new label in the grid with the specifications
+
+        :param image: Path to an image file, or a Future resolving to
+            one, such as those of overlays.preload(). The row is shown
+            without image until the Future is done.
+        :param style: Style of the label, which is faster than passing
+            a color and font. A color or font passed as well replaces
+            that of the Style.
+        :param ttl: Seconds after which the label is removed
+        :param flash: Seconds between switches of the color of the label
+            to FLASH_COLOR and back, until it is removed
+        :param fade: Seconds before the end of the ttl in which the
+            label fades out in FADE_STEPS steps
+        """
+        image = self._image(row, image)
+        style = self._style(color, font, style)
+        self._time(row, style, ttl, flash, fade)
+        self._mailbox.discard(row)  # An older post may not replace the label in the next frame
+        self._change(row, (text, image, style))
+        return str(row)
 
     def remove_label(self, ident: str) -> None:
         """Remove a label from the grid with the identifier"""
-        raise NotImplementedError()
+        row = int(ident)
+        self._image(row, None)
+        self._time(row)
+        posted = self._mailbox.discard(row)
+        if not posted and getattr(self._batches, "changes", None) is None and row not in self._labels:
+            raise KeyError(row)
+        self._change(row, None)
+
+    def post(
+            self, row: int, text: str, image: str = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None) -> str:
+        """
+        Set the contents of a row from any thread, latest value wins
+
+        Unlike add_label, the contents are not committed immediately,
+        but put in the Mailbox of the Overlay, which is drained once per
+        frame. Contents of a row posted before the frame is drawn are
+        superseded by the latest and dropped, so that producers may post
+        at a much higher rate than the frame rate. Posts are not part of
+        batches. Adding or removing a label discards its pending post,
+        and updating it commits the post first. The timers of a timed
+        label are cancelled.
+        """
+        image = self._image(row, image)
+        if row in self._timed:
+            self._schedule(row)
+        if self._mailbox.put(row, (text, image, self._style(color, font, style))):
+            self._invalidate()  # Later posts are drained by the same frame
+        return str(row)
+
+    def update_label(
+            self, ident: str, text: str = None, image: (str, Future) = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None) -> None:
+        """
+        Change the properties of an existing label in place
+
+        Only the properties that are not None are changed, and backends
+        only update the parts of the row that are affected. To remove
+        the image of a label, replace it with add_label. A pending post
+        of the row is committed first, so that it does not override the
+        change in the next frame.
+        """
+        row = int(ident)
+        posted = self._mailbox.take(row)
+        if posted is not None:
+            self._change(row, posted)
+        elif getattr(self._batches, "changes", None) is None and row not in self._labels:
+            raise KeyError(row)
+        if image is not None:
+            image = self._image(row, image)
+        properties = dict(zip(Label.FIELDS + ("style",), (text, image, color, font, style)))
+        if row in self._timed and (color is not None or font is not None or style is not None):
+            with self._timed_lock:  # Flash and fade the new Style
+                timed = self._timed.get(row)
+                if timed is not None:
+                    timed.style = (timed.style if style is None else style).replace(color, font)
+                    properties.update(color=None, font=None, style=self._timed_style(timed))
+        self._change(row, {field: value for field, value in properties.items() if value is not None})
+
+    def _style(self, color: (tuple, None), font: (dict, tuple, None), style: (Style, None)) -> Style:
+        """Return the Style of a label from its arguments"""
+        if style is not None:
+            return style.replace(color, font)
+        color = self.DEFAULT_COLOR if color is None else color
+        return Style.of(color, self.DEFAULT_FONT if font is None else font)
+
+    def _time(self, row: int, style: Style = None, ttl: float = None, flash: float = None, fade: float = None):
+        """Replace the timers of a row, when the active batch is committed"""
+        if fade is not None and (ttl is None or not 0 < fade <= ttl):
+            raise ValueError("fade requires a ttl at least as long")
+        timers = getattr(self._batches, "timers", None)
+        if timers is not None:
+            timers[row] = (style, ttl, flash, fade)
+            return
+        self._schedule(row, style, ttl, flash, fade)
+
+    def _schedule(self, row: int, style: Style = None, ttl: float = None, flash: float = None, fade: float = None):
+        """Cancel the timers of a row and schedule those of its new timed label"""
+        with self._timed_lock:
+            timed = self._timed.pop(row, None)
+            if timed is not None:
+                for handle in timed.handles.values():
+                    self._timers.cancel(handle)
+            if ttl is None and flash is None:
+                return
+            timed = self._timed[row] = Timed(style, flash, None if fade is None else fade / self.FADE_STEPS)
+            if ttl is not None:
+                timed.handles["expire"] = self._timers.schedule(ttl, (row, "expire", timed))
+            if flash is not None:
+                timed.handles["flash"] = self._timers.schedule(flash, (row, "flash", timed))
+            if fade is not None:
+                timed.handles["fade"] = self._timers.schedule(ttl - fade + timed.step, (row, "fade", timed))
+
+    def _expire(self) -> list:
+        """Return the changes of the timers that expired: removed, flashed and faded labels"""
+        changes = list()
+        with self._timed_lock:
+            for row, kind, timed in self._timers.advance():
+                if self._timed.get(row) is not timed:  # Replaced while its timers expired
+                    continue
+                del timed.handles[kind]
+                if kind == "expire":
+                    for handle in timed.handles.values():
+                        self._timers.cancel(handle)
+                    del self._timed[row]
+                    changes.append((row, None))
+                    continue
+                if kind == "flash":
+                    timed.flashing = not timed.flashing
+                    timed.handles[kind] = self._timers.schedule(timed.period, (row, kind, timed))
+                else:
+                    timed.faded += 1
+                    if timed.faded < self.FADE_STEPS - 1:
+                        timed.handles[kind] = self._timers.schedule(timed.step, (row, kind, timed))
+                changes.append((row, {"style": self._timed_style(timed)}))
+        return changes
+
+    def _timed_style(self, timed: Timed) -> Style:
+        """Return the Style a timed label is drawn with"""
+        style = timed.style
+        if timed.flashing:
+            style = style.replace(color=self.FLASH_COLOR)
+        if timed.faded > 0:
+            style = self._faded(style, 1.0 - timed.faded / self.FADE_STEPS)
+        return style
+
+    def _faded(self, style: Style, opacity: float) -> Style:
+        """Return a Style with its color at an opacity, as alpha of the color"""
+        alpha = style.color[3] if len(style.color) == 4 else 255
+        return style.replace(color=style.color[:3] + (int(round(alpha * opacity)),))
+
+    @staticmethod
+    def _blend(style: Style, key: tuple, opacity: float) -> Style:
+        """Return a Style with its color blended into a color key, for backends without alpha"""
+        return style.replace(color=tuple(int(round(k + (c - k) * opacity)) for c, k in zip(style.color, key)))
+
+    def _image(self, row: int, image: (str, Future, None)) -> (str, None):
+        """
+        Check the image of a row and return its path
+
+        An image Future that is not done yet is attached to the row by
+        the first frame after it is done, and None is returned. Images
+        of Futures that failed or were cancelled are left out.
+        """
+        with self._images_lock:
+            self._images.pop(row, None)
+            if isinstance(image, Future):
+                if not image.done():
+                    self._images[row] = image
+                    image.add_done_callback(lambda _: self._invalidate())
+                    return None
+                image = self._resolve_image(image)
+        if image is not None and not os.path.exists(image):
+            raise FileNotFoundError("Image file does not exist")
+        return image
+
+    def _attach_images(self) -> list:
+        """Return the changes that attach the images of the rows whose image Future is done"""
+        with self._images_lock:
+            done = {row: future for row, future in self._images.items() if future.done()}
+            for row in done:
+                del self._images[row]
+        images = ((row, self._resolve_image(future)) for row, future in done.items())
+        return [(row, {"image": image}) for row, image in images if image is not None]
+
+    @staticmethod
+    def _resolve_image(future: Future) -> (str, None):
+        """Return the path an image Future resolved to, or None if it failed"""
+        if future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def set_labels(self, labels: dict) -> list:
+        """
+        Replace all labels of the Overlay at once
+
+        :param labels: Dictionary of row: label, where label is either
+            the text of the label or a dictionary of keyword arguments
+            for add_label
+        :return: List of identifiers of the labels
+        """
+        with self.batch():
+            for label in self._labels.rows():
+                if label.row not in labels:
+                    self.remove_label(str(label.row))
+            return [
+                self.add_label(row, **(label if isinstance(label, dict) else {"text": label}))
+                for row, label in sorted(labels.items())]
+
+    @contextmanager
+    def batch(self):
+        """
+        Queue the label changes made in this thread in a transaction
+
+        The changes are committed to the LabelStore at once when the
+        with-block exits, so that they are drawn in a single frame
+        with a single layout pass. If the block raises an exception,
+        the changes are discarded. Nested batches are part of the
+        outermost batch. The timers of the labels are replaced when
+        the changes are committed.
+        """
+        if getattr(self._batches, "changes", None) is not None:
+            yield
+            return
+        changes, timers = list(), dict()
+        with self._collect(changes, timers):
+            yield
+        self._commit(changes)
+        self._start(timers)
+
+    @contextmanager
+    def _collect(self, changes: list, timers: dict):
+        """Queue the label changes and timers of rows made in this thread"""
+        previous = getattr(self._batches, "changes", None), getattr(self._batches, "timers", None)
+        self._batches.changes, self._batches.timers = changes, timers
+        try:
+            yield
+        finally:
+            self._batches.changes, self._batches.timers = previous
+
+    def _start(self, timers: dict):
+        """Replace the timers of the rows of a committed batch"""
+        for row, arguments in timers.items():
+            self._schedule(row, *arguments)
+
+    def _commit(self, changes: list):
+        """Commit a list of changes to the LabelStore and request a frame"""
+        self._labels.commit(changes)
+        self._invalidate()
+
+    def _change(self, row: int, content: (tuple, dict, None)):
+        """Queue a change in the active batch or commit it immediately"""
+        if self._stats is not None:
+            self._stats.count(content)
+        changes = getattr(self._batches, "changes", None)
+        if changes is not None:
+            changes.append((row, content))
+            return
+        self._commit([(row, content)])
 
     def update(self):
         """Update the window state"""
+        self._flush()
+
+    def _flush(self) -> bool:
+        """Pass the rows changed since the last flush, posted rows, decoded images and timers to the backend"""
+        posted = self._mailbox.drain()
+        if len(self._images) > 0:
+            posted += self._attach_images()
+        if len(self._timers) > 0:
+            posted += self._expire()
+            deadline = self._timers.next_deadline()
+            if deadline is not None:
+                self._scheduler.invalidate_at(deadline)
+        if len(posted) > 0:
+            self._labels.commit(posted)
+        changed, removed = self._labels.diff()
+        if len(changed) == 0 and len(removed) == 0:
+            return False
+        if self._stats is not None:
+            self._stats.rows += len(changed) + len(removed)
+        self._apply(changed, removed)
+        return True
+
+    def _apply(self, changed: dict, removed: set):
+        """Apply changed (row: Label) and removed rows to the window"""
         raise NotImplementedError()
 
+    def _draw_frame(self):
+        """Draw a frame, called by the FrameScheduler, and time it if instrumented"""
+        stats = self._stats
+        if stats is None:
+            self._frame()
+            return
+        start = time.perf_counter()
+        self._frame()
+        stats.frame(self, time.perf_counter() - start)
+
+    def _frame(self):
+        """Draw a frame"""
+        self._flush()
+
+    def enable_stats(self, hook: callable = None):
+        """
+        Start recording runtime statistics of the Overlay
+
+        :param hook: Callable called after every frame with the Overlay
+            and a dictionary with the frame number, its duration and
+            the number of rows it changed
+        """
+        self._stats = Stats(hook)
+
+    def disable_stats(self):
+        """Stop recording runtime statistics, which then cost nothing"""
+        self._stats = None
+
+    @property
+    def stats(self) -> (dict, None):
+        """Return a snapshot of the statistics, None if not enabled"""
+        stats = self._stats
+        if stats is None:
+            return None
+        from ._imaging import IMAGE_CACHE  # Not imported by backends without images
+        caches = {"image_cache": IMAGE_CACHE, "mailbox": self._mailbox}
+        if isinstance(getattr(self, "_fonts", None), LRUCache):
+            caches["font_cache"] = self._fonts
+        if isinstance(getattr(self, "_sprites", None), LRUCache):
+            caches["sprite_cache"] = self._sprites
+        if getattr(self, "_pool", None) is not None:
+            caches["row_pool"] = self._pool
+        return stats.snapshot(caches)
+
+    def _invalidate(self):
+        """Called when the LabelStore has changed to request a frame"""
+        self._scheduler.invalidate()
+
+    @property
+    def frame_rate(self) -> float:
+        """Maximum number of frames drawn per second"""
+        return self._scheduler.fps
+
+    @frame_rate.setter
+    def frame_rate(self, fps: float):
+        self._scheduler.fps = fps
+
     @property
     def rectangle(self)->tuple:
         """Return the box rectangle the overlay occupies"""
         raise NotImplementedError()
 
     @staticmethod
-    def _font_dict_to_tuple(font: dict):
+    def _font_dict_to_tuple(font: (dict, tuple)) -> tuple:
         """Build a font tuple from a font dictionary"""
-        if isinstance(font, tuple):
-            if len(font) == 2:
-                return font + (False, False)
-            elif len(font) == 3:
-                return font + (False,)
-            return font
-        font_t = (font.pop("family"), font.pop("size"))
-        if "bold" in font and font["bold"] is True:
-            font_t += (True,)
-        if "italic" in font and font["italic"] is True:
-            font_t += (True,) if len(font_t) == 3 else (False, True)
-        return font_t
+        return font_tuple(font)
+
+    @staticmethod
+    def _font_key(font: (dict, tuple), dpi_scale: float = 1.0) -> tuple:
+        """Build a normalized, hashable key for a font at a DPI scale"""
+        family, size, bold, italic = Overlay._font_dict_to_tuple(font)
+        return family, size, bold is True, italic is True, round(dpi_scale, 3)
 
     @staticmethod
     def _color_tuple_to_hex(color: tuple) -> str:
@@ -0,0 +1,80 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the bounded pool in which backends keep the Rows of removed
+labels, so that their widgets are reused instead of created again.
+"""
+# Standard Library
+from threading import Lock
+# Project Modules
+from ._overlay import Row
+
+
+class RowPool(object):
+    """
+    Bounded stack of removed Rows whose native resources can be reused
+
+    A Row put into a full pool is released. The backend resets the
+    contents and position of a Row it gets from the pool.
+
+    :param capacity: Maximum number of Rows kept
+    """
+
+    def __init__(self, capacity: int = 16):
+        self._rows = list()
+        self._capacity = capacity
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self) -> (Row, None):
+        """Return a pooled Row, or None if the pool is empty"""
+        with self._lock:
+            if len(self._rows) == 0:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._rows.pop()
+
+    def put(self, row: Row):
+        """Keep a removed Row for reuse, or release it if the pool is full"""
+        with self._lock:
+            if len(self._rows) < self._capacity:
+                self._rows.append(row)
+                return
+            self.evictions += 1
+        row.release()
+
+    def clear(self):
+        """Release all pooled Rows"""
+        with self._lock:
+            rows, self._rows = self._rows, list()
+        for row in rows:
+            row.release()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity: int):
+        """Change the capacity, releasing the Rows that do not fit"""
+        with self._lock:
+            self._capacity = capacity
+            rows, self._rows = self._rows[capacity:], self._rows[:capacity]
+        for row in rows:
+            row.release()
+
+    @property
+    def stats(self) -> dict:
+        """Return a snapshot of the counters of the pool"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._rows), "capacity": self._capacity,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0}
+
+    def __len__(self) -> int:
+        return len(self._rows)
@@ -0,0 +1,119 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the FrameScheduler that decides when an Overlay draws a frame
+"""
+# Standard Library
+from threading import Event, Lock
+import time
+
+
+class FrameScheduler(object):
+    """
+    Invalidation-driven pacing of the frames of an Overlay
+
+    A frame is only drawn after invalidate() has been called, or once
+    the time passed to invalidate_at() has come, and at most fps frames
+    are drawn per second. Backends with an event loop
+    schedule tick() after delay() seconds, backends without one call
+    wait() and tick() in their own loop.
+
+    :param frame: Callable that draws a frame
+    :param fps: Maximum number of frames per second
+    :param clock: Callable returning a monotonic time in seconds
+    :param sleep: Callable sleeping for a number of seconds
+    """
+
+    def __init__(self, frame: callable, fps: float = 30.0,
+                 clock: callable = time.monotonic, sleep: callable = time.sleep):
+        """Initialize the scheduler without a pending frame"""
+        self._frame = frame
+        self._clock = clock
+        self._sleep = sleep
+        self._event = Event()
+        self._callbacks = list()
+        self._lock = Lock()
+        self._last = None
+        self._deadline = None
+        self.fps = fps
+        self.frames = 0
+
+    def invalidate(self):
+        """Request a new frame, may be called from any thread"""
+        self._event.set()
+
+    def invalidate_at(self, deadline: float):
+        """Request a new frame at a time of the clock, called from the thread that draws the frames"""
+        if self._deadline is None or deadline < self._deadline:
+            self._deadline = deadline
+
+    @property
+    def invalidated(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def clock(self) -> callable:
+        return self._clock
+
+    @property
+    def interval(self) -> float:
+        """Minimum time between two frames in seconds"""
+        return 1.0 / self.fps
+
+    def delay(self) -> (float, None):
+        """Return the seconds until the next frame is due, None if no frame is required"""
+        deadline = self._deadline
+        if not self._event.is_set() and deadline is None:
+            return None
+        now = self._clock()
+        paced = 0.0 if self._last is None else max(0.0, self._last + self.interval - now)
+        if self._event.is_set():
+            return paced
+        return max(paced, deadline - now)
+
+    def tick(self) -> bool:
+        """Draw a frame if one is due, returns whether a frame was drawn"""
+        if self.delay() != 0.0:
+            return False
+        self._event.clear()  # Invalidations during the frame require a new frame
+        if self._deadline is not None and self._deadline <= self._clock():
+            self._deadline = None
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, list()
+        self._last = self._clock()
+        self._frame()
+        self.frames += 1
+        for callback in callbacks:
+            callback()
+        return True
+
+    def after_frame(self, callback: callable):
+        """
+        Call a callback once the next frame has been drawn
+
+        The callback is called in the thread that draws the frame. It
+        is only called for a frame that started after it was added, so
+        all changes made before adding it are drawn. The frame still
+        has to be requested by invalidating the scheduler.
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def wait(self, timeout: float) -> bool:
+        """Block at most timeout seconds until a frame is due, returns whether it is"""
+        delay = self.delay()
+        if not self._event.is_set():  # Wake up early for an invalidation
+            if delay is None:
+                if not self._event.wait(timeout):
+                    return False
+            elif delay > 0 and not self._event.wait(min(timeout, delay)) and delay > timeout:
+                return False
+            delay = self.delay()
+        if delay > timeout:
+            self._sleep(timeout)
+            return False
+        if delay > 0:
+            self._sleep(delay)
+        return True
@@ -0,0 +1,89 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides a bounded cache of pre-rendered text sprites, so that the text
+of a row is rendered once and every recurring string is a single blit.
+"""
+# Standard Library
+import math
+import unicodedata
+# Packages
+from PIL import Image, ImageDraw, ImageFont
+# Project Modules
+from ._cache import LRUCache
+from ._imaging import sizeof
+from ._overlay import Overlay
+
+
+STYLES = {  # Suffixes of the font files of the styles, tried in order
+    (False, False): ("",),
+    (True, False): ("-Bold", "bd", "b", ""),
+    (False, True): ("-Italic", "-Oblique", "i", ""),
+    (True, True): ("-BoldItalic", "-BoldOblique", "bi", "z", ""),
+}
+
+
+def load_font(family: str, size: int, bold: bool, italic: bool) -> ImageFont.ImageFont:
+    """Load a PIL font for a font family, or the default font"""
+    for suffix in STYLES[(bold, italic)]:
+        try:
+            return ImageFont.truetype(family + suffix, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def render_text(text: str, font: tuple, color: tuple) -> Image.Image:
+    """
+    Render text in a normalized font key as RGBA image with PIL
+
+    Every line is as tall as the ascent and descent of the font, so
+    that sprites of the same font are aligned on their baseline.
+    """
+    family, size, bold, italic, dpi_scale = font
+    pil_font = FONTS.get_or_create((family, size, bold, italic, dpi_scale), lambda: load_font(
+        family, max(int(round(size * dpi_scale)), 1), bold, italic))
+    ascent, descent = pil_font.getmetrics()
+    lines = text.split("\n")
+    width = max(int(math.ceil(pil_font.getlength(line))) for line in lines)
+    fill = tuple(color[:3])
+    image = Image.new("RGBA", (max(width, 1), (ascent + descent) * len(lines)), fill + (0,))
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((0, i * (ascent + descent)), line, font=pil_font, fill=fill + (color[3] if len(color) == 4 else 255,))
+    return image
+
+
+class SpriteCache(LRUCache):
+    """
+    Process-wide cache of pre-rendered text, keyed by text, font and color
+
+    The text is normalized to NFC and the font to its font key. Like the
+    ImageCache, a backend may store its own variant of a sprite, such as
+    a color-keyed pixel buffer or a cairo surface, rendered by its own
+    render callable. Sprites are shared and must not be modified.
+
+    :param budget: Maximum total size of the sprites in bytes
+    """
+
+    def sprite(
+            self, text: str, font: (dict, tuple), color: tuple, dpi_scale: float = 1.0,
+            variant: object = None, render: callable = render_text):
+        """
+        Return the sprite of a text
+
+        :param variant: Hashable identifier of the form of the sprite
+        :param render: Callable rendering (text, font key, color) into
+            the variant, called only on a cache miss
+        """
+        key = (unicodedata.normalize("NFC", text), Overlay._font_key(font, dpi_scale), tuple(color), variant)
+        return self.get_or_create(key, lambda: render(*key[:3]), sizeof)
+
+
+FONTS = LRUCache(budget=32)
+SPRITE_CACHE = SpriteCache(budget=16 * 1024 ** 2)
@@ -0,0 +1,84 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the runtime statistics recorded by instrumented Overlays
+"""
+# Standard Library
+from collections import deque
+
+
+class Histogram(object):
+    """Sliding window of the most recent durations with percentiles"""
+
+    def __init__(self, size: int = 1024):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self._samples.append(value)
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> float:
+        """Return a percentile (0-100) of the samples in the window"""
+        if len(self._samples) == 0:
+            return 0.0
+        samples = sorted(self._samples)
+        return samples[min(int(len(samples) * percentile / 100), len(samples) - 1)]
+
+    @property
+    def snapshot(self) -> dict:
+        return {"count": self.count, "p50": self.percentile(50), "p95": self.percentile(95), "max": self.max}
+
+
+class Stats(object):
+    """
+    Counters and timings of an instrumented Overlay
+
+    :param hook: Callable called after every frame with the Overlay
+        and a dictionary with the frame number, its duration in seconds
+        and the number of rows it changed
+    """
+
+    def __init__(self, hook: callable = None):
+        self.hook = hook
+        self.frames = 0
+        self.frame_time = Histogram()
+        self.paint_time = Histogram()
+        self.added = self.removed = self.updated = 0
+        self.rows = 0  # Rows changed in the current frame
+
+    def count(self, content: (tuple, dict, None)):
+        """Count a label change by the kind of its content"""
+        if content is None:
+            self.removed += 1
+        elif isinstance(content, dict):
+            self.updated += 1
+        else:
+            self.added += 1
+
+    def frame(self, overlay, duration: float):
+        """Record a frame drawn by an Overlay"""
+        self.frames += 1
+        self.frame_time.add(duration)
+        if self.hook is not None:
+            self.hook(overlay, {"frame": self.frames, "duration": duration, "rows": self.rows})
+        self.rows = 0
+
+    def paint(self, duration: float):
+        """Record the duration of a paint of the window by the backend"""
+        self.paint_time.add(duration)
+
+    def snapshot(self, caches: dict) -> dict:
+        """Return a dictionary of the statistics and of the given caches"""
+        snapshot = {
+            "frames": self.frames,
+            "frame_time": self.frame_time.snapshot,
+            "paint_time": self.paint_time.snapshot,
+            "labels": {"added": self.added, "removed": self.removed, "updated": self.updated},
+        }
+        snapshot.update({name: cache.stats for name, cache in caches.items()})
+        return snapshot
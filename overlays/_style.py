@@ -0,0 +1,102 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the immutable, interned Style of a label: its color and font,
+resolved once into the forms the backends draw with.
+"""
+# Standard Library
+from threading import Lock
+from weakref import WeakValueDictionary
+# Project Modules
+from ._cache import LRUCache
+
+
+def font_tuple(font: (dict, tuple)) -> tuple:
+    """Build a (family, size, bold, italic) tuple from a font tuple or dictionary"""
+    if isinstance(font, tuple):
+        if len(font) == 2:
+            return font + (False, False)
+        elif len(font) == 3:
+            return font + (False,)
+        return font
+    # The dictionary is owned by the caller, so it may not be modified
+    font_t = (font["family"], font["size"])
+    if "bold" in font and font["bold"] is True:
+        font_t += (True,)
+    if "italic" in font and font["italic"] is True:
+        font_t += (True,) if len(font_t) == 3 else (False, True)
+    return font_tuple(font_t)
+
+
+class Style(object):
+    """
+    Immutable color and font of a label
+
+    Styles are interned: creating a Style equal to an existing one
+    returns that Style, so that Styles are compared by identity. The
+    color is resolved into a hex color code, a Windows COLORREF and
+    RGBA floats, and the font into a (family, size, bold, italic)
+    tuple, once, when the Style is created.
+
+    :param color: (r, g, b) or (r, g, b, a) tuple of integers
+    :param font: Font tuple or dictionary with family, size, bold and
+        italic keys
+    """
+
+    __slots__ = ("color", "font", "hex", "colorref", "rgba", "_hash", "__weakref__")
+
+    _INTERNED = WeakValueDictionary()
+    _LEGACY = LRUCache(budget=1024)  # Legacy (color, font) forms: Style
+    _LOCK = Lock()
+
+    def __new__(cls, color: tuple, font: (dict, tuple)):
+        color = tuple(int(c) for c in color)
+        family, size, bold, italic = font_tuple(font)
+        font = (family, size, bold is True, italic is True)
+        key = (color, font)
+        with cls._LOCK:
+            style = cls._INTERNED.get(key)
+            if style is not None:
+                return style
+            style = object.__new__(cls)
+            for name, value in (
+                    ("color", color), ("font", font),
+                    ("hex", "#{:02x}{:02x}{:02x}".format(*color[:3])),
+                    ("colorref", sum(c << 8 * i for i, c in enumerate(color))),
+                    ("rgba", tuple(c / 255 for c in color) + ((1.0,) if len(color) == 3 else ())),
+                    ("_hash", hash(key))):
+                object.__setattr__(style, name, value)
+            cls._INTERNED[key] = style
+        return style
+
+    @classmethod
+    def of(cls, color: (tuple, list), font: (dict, tuple)) -> "Style":
+        """Return the Style of a legacy color and font, memoized"""
+        key = (
+            color if isinstance(color, tuple) else tuple(color),
+            font if isinstance(font, tuple) else tuple(sorted(font.items())))
+        return cls._LEGACY.get_or_create(key, lambda: cls(color, font))
+
+    def replace(self, color: tuple = None, font: (dict, tuple) = None) -> "Style":
+        """Return the Style with the given color and/or font replaced"""
+        if color is None and font is None:
+            return self
+        return Style.of(self.color if color is None else color, self.font if font is None else font)
+
+    def __setattr__(self, name: str, value: object):
+        raise AttributeError("Style is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("Style is immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        """Intern the Style again when unpickled"""
+        return Style, (self.color, self.font)
+
+    def __repr__(self) -> str:
+        return "Style({!r}, {!r})".format(self.color, self.font)
@@ -0,0 +1,143 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Provides the hierarchical timer wheel that expires, flashes and fades
+the timed labels of an Overlay.
+"""
+# Standard Library
+from itertools import count
+import math
+from threading import Lock
+import time
+
+
+class TimerWheel(object):
+    """
+    Hierarchical timing wheel
+
+    Every level has slots buckets of timers. A bucket of level 0 spans
+    one tick of resolution seconds, a bucket of level n spans slots ** n
+    ticks. Timers are put in the lowest level that covers their delay
+    and move down a level when the bucket they are in comes around, so
+    scheduling and cancelling a timer are O(1) and advancing the wheel
+    only touches the buckets of the ticks that passed. Buckets are only
+    allocated while they hold timers.
+
+    :param resolution: Seconds per tick
+    :param slots: Buckets per level
+    :param levels: Number of levels, timers further away than
+        slots ** levels ticks move down a level every rotation
+    :param clock: Callable returning a monotonic time in seconds
+    """
+
+    def __init__(self, resolution: float = 0.01, slots: int = 64, levels: int = 4, clock: callable = time.monotonic):
+        self._resolution = resolution
+        self._slots = slots
+        self._levels = [dict() for _ in range(levels)]  # slot: {handle: (deadline, payload)}
+        self._clock = clock
+        self._tick = self._ticks(clock())
+        self._where = dict()  # handle: (level, slot)
+        self._handles = count()
+        self._lock = Lock()
+
+    def schedule(self, delay: float, payload: object) -> int:
+        """Schedule a payload to expire after delay seconds, returns the handle of the timer"""
+        handle = next(self._handles)
+        now = self._clock()
+        deadline = -self._ticks(-(now + delay))
+        with self._lock:
+            if len(self._where) == 0:  # Skip the ticks that passed while the wheel was idle
+                self._tick = max(self._tick, self._ticks(now))
+            self._place(handle, max(deadline, self._tick + 1), payload)
+        return handle
+
+    def cancel(self, handle: int) -> bool:
+        """Cancel a timer, returns whether it was pending"""
+        with self._lock:
+            where = self._where.pop(handle, None)
+            if where is None:
+                return False
+            level, slot = where
+            bucket = self._levels[level][slot]
+            del bucket[handle]
+            if len(bucket) == 0:
+                del self._levels[level][slot]
+            return True
+
+    def advance(self) -> list:
+        """Advance the wheel to the clock, returns the payloads of the timers that expired in order"""
+        now = self._ticks(self._clock())
+        expired = list()
+        with self._lock:
+            if len(self._where) == 0:
+                self._tick = max(self._tick, now)
+                return expired
+            while self._tick < now:
+                self._tick += 1
+                for level in range(1, len(self._levels)):  # Move the timers of the buckets that came around down
+                    span = self._slots ** level
+                    if self._tick % span != 0:
+                        break
+                    bucket = self._levels[level].pop(self._tick // span % self._slots, None)
+                    for handle, (deadline, payload) in (bucket or dict()).items():
+                        self._place(handle, deadline, payload)
+                bucket = self._levels[0].pop(self._tick % self._slots, None)
+                for handle, (_, payload) in sorted((bucket or dict()).items(), key=lambda item: item[1][0]):
+                    del self._where[handle]
+                    expired.append(payload)
+        return expired
+
+    def next_deadline(self) -> (float, None):
+        """
+        Return a time of the clock at which advance() should be called
+
+        This is the time of the first timer in the current rotation of
+        level 0, or else the end of that rotation, when the timers of the
+        higher levels move down. None if there are no timers.
+        """
+        with self._lock:
+            if len(self._where) == 0:
+                return None
+            end = (self._tick // self._slots + 1) * self._slots
+            for tick in range(self._tick + 1, end):
+                if tick % self._slots in self._levels[0]:
+                    return tick * self._resolution
+            return end * self._resolution
+
+    def _ticks(self, seconds: float) -> int:
+        """Return the tick of a time, tolerating the rounding of the times of ticks"""
+        return math.floor(seconds / self._resolution + 1e-6)
+
+    def _place(self, handle: int, deadline: int, payload: object):
+        """Put a timer in the bucket of the lowest level that covers its deadline"""
+        delta, level = deadline - self._tick, 0
+        while delta >= self._slots ** (level + 1) and level < len(self._levels) - 1:
+            level += 1
+        slot = deadline // self._slots ** level % self._slots
+        self._levels[level].setdefault(slot, dict())[handle] = (deadline, payload)
+        self._where[handle] = (level, slot)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+
+class Timed(object):
+    """
+    Timers and state of a timed label
+
+    :param style: Style of the label when not flashed or faded
+    :param period: Seconds between switches of the flash color
+    :param step: Seconds between the steps of the fade
+    """
+
+    __slots__ = ("style", "period", "step", "handles", "flashing", "faded")
+
+    def __init__(self, style: object, period: (float, None), step: (float, None)):
+        self.style = style
+        self.period = period
+        self.step = step
+        self.handles = dict()  # Kind of timer: handle
+        self.flashing = False
+        self.faded = 0
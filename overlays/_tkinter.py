@@ -4,12 +4,20 @@ License: GNU GPLv3
 Copyright (c) 2018 RedFantom
 """
 # Standard Library
-from threading import Thread
+import math
+import os
+from threading import current_thread, Event, Lock, Thread
 # Packages
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import tkinter as tk
+from tkinter import font as tkfont
 # Project Modules
-from ._overlay import Overlay
+from ._fonts import FontCache
+from ._imaging import IMAGE_CACHE, to_image
+from ._layout import RowLayout
+from ._overlay import Label, Overlay, Row
+from ._pool import RowPool
+from ._style import Style
 
 
 class TkinterOverlay(tk.Tk, tk.Toplevel, Thread, Overlay):
@@ -25,30 +33,53 @@ class TkinterOverlay(tk.Tk, tk.Toplevel, Thread, Overlay):
     In the first case, the mainloop of the window is run in a separate
     thread.
 
+    In the "widgets" mode every row is a gridded tk.Label. In the
+    "canvas" mode the rows are text and image items on a single
+    tk.Canvas, so that changing a row only reconfigures or moves the
+    items of the rows affected, without geometry management. In both
+    modes, the widgets or items of removed rows are hidden and kept in
+    a pool of POOL_SIZE rows, to be reused by rows added later.
+
     :param master: master tk.Tk instance if used in a Tkinter program
     :param background: Background colour of the Overlay if transparency
         is not supported on the platform.
+    :param mode: "widgets" or "canvas"
     """
 
-    DEFAULT_COLOR = (0, 0, 0)
-    DEFAULT_FONT = ("default", 11, False, False)
+    MODES = ("widgets", "canvas")
+    PADDING = (5, 5)  # Horizontal padding and spacing between rows
+    POOL_SIZE = 16
 
-    def __init__(self, position: tuple, size: tuple, name: str, master: tk.Tk = None, background: str = "darkblue"):
+    def __init__(
+            self, position: tuple, size: tuple, name: str, master: tk.Tk = None,
+            background: str = "darkblue", mode: str = "widgets"):
         """Initialize the window with the appropriate parent classes"""
+        if mode not in self.MODES:
+            raise ValueError("Unknown mode: {}".format(mode))
         Overlay.__init__(self, position, size, name)
         self._bg = background
+        self._mode = mode
         self._size, self._position, self._name = size, position, name
+        self._rows = dict()  # Row number: Row owning a tk.Label, or a text and an image canvas item
+        self._pool = RowPool(self.POOL_SIZE)
+        self._canvas = None
+        self._layout = RowLayout()
+        self._fonts = FontCache(self._build_font, self._release_font)
+        self._ready = False
+        self._pending = None  # (due time, after id) of the scheduled tick
+        self._schedule_lock = Lock()
+        self._thread, self._pipe = None, None
+        self._closing, self._destroyed = False, Event()
 
         if master is not None:
             tk.Toplevel.__init__(self, master)
             self._parent = tk.Toplevel
+            self._init_window()
         else:
             Thread.__init__(self)
             self._parent = tk.Tk
             self.start()
 
-        self._labels = dict()
-
     def _init_window(self):
         """Apply special Overlay attributes"""
         self._update_geometry()
@@ -60,34 +91,205 @@ class TkinterOverlay(tk.Tk, tk.Toplevel, Thread, Overlay):
             self.wm_attributes("-transparentcolor", "darkblue")
         except tk.TclError:
             self.wm_attributes("-alpha", 0.75)
+        # Transparent pixels of images are keyed to the background
+        self._key = tuple(c >> 8 for c in self.winfo_rgb(self._bg))
+        if self._mode == "canvas":
+            self._canvas = tk.Canvas(self, background=self._bg, highlightthickness=0, borderwidth=0)
+            self._canvas.pack(fill=tk.BOTH, expand=True)
+        self._thread = current_thread()
+        self._init_pipe()
+        self._ready = True
+        self._schedule()
+
+    def _init_pipe(self):
+        """
+        Create a pipe through which other threads wake up the Tk thread
+
+        Calling into Tk from another thread blocks that thread until the
+        Tk thread has executed the call. Writing to the pipe does not,
+        so producers do not have to wait for the Tk thread.
+        """
+        if not hasattr(self.tk, "createfilehandler"):  # Only available on Unix
+            return
+        self._pipe = os.pipe()
+        for fd in self._pipe:
+            os.set_blocking(fd, False)
+        self.tk.createfilehandler(self._pipe[0], tk.READABLE, self._wake)
+
+    def _wake(self, *_):
+        """Called in the Tk thread when another thread wrote to the pipe"""
+        try:
+            os.read(self._pipe[0], 4096)
+        except BlockingIOError:
+            pass
+        if self._closing:
+            self._destroy()
+            return
+        self._schedule()
 
     def _update_geometry(self):
         """Update the geometry of the window"""
         self.wm_geometry("{}x{}+{}+{}".format(*self._size, *self._position))
 
-    def add_label(
-            self, row: int, text: str, image: str = None,
-            color: tuple = DEFAULT_COLOR, font: (dict, tuple) = DEFAULT_FONT) -> (str, None):
-        """Create a new tk.Label to insert into the Overlay"""
-        if image is not None:
-            image = ImageTk.PhotoImage(Image.open(image), master=self)
-        font = self._process_font(font)
-        color = self._color_tuple_to_hex(color)
-        self._labels[row] = tk.Label(
-            self, text=text, image=image, compound=tk.LEFT,
-            foreground=color, font=font, background=self._bg)
-        self._labels[row].grid(row=row, column=0, sticky="nsw", padx=5, pady=(0, 5))
-        return str(row)
-
-    def remove_label(self, ident: str) -> None:
-        """Remove a Label from the grid"""
-        row = int(ident)
-        self._labels[row].grid_forget()
-        del self._labels[row]
+    def _apply(self, changed: dict, removed: set):
+        """Create or reconfigure the tk.Labels of the changed rows"""
+        if self._mode == "canvas":
+            self._apply_items(changed, removed)
+            return
+        for row in removed:
+            row = self._rows.pop(row)
+            row.text.grid_remove()
+            self._pool.put(row)
+        for number, label in changed.items():
+            if number in self._rows:
+                self._configure_widget(self._rows[number], label)
+                continue
+            row = self._pool.get()
+            if row is None:
+                self._rows[number] = self._create_widget(label)
+                continue
+            self._configure_widget(row, label)
+            row.text.grid(row=label.row)  # The other grid options are kept by grid_remove
+            self._rows[number] = row
+
+    def _configure_widget(self, row: Row, label: Label):
+        """Reconfigure only the properties of the tk.Label of a row that changed"""
+        fields, options = label.changed(row.label), dict()
+        if "text" in fields:
+            options["text"] = label.text
+        if "color" in fields:
+            options["foreground"] = label.style.hex
+        if "font" in fields:
+            options["font"] = self._fonts.font(label.font)
+        if "image" in fields:
+            row.image = self._build_image(label.image)  # Keeps a reference to the PhotoImage
+            options["image"] = row.image if row.image is not None else ""
+        if len(options) > 0:
+            row.text.configure(**options)
+        row.label = label
+
+    def _create_widget(self, label: Label) -> Row:
+        """Create and grid a new tk.Label for a row"""
+        row = Row(label, image=self._build_image(label.image))
+        row.text = row.own(tk.Label(
+            self, text=label.text, image=row.image, compound=tk.LEFT,
+            foreground=label.style.hex,
+            font=self._fonts.font(label.font), background=self._bg), tk.Label.destroy)
+        row.text.grid(row=label.row, column=0, sticky="nsw", padx=5, pady=(0, 5))
+        return row
+
+    def _apply_items(self, changed: dict, removed: set):
+        """Create or reconfigure the canvas items of the changed rows and move the rows below"""
+        for row in removed:
+            row = self._rows.pop(row)
+            self._canvas.itemconfigure(row.text, state=tk.HIDDEN)
+            self._canvas.itemconfigure(row.widget, state=tk.HIDDEN)
+            self._pool.put(row)
+        for number, label in changed.items():
+            if number in self._rows:
+                self._configure_items(self._rows[number], label)
+                continue
+            row = self._pool.get()
+            if row is None:
+                row = self._rows[number] = Row(label, image=self._build_image(label.image))
+                row.text = row.own(self._canvas.create_text(
+                    0, 0, anchor=tk.W, text=label.text, fill=label.style.hex,
+                    font=self._fonts.font(label.font)), self._canvas.delete)
+                row.widget = row.own(self._canvas.create_image(
+                    0, 0, anchor=tk.NW, image=row.image if row.image is not None else ""), self._canvas.delete)
+                continue
+            self._configure_items(row, label, state=tk.NORMAL)
+            self._canvas.itemconfigure(row.widget, state=tk.NORMAL)
+            self._rows[number] = row
+        heights = {
+            row: self._layout[row][1] if row in self._layout and row not in changed else self._row_height(row)
+            for row in self._rows}
+        moved, _ = self._layout.update(heights, set(changed))  # The canvas repaints the items itself
+        for row in moved:
+            self._place_items(row, *self._layout[row])
+
+    def _configure_items(self, row: Row, label: Label, **options):
+        """Reconfigure only the properties of the canvas items of a row that changed"""
+        fields = label.changed(row.label)
+        if "text" in fields:
+            options["text"] = label.text
+        if "color" in fields:
+            options["fill"] = label.style.hex
+        if "font" in fields:
+            options["font"] = self._fonts.font(label.font)
+        if "image" in fields:
+            row.image = self._build_image(label.image)
+            self._canvas.itemconfigure(row.widget, image=row.image if row.image is not None else "")
+        if len(options) > 0:
+            self._canvas.itemconfigure(row.text, **options)
+        row.label = label
+
+    def _row_height(self, row: int) -> int:
+        """Return the height of a row in canvas mode, including spacing"""
+        row = self._rows[row]
+        lines = row.label.text.count("\n") + 1
+        height = self._fonts.font(row.label.font).metrics("linespace") * lines
+        if row.image is not None:
+            height = max(height, row.image.height())
+        return height + self.PADDING[1]
+
+    def _place_items(self, row: int, top: int, height: int):
+        """Move the items of a row in canvas mode"""
+        row = self._rows[row]
+        content = height - self.PADDING[1]
+        x = self.PADDING[0]
+        if row.image is not None:
+            self._canvas.coords(row.widget, x, top + (content - row.image.height()) // 2)
+            x += row.image.width()
+        self._canvas.coords(row.text, x, top + content // 2)
+
+    def _faded(self, style: Style, opacity: float) -> Style:
+        """Fade the color into the transparent background, as Tk colors have no alpha"""
+        return self._blend(style, self._key, opacity)
+
+    def _build_image(self, path: (str, None)) -> (ImageTk.PhotoImage, None):
+        """Build a PhotoImage with transparency keyed to the background"""
+        if path is None:
+            return None
+        image = IMAGE_CACHE.load(path, ("tk", self._key), lambda decoded: to_image(decoded, self._key))
+        return ImageTk.PhotoImage(image, master=self)
 
     def update(self):
-        """Not required for TkinterOverlay"""
-        pass
+        """Apply the changes to the labels to the window immediately"""
+        self._flush()
+
+    def _invalidate(self):
+        """Request a frame and schedule it in the Tk event loop"""
+        Overlay._invalidate(self)
+        self._schedule()
+
+    def _schedule(self):
+        """Schedule a tick of the FrameScheduler if a frame is required"""
+        pipe = self._pipe
+        if pipe is not None and current_thread() is not self._thread:
+            try:
+                os.write(pipe[1], b"\0")
+            except BlockingIOError:
+                pass  # The pipe is full, so the Tk thread will wake up
+            except OSError:
+                pass  # The pipe was closed by destroy
+            return
+        with self._schedule_lock:
+            delay = self._scheduler.delay()
+            if not self._ready or delay is None:
+                return
+            due = self._scheduler.clock() + delay
+            if self._pending is not None:
+                if self._pending[0] <= due:
+                    return
+                self.after_cancel(self._pending[1])  # Frame required before the deadline of a timer
+            self._pending = (due, self.after(int(math.ceil(delay * 1000)), self._tick))
+
+    def _tick(self):
+        """Draw a frame if due and schedule the next one if required"""
+        self._pending = None
+        self._scheduler.tick()
+        self._schedule()
 
     def run(self):
         """Run the Tkinter mainloop if required"""
@@ -106,15 +308,63 @@ class TkinterOverlay(tk.Tk, tk.Toplevel, Thread, Overlay):
         x, y, w, h = map(int, (x, y, w, h))
         return x, y, x + w, y + h
 
+    def destroy(self):
+        """
+        Destroy the window in the Tk thread
+
+        File handlers may only be deleted by the thread that runs Tk, so
+        when called from another thread, the Tk thread is woken up
+        through the pipe to destroy the window, and waited for.
+        """
+        if self._pipe is None or current_thread() is self._thread:
+            self._destroy()
+            return
+        self._closing = True
+        try:
+            os.write(self._pipe[1], b"\0")
+        except BlockingIOError:
+            pass  # The pipe is full, so the Tk thread will wake up
+        while not self._destroyed.wait(0.05):
+            if self._parent is tk.Tk and not self.is_alive():  # The Tk thread will never wake up
+                pipe, self._pipe = self._pipe, None
+                for fd in pipe or ():
+                    os.close(fd)
+                return
+        if self._parent is tk.Tk:
+            Thread.join(self)  # Its mainloop exits once the window is destroyed
+
+    def _destroy(self):
+        """Release the rows, the fonts and the pipe and destroy the window"""
+        self._ready = False
+        try:
+            rows, self._rows = self._rows, dict()
+            for row in rows.values():
+                row.release()
+            self._pool.clear()
+            self._fonts.clear()
+            if self._pipe is not None:
+                self.tk.deletefilehandler(self._pipe[0])
+        finally:
+            pipe, self._pipe = self._pipe, None
+            for fd in pipe or ():
+                os.close(fd)
+            try:
+                self._parent.destroy(self)
+            finally:
+                self._destroyed.set()
+
+    def _build_font(self, family: str, size: int, bold: bool, italics: bool, _: float) -> tkfont.Font:
+        """Build a Tkinter Font from a normalized font key"""
+        return tkfont.Font(
+            root=self, family=family, size=size,
+            weight=tkfont.BOLD if bold else tkfont.NORMAL,
+            slant=tkfont.ITALIC if italics else tkfont.ROMAN)
+
     @staticmethod
-    def _process_font(font: (dict, tuple)):
-        """Process a font dictionary or tuple into a Tkinter font tuple"""
-        if isinstance(font, dict):
-            font = Overlay._font_dict_to_tuple(font)
-        family, size, bold, italics = font
-        font = (family, size)
-        if bold is True:
-            font += ("bold",)
-        if italics is True:
-            font += ("italic",)
-        return font
+    def _release_font(font: tkfont.Font):
+        """Delete a named Tkinter Font, widgets using it keep a copy"""
+        try:
+            font.tk.call("font", "delete", font.name)
+        except tk.TclError:
+            pass
+        font.delete_font = False
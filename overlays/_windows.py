@@ -7,19 +7,47 @@ Provides a Win32 (through pywin32) based Overlay that supports a
 transparent background, multi-line text and images.
 """
 # Standard Library
+import ctypes
+from ctypes import wintypes
 import os
 import random
 import sys
 from threading import Thread
 import time
 # Packages
-from PIL import Image
+import numpy as np
 import win32api as api
 import win32con as con
 import win32gui as gui
 import win32ui as ui
 # Project Modules
-from ._overlay import Overlay
+from ._fonts import FontCache
+from ._imaging import IMAGE_CACHE, to_bitmap
+from ._layout import RowLayout
+from ._sprites import SPRITE_CACHE, render_text
+from ._style import Style
+from ._overlay import Label, Overlay, Row
+
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", wintypes.DWORD), ("biWidth", wintypes.LONG), ("biHeight", wintypes.LONG),
+        ("biPlanes", wintypes.WORD), ("biBitCount", wintypes.WORD), ("biCompression", wintypes.DWORD),
+        ("biSizeImage", wintypes.DWORD), ("biXPelsPerMeter", wintypes.LONG), ("biYPelsPerMeter", wintypes.LONG),
+        ("biClrUsed", wintypes.DWORD), ("biClrImportant", wintypes.DWORD),
+    ]
+
+
+class BITMAPINFO(ctypes.Structure):
+    _fields_ = [("bmiHeader", BITMAPINFOHEADER), ("bmiColors", wintypes.DWORD * 1)]
+
+
+# win32gui.CreateBitmap only accepts NULL bits, so DIB sections are created through ctypes
+GDI32 = ctypes.WinDLL("gdi32")
+GDI32.CreateDIBSection.restype = wintypes.HBITMAP
+GDI32.CreateDIBSection.argtypes = (
+    wintypes.HDC, ctypes.POINTER(BITMAPINFO), wintypes.UINT,
+    ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD)
 
 
 class WindowsOverlay(Overlay, Thread):
@@ -33,32 +61,41 @@ class WindowsOverlay(Overlay, Thread):
 
     DEFAULT_COLOR = (0, 0, 0)
     DEFAULT_FONT = ("Calibri", 12, False, False)
+    COLOR_KEY = (255, 255, 255)  # Matches the key of SetLayeredWindowAttributes
+    IDLE_INTERVAL = 0.05  # Maximum seconds between pumping messages when idle
+    TEXT_SPRITES = True  # Blit text pre-rendered with PIL instead of drawing it with GDI
 
-    def __init__(self, position: tuple, size: tuple,  name: str):
+    def __init__(self, position: tuple, size: tuple,  name: str, loop: object = None):
         """Initialize the libraries and attributes"""
         Overlay.__init__(self, position, size, name)
         Thread.__init__(self)
         self._position = position
         self._size = size
+        self._loop = loop  # OverlayManager loop that draws the frames
 
         self._h_instance = None
         self._class_name = name
         self._window_class = None
         self._window_class_atom = None
         self._ex_style = None
-        self._style = None
+        self._window_style = None
         self._window_handle = None
         self._error = None
         self._window = None
         self.__init = False
 
-        self._labels = dict()
+        self._rows = dict()  # Row number: Row owning the bitmaps of the text and the image
+        self._layout = RowLayout()
+        self._damage = list()  # (top, height) spans to invalidate after a flush
+        self._fonts = FontCache(self._build_font, gui.DeleteObject)
+        self._sprites = SPRITE_CACHE
         self._index = 0
 
         self._init_win32()
         self._init_style()
         self._init_window()
-        self.start()
+        if loop is None:
+            self.start()
 
     def _init_win32(self):
         """Initialize the window and its attributes"""
@@ -78,7 +115,7 @@ class WindowsOverlay(Overlay, Thread):
         """Initialize drawing style of the overlay"""
         self._ex_style = con.WS_EX_COMPOSITED | con.WS_EX_LAYERED | \
             con.WS_EX_NOACTIVATE | con.WS_EX_TOPMOST | con.WS_EX_TRANSPARENT
-        self._style = con.WS_DISABLED | con.WS_POPUP | con.WS_VISIBLE
+        self._window_style = con.WS_DISABLED | con.WS_POPUP | con.WS_VISIBLE
 
     def _init_window(self):
         """Initialize the actual window and show it"""
@@ -86,7 +123,7 @@ class WindowsOverlay(Overlay, Thread):
             self._ex_style,  # External style
             self._window_class_atom,  # Window class
             self._class_name,  # Window title
-            self._style,  # Window style
+            self._window_style,  # Window style
             self._position[0],  # X coordinate
             self._position[1],  # y coordinate
             self._size[0],  # Width
@@ -115,7 +152,12 @@ class WindowsOverlay(Overlay, Thread):
         if message == con.WM_PAINT:
             return self._paint(window, message, w, l)
         elif message == con.WM_DESTROY:
-            gui.PostQuitMessage(0)
+            rows, self._rows = self._rows, dict()
+            for row in rows.values():
+                row.release()
+            self._fonts.clear()
+            if self._loop is None:  # The loop of an OverlayManager hosts other windows
+                gui.PostQuitMessage(0)
             return 0
         else:
             return gui.DefWindowProc(window, message, w, l)
@@ -125,32 +167,47 @@ class WindowsOverlay(Overlay, Thread):
         try:
             if not self.__init:
                 return
+            start = time.perf_counter() if self._stats is not None else None
             handle, paint = gui.BeginPaint(window)
             r = self.rectangle
-            y, w, h = 0, r[2] - r[0], r[3] - r[1]
-            for _, (text, image, color, font) in sorted(self._labels.copy().items(), key=lambda k: k[0]):
+            w = r[2] - r[0]
+            _, top, _, bottom = paint[2]  # Only the rows in the invalidated rectangle are drawn
+            dpi_scale = self._get_dpi_scale(handle)
+            previous = None
+            rows = self._rows
+            for row, y, h in self._layout.rows(top, bottom):
+                row = rows.get(row)
+                if row is None:
+                    continue
                 x = 0
-                if image is not None:
-                    x = self._draw_image(handle, paint, (0, y, w, h - y), image)
-                box = (x, y, w, h - y)
-                _y, _ = self._draw_text(handle, box, text, color, font)
-                y += _y
+                if row.image is not None:
+                    x = self._draw_image(handle, paint, (0, y, w, y + h), row.image)
+                box = (x, y, w, y + h)
+                if row.text is not None:
+                    self._draw_image(handle, paint, box, row.text)
+                    continue
+                selected = gui.SelectObject(handle, self._fonts.font(row.label.font, dpi_scale))
+                previous = selected if previous is None else previous
+                self._draw_text(handle, box, row.label.text, row.label.style.colorref)
+            if previous is not None:  # Fonts may not be deleted while selected
+                gui.SelectObject(handle, previous)
             gui.EndPaint(window, paint)
+            if start is not None:
+                self._stats.paint(time.perf_counter() - start)
             return 0
         except Exception as e:
             self._error = e
             return -1
 
-    def _draw_text(self, handle: int, box: tuple, text: str, color: tuple, font: (dict, tuple)) -> tuple:
-        """Draw text in the given location"""
-        font = self._build_font(font, self._get_dpi_scale(handle))
-        gui.SelectObject(handle, font)
-        gui.SetTextColor(handle, self._color(color))
+    @staticmethod
+    def _draw_text(handle: int, box: tuple, text: str, color: int) -> tuple:
+        """Draw text in the given location with the selected font and COLORREF color"""
+        gui.SetTextColor(handle, color)
         return gui.DrawText(handle, text, -1, box, con.DT_NOCLIP | con.DT_LEFT | con.DT_SINGLELINE | con.DT_TOP)
 
-    def _build_font(self, font: (dict, tuple), dpi_scale: float)->int:
-        """Build a font from the given font options"""
-        family, size, bold, italics = self._font_dict_to_tuple(font)
+    @staticmethod
+    def _build_font(family: str, size: int, bold: bool, italics: bool, dpi_scale: float)->int:
+        """Build a font from the given normalized font key"""
         font = gui.LOGFONT()
         if family != "default":
             font.lfFaceName = family
@@ -160,26 +217,39 @@ class WindowsOverlay(Overlay, Thread):
         font.lfItalic = italics
         return gui.CreateFontIndirect(font)
 
-    def _draw_image(self, handle: int, paint, box: tuple, image: Image.Image) -> int:
-        """Draw an image in the overlay at the specified location"""
-        pixels = image.convert("RGBA").load()
-        w, h = image.size
+    def _draw_image(self, handle: int, paint, box: tuple, image: tuple) -> int:
+        """Blit a prepared bitmap in the overlay at the specified location"""
+        bitmap, w, h = image
         l, t, r, b = box
-        for x in range(w):
-            for y in range(h):
-                _x, _y = l + x, t + y
-                c = pixels[x, y]
-                if c[3] == 0:
-                    c = (255, 255, 255)
-                else:
-                    c = c[:3]
-                # print("{} -> {:08x}".format(pixels[x, y], c))
-                _c = gui.SetPixel(handle, _x, _y, self._color(c))
-                # if _c != c:
-                #     print("Requested: {}, Set: {}".format(c, _c))
-                # break
+        source = gui.CreateCompatibleDC(handle)
+        previous = gui.SelectObject(source, bitmap)
+        gui.BitBlt(handle, l, t, w, h, source, 0, 0, con.SRCCOPY)
+        gui.SelectObject(source, previous)
+        gui.DeleteDC(source)
         return w
 
+    @staticmethod
+    def _build_bitmap(pixels: np.ndarray) -> tuple:
+        """Build a native top-down 32-bit DIB section from a BGRA pixel buffer"""
+        h, w = pixels.shape[:2]
+        info = BITMAPINFO()
+        info.bmiHeader.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        info.bmiHeader.biWidth, info.bmiHeader.biHeight = w, -h  # Negative height: first row at the top
+        info.bmiHeader.biPlanes, info.bmiHeader.biBitCount = 1, 32
+        info.bmiHeader.biCompression = con.BI_RGB
+        bits = ctypes.c_void_p()
+        bitmap = GDI32.CreateDIBSection(None, ctypes.byref(info), con.DIB_RGB_COLORS, ctypes.byref(bits), None, 0)
+        if not bitmap:
+            raise ctypes.WinError()
+        data = np.ascontiguousarray(pixels, dtype=np.uint8)
+        ctypes.memmove(bits, data.ctypes.data, w * h * 4)
+        return bitmap, w, h
+
+    @staticmethod
+    def _release_bitmap(bitmap: tuple):
+        """Release a native bitmap built by _build_bitmap"""
+        gui.DeleteObject(bitmap[0])
+
     def update(self):
         """Update the window"""
         if self.__init is False:
@@ -191,31 +261,107 @@ class WindowsOverlay(Overlay, Thread):
         gui.UpdateWindow(self._window)
         gui.SetWindowPos(self._window, None, self._position[0], self._position[1], 0, 0, con.SWP_NOSIZE)
         gui.SetLayeredWindowAttributes(self._window, 0x00ffffff, 0xff, con.LWA_COLORKEY | con.LWA_ALPHA)
-        gui.RedrawWindow(self._window, None, None, con.RDW_INVALIDATE | con.RDW_ERASE)
+        if self._flush():
+            damage, self._damage = self._damage, list()
+            r = self.rectangle
+            for top, height in damage:
+                gui.InvalidateRect(self._window, (r[0], top, r[2], top + height), True)
         gui.PumpWaitingMessages()
 
+    def _frame(self):
+        """Draw a frame, called by the FrameScheduler"""
+        self.update()
+
+    def _invalidate(self):
+        """Request a frame and wake up the loop of the OverlayManager"""
+        Overlay._invalidate(self)
+        if self._loop is not None:
+            self._loop.notify()
+
     def run(self):
-        """Run the loop to update the window"""
+        """Run the loop to update the window when it has been invalidated"""
         while True:
             try:
-                self.update()
+                if self._scheduler.wait(self.IDLE_INTERVAL):
+                    self._scheduler.tick()
+                elif gui.PumpWaitingMessages():  # WM_QUIT
+                    break
             except RuntimeError as e:
                 if e.args == ("Window is not initialized",):
                     break
                 raise
 
-    def add_label(
-            self, row: int, text: str, image: str = None,
-            color: tuple = DEFAULT_COLOR, font: (dict, tuple) = DEFAULT_FONT) -> (str, None):
-        """Create a new label in the Labels dictionary to be drawn"""
-        if image is not None:
-            image = self._open_image(image)
-        self._labels[row] = (text, image, color, font)
-        return str(row)
+    def _apply(self, changed: dict, removed: set):
+        """Prepare the changed rows for drawing in the next paint"""
+        rows, released = self._rows.copy(), list()
+        for row in removed:
+            released.append(rows.pop(row))
+        handle = gui.GetDC(self._window)
+        try:
+            dpi_scale = self._get_dpi_scale(handle)
+            for row, label in changed.items():
+                rows[row] = self._prepare_row(label, rows.get(row), released, dpi_scale)
+            self._rows = rows  # Swapped to not change the dict during a paint
+            heights = self._measure(handle, dpi_scale, rows, set(changed))
+        finally:
+            gui.ReleaseDC(self._window, handle)
+        for row in released:  # Only owns the bitmaps that are no longer used
+            row.release()
+        _, spans = self._layout.update(heights, set(changed))
+        self._damage.extend(spans)
+
+    def _prepare_row(self, label: Label, previous: (Row, None), released: list, dpi_scale: float) -> Row:
+        """
+        Build a new Row for a changed label
+
+        The bitmaps of the previous Row that are still valid are
+        transferred to the new Row, the previous Row is added to the
+        released Rows with the bitmaps that are not.
+        """
+        fields = label.changed(previous.label) if previous is not None else set(Label.FIELDS)
+        row = Row(label)
+        if "image" not in fields:
+            row.image = row.own(previous.image, previous.disown(previous.image))
+        elif label.image is not None:
+            row.image = row.own(self._build_bitmap(self._open_image(label.image)), self._release_bitmap)
+        if len(fields - {"image"}) == 0:
+            row.text = row.own(previous.text, previous.disown(previous.text))
+        elif self.TEXT_SPRITES:
+            row.text = row.own(self._build_bitmap(self._text_sprite(label, dpi_scale)), self._release_bitmap)
+        if previous is not None:
+            released.append(previous)
+        return row
+
+    def _faded(self, style: Style, opacity: float) -> Style:
+        """Fade the color into the color key, as the window is not per-pixel transparent"""
+        return self._blend(style, self.COLOR_KEY, opacity)
+
+    def _text_sprite(self, label: Label, dpi_scale: float) -> np.ndarray:
+        """Return the cached color-keyed BGRA sprite of the text of a row"""
+        key = self.COLOR_KEY
+        return self._sprites.sprite(
+            label.text, label.font, label.color, dpi_scale, ("BGRA", key),
+            lambda *args: to_bitmap(render_text(*args), key, "BGRA", alpha=128))
 
-    def remove_label(self, ident: str):
-        """Remove a Label from the Labels dictionary"""
-        del self._labels[int(ident)]
+    def _measure(self, handle: int, dpi_scale: float, rows: dict, changed: set) -> dict:
+        """Return the heights of the rows, measuring only those that changed"""
+        heights = {row: self._layout[row][1] for row in rows if row not in changed and row in self._layout}
+        previous = None
+        try:
+            for number in rows.keys() - heights.keys():
+                row = rows[number]
+                image = row.image[2] if row.image is not None else 0
+                if row.text is not None:
+                    heights[number] = max(row.text[2], image)
+                    continue
+                selected = gui.SelectObject(handle, self._fonts.font(row.label.font, dpi_scale))
+                previous = selected if previous is None else previous
+                flags = con.DT_CALCRECT | con.DT_SINGLELINE
+                heights[number] = max(gui.DrawText(handle, row.label.text, -1, (0, 0, 0, 0), flags)[0], image)
+        finally:
+            if previous is not None:
+                gui.SelectObject(handle, previous)
+        return heights
 
     @property
     def rectangle(self):
@@ -229,30 +375,15 @@ class WindowsOverlay(Overlay, Thread):
         return gui.SendMessage(self._window, con.WM_CLOSE, None, None)
 
     @staticmethod
-    def _open_image(file: str) -> Image:
-        """Load an image from a file"""
+    def _open_image(file: str) -> np.ndarray:
+        """Load an image from a file as a color-keyed BGRA pixel buffer"""
         if not os.path.exists(file):
             raise FileNotFoundError("Image file does not exist")
-        """
-        if not file.endswith(".bmp"):
-            path = os.path.join(tempfile.gettempdir(), os.path.basename(file[:-4] + ".bmp"))
-            img = Image.open(file)
-            img.save(path)
-        else:
-            path = file
-            img = Image.open(path)
-        image = gui.LoadImage(0, path, con.IMAGE_BITMAP, 0, 0, con.LR_LOADFROMFILE | con.LR_LOADFROMFILE)
-        return (image,) + img.size
-        """
-        return Image.open(file)
+        key = WindowsOverlay.COLOR_KEY
+        return IMAGE_CACHE.load(file, ("BGRA", key), lambda image: to_bitmap(image, key, "BGRA"))
 
     @staticmethod
     def _get_dpi_scale(handle: int) -> float:
         """Return the DPI scaling factor"""
         return ui.GetDeviceCaps(handle, con.LOGPIXELSX) / 60.0
 
-    @staticmethod
-    def _color(color: tuple) -> int:
-        if len(color) == 3:
-            return eval("0x{2:02x}{1:02x}{0:02x}".format(*color))
-        return eval("0x{3:02x}{2:02x}{1:02x}{0:02x}".format(*color))
@@ -0,0 +1,421 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Benchmarks for the Overlay backends. On Linux, run them under Xvfb:
+
+    xvfb-run python -m overlays.bench tkinter gtk -o results.json
+    xvfb-run python -m overlays.bench tkinter --compare results.json
+    python -m overlays.bench headless --imports
+    xvfb-run python -m overlays.bench tkinter --soak 1000000
+
+The results are written as JSON. With --compare, every metric is
+compared to a saved baseline and the exit status is 1 if any metric
+regressed by more than the threshold.
+
+Metric names end in their unit: _s (seconds per operation, lower is
+better), _bytes (lower is better), _count (lower is better) or _per_s
+(higher is better).
+"""
+# Standard Library
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+class TkinterBackend(object):
+    """TkinterOverlays hosted by a hidden Tk root in the calling thread"""
+
+    MODE = "widgets"
+
+    def __init__(self):
+        import tkinter as tk
+        self._root = tk.Tk()
+        self._root.withdraw()
+
+    def create(self, position: tuple = (0, 0), size: tuple = (200, 800)):
+        from ._tkinter import TkinterOverlay
+        return TkinterOverlay(position, size, "Benchmark", master=self._root, mode=self.MODE)
+
+    @staticmethod
+    def sync(overlay):
+        """Apply the changes and process the resulting layout and redraw"""
+        overlay.update()
+        overlay.update_idletasks()
+
+    def close(self):
+        self._root.destroy()
+
+
+class TkinterCanvasBackend(TkinterBackend):
+    """TkinterOverlays that draw their rows as items on a tk.Canvas"""
+
+    MODE = "canvas"
+
+
+class GtkBackend(object):
+    """GtkOverlays whose events are processed in the calling thread"""
+
+    MODE = "widgets"
+
+    def __init__(self):
+        from ._manager import GtkLoop
+        self._loop = GtkLoop(None)
+
+    def create(self, position: tuple = (0, 0), size: tuple = (200, 800)):
+        from ._gtk import GtkOverlay
+        return GtkOverlay(position, size, "Benchmark", loop=self._loop, mode=self.MODE)
+
+    @staticmethod
+    def sync(overlay):
+        """Apply the changes and process the resulting layout and redraw"""
+        from gi.repository import Gtk
+        overlay.update()
+        while Gtk.events_pending():
+            Gtk.main_iteration_do(False)
+
+    def close(self):
+        pass
+
+
+class GtkCairoBackend(GtkBackend):
+    """GtkOverlays that draw their rows with PangoCairo"""
+
+    MODE = "cairo"
+
+
+class HeadlessBackend(object):
+    """HeadlessOverlays that render into NumPy frame buffers"""
+
+    @staticmethod
+    def create(position: tuple = (0, 0), size: tuple = (200, 800)):
+        from ._headless import HeadlessOverlay
+        return HeadlessOverlay(position, size, "Benchmark")
+
+    @staticmethod
+    def sync(overlay):
+        """Apply the changes and render them"""
+        overlay.update()
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    "tkinter": TkinterBackend,
+    "tkinter-canvas": TkinterCanvasBackend,
+    "gtk": GtkBackend,
+    "gtk-cairo": GtkCairoBackend,
+    "headless": HeadlessBackend,
+}
+
+
+def measure(function: callable, number: int) -> float:
+    """Return the mean duration of function(i) in seconds"""
+    start = time.perf_counter()
+    for i in range(number):
+        function(i)
+    return (time.perf_counter() - start) / number
+
+
+def rss() -> (int, None):
+    """Return the resident memory of this process in bytes, if available"""
+    try:
+        with open("/proc/self/statm") as fi:
+            return int(fi.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def bench_overlay(backend, number: int) -> dict:
+    """Measure the creation and destruction of Overlays, after one untimed to import the backend"""
+    backend.create().destroy()  # The cost of the first import is measured by bench_import
+    overlays = list()
+    create = measure(lambda i: overlays.append(backend.create()), number)
+    destroy = measure(lambda i: overlays.pop().destroy(), number)
+    return {"create_s": create, "destroy_s": destroy}
+
+
+def bench_labels(backend, overlay, number: int) -> dict:
+    """Measure adding and removing a label, each drawn separately"""
+    from PIL import Image
+    path = os.path.join(tempfile.mkdtemp(), "icon.png")
+    Image.new("RGBA", (32, 32), (255, 0, 0, 255)).save(path)
+
+    def add(i: int):
+        overlay.add_label(i, "Label {}".format(i))
+        backend.sync(overlay)
+
+    def remove(i: int):
+        overlay.remove_label(str(i))
+        backend.sync(overlay)
+
+    def image(i: int):
+        overlay.add_label(0, "Image", image=path)
+        backend.sync(overlay)
+        overlay.remove_label("0")
+        backend.sync(overlay)
+
+    try:
+        return {
+            "add_label_s": measure(add, number),
+            "remove_label_s": measure(remove, number),
+            "image_label_s": measure(image, number),
+        }
+    finally:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+def bench_update_label(backend, overlay, rows: int, number: int) -> dict:
+    """Compare changing a label in place with removing and adding it"""
+    overlay.set_labels({row: "DPS: 0" for row in range(rows)})
+    backend.sync(overlay)
+    row = rows // 2
+
+    def replace(i: int):
+        overlay.remove_label(str(row))
+        backend.sync(overlay)
+        overlay.add_label(row, "DPS: {}".format(i))
+        backend.sync(overlay)
+
+    def mutate(i: int):
+        overlay.update_label(str(row), text="DPS: {}".format(i))
+        backend.sync(overlay)
+
+    return {"remove_add_s": measure(replace, number), "update_label_s": measure(mutate, number)}
+
+
+def bench_full_update(backend, overlay, rows: int, number: int) -> dict:
+    """Measure the throughput of frames in which every row changed"""
+
+    def update(i: int):
+        with overlay.batch():
+            for row in range(rows):
+                overlay.update_label(str(row), text="DPS: {}".format(i))
+        backend.sync(overlay)
+
+    overlay.set_labels({row: "DPS: 0" for row in range(rows)})
+    backend.sync(overlay)
+    return {"full_update_rows_per_s": rows / measure(update, number)}
+
+
+def bench_churn(backend, rows: int, number: int) -> dict:
+    """
+    Measure rotating labels, removing the first row and adding a new last row
+
+    The widgets of removed rows are reused from the pool of backends that
+    have one, so it is measured with and without pool. The number of
+    garbage collections shows how many objects were allocated.
+    """
+    results = dict()
+    for suffix, pooled in (("", True), ("_unpooled", False)):
+        overlay = backend.create()
+        pool = getattr(overlay, "_pool", None)
+        if not pooled:
+            if pool is None:
+                overlay.destroy()
+                break
+            pool.capacity = 0
+        overlay.set_labels({row: "Target {}".format(row) for row in range(rows)})
+        backend.sync(overlay)
+
+        def rotate(i: int):
+            overlay.remove_label(str(i))
+            overlay.add_label(i + rows, "Target {}".format(i + rows))
+            backend.sync(overlay)
+
+        gc.collect()
+        collections = sum(generation["collections"] for generation in gc.get_stats())
+        results["churn{}_s".format(suffix)] = measure(rotate, number)
+        results["churn{}_gc_collections_count".format(suffix)] = \
+            sum(generation["collections"] for generation in gc.get_stats()) - collections
+        if pooled and pool is not None:
+            results["churn_pool_misses_count"] = pool.misses
+        overlay.destroy()
+    return results
+
+
+def bench_memory(backend, labels: int, overlays: int) -> dict:
+    """Measure the resident memory used per label and per Overlay"""
+    results = dict()
+    gc.collect()
+    before = rss()
+    if before is None:
+        return results
+    overlay = backend.create()
+    overlay.set_labels({row: "Label {}".format(row) for row in range(labels)})
+    backend.sync(overlay)
+    gc.collect()
+    results["rss_per_label_bytes"] = (rss() - before) / labels
+    overlay.destroy()
+
+    gc.collect()
+    before = rss()
+    created = [backend.create() for _ in range(overlays)]
+    for overlay in created:
+        backend.sync(overlay)
+    gc.collect()
+    results["rss_per_overlay_bytes"] = (rss() - before) / overlays
+    for overlay in created:
+        overlay.destroy()
+    return results
+
+
+def bench_soak(backend, cycles: int, rows: int = 20, warmup: int = 1000) -> dict:
+    """
+    Measure the growth of memory over cycles that add, update and remove a label
+
+    The growth of the resident memory, the memory traced by tracemalloc
+    and the number of objects tracked by the garbage collector is
+    measured from the end of the warm-up, in which the caches fill up,
+    to the end of the cycles. In a long session, none of them should
+    grow with the number of cycles.
+    """
+    from PIL import Image
+    path = os.path.join(tempfile.mkdtemp(), "icon.png")
+    Image.new("RGBA", (16, 16), (255, 0, 0, 255)).save(path)
+    overlay = backend.create()
+    overlay.set_labels({row: "Static {}".format(row) for row in range(1, rows)})
+    backend.sync(overlay)
+
+    def cycle(i: int):
+        overlay.add_label(0, "DPS: {}".format(i % 100), image=path if i % 3 == 0 else None)
+        backend.sync(overlay)
+        overlay.update_label("0", text="HPS: {}".format(i % 100), color=(255, i % 2 * 255, 0))
+        backend.sync(overlay)
+        overlay.remove_label("0")
+        backend.sync(overlay)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        for i in range(warmup):
+            cycle(i)
+        gc.collect()
+        before = rss(), tracemalloc.get_traced_memory()[0], len(gc.get_objects())
+        duration = measure(cycle, cycles)
+        gc.collect()
+        after = rss(), tracemalloc.get_traced_memory()[0], len(gc.get_objects())
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        overlay.destroy()
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    results = {
+        "soak_cycle_s": duration,
+        "soak_traced_growth_bytes": after[1] - before[1],
+        "soak_objects_growth_count": after[2] - before[2],
+    }
+    if before[0] is not None:
+        results["soak_rss_growth_bytes"] = after[0] - before[0]
+    return results
+
+
+def bench_import(number: int) -> dict:
+    """Measure the startup time of a process importing the package"""
+    environment = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, (root, environment.get("PYTHONPATH"))))
+
+    def start(code: str) -> callable:
+        return lambda i: subprocess.run([sys.executable, "-c", code], env=environment, check=True)
+
+    return {
+        "python_s": measure(start("pass"), number),
+        "import_s": measure(start("import overlays"), number),
+        "import_backend_s": measure(start("import overlays; overlays.Overlay"), number),
+    }
+
+
+def run(backend_name: str, rows: int = 40, number: int = 200, soak: int = 0) -> dict:
+    """Run all benchmarks for a backend, and the soak benchmark if soak is the number of its cycles"""
+    backend = BACKENDS[backend_name]()
+    results = dict()
+    try:
+        results.update(bench_overlay(backend, max(number // 10, 1)))
+        for bench, args in (
+                (bench_labels, (number,)),
+                (bench_update_label, (rows, number)),
+                (bench_full_update, (rows, max(number // 10, 1)))):
+            overlay = backend.create()
+            results.update(bench(backend, overlay, *args))
+            overlay.destroy()
+        results.update(bench_churn(backend, rows, number))
+        results.update(bench_memory(backend, labels=1000, overlays=20))
+        if soak > 0:
+            results.update(bench_soak(backend, soak))
+    finally:
+        backend.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare results to a baseline
+
+    :return: List of (backend, metric, baseline, result, change) of the
+        metrics that regressed by more than the threshold (fraction)
+    """
+    regressions = list()
+    for backend, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(backend, dict()).get(metric)
+            if not reference:
+                continue
+            change = (value - reference) / reference
+            if metric.endswith("_per_s"):
+                change = -change
+            if change > threshold:
+                regressions.append((backend, metric, reference, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Overlay backends")
+    parser.add_argument("backends", nargs="*", help="Backends out of {}".format(", ".join(sorted(BACKENDS))))
+    parser.add_argument("-n", "--number", type=int, default=200, help="Iterations per benchmark")
+    parser.add_argument("-r", "--rows", type=int, default=40, help="Rows of the update benchmarks")
+    parser.add_argument("-o", "--output", help="File to write the JSON results to instead of stdout")
+    parser.add_argument("-c", "--compare", help="JSON file of a baseline to compare the results to")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="Fraction that counts as regression")
+    parser.add_argument("-i", "--imports", action="store_true", help="Measure the import time of the package")
+    parser.add_argument("-s", "--soak", type=int, default=0, help="Cycles of the memory soak benchmark")
+    args = parser.parse_args()
+    if not args.backends and not args.imports:
+        args.backends = ["tkinter"]
+    for name in args.backends:
+        if name not in BACKENDS:
+            parser.error("unknown backend: {}".format(name))
+
+    results = {name: run(name, args.rows, args.number, args.soak) for name in args.backends}
+    if args.imports:
+        results["import"] = bench_import(max(args.number // 10, 1))
+    if args.output is not None:
+        with open(args.output, "w") as fo:
+            json.dump(results, fo, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+    if args.compare is None:
+        return
+    with open(args.compare) as fi:
+        regressions = compare(results, json.load(fi), args.threshold)
+    for backend, metric, reference, value, change in regressions:
+        print("REGRESSION {}.{}: {:.4g} -> {:.4g} ({:+.1%})".format(
+            backend, metric, reference, value, change), file=sys.stderr)
+    if len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Recording of the calls made to an Overlay into a binary trace, and
+replay of traces against any backend as a reproducible benchmark:
+
+    overlay = Recorder(overlay, "session.trace")
+    ...
+    overlay.close()
+
+    xvfb-run python -m overlays.replay session.trace tkinter --realtime
+    python -m overlays.replay session.trace headless -o results.json
+    python -m overlays.replay session.trace headless --compare results.json
+
+A trace starts with a header and the position, size and name of the
+Overlay, followed by a record per call: the seconds since the start of
+the recording, the index of the method and the arguments, encoded with
+marshal. Styles are stored as their color and font, and image Futures
+as the path they resolved to, if done. Traces hold no pickles, so they
+can be shared.
+"""
+# Standard Library
+import argparse
+from concurrent.futures import Future
+from contextlib import contextmanager, ExitStack
+import json
+import marshal
+import os
+import struct
+import sys
+import tempfile
+from threading import Lock
+import time
+# Project Modules
+from ._overlay import Overlay
+from ._stats import Histogram
+from ._style import Style
+
+
+MAGIC = b"OVTRACE1"
+RECORD = struct.Struct("<dBI")  # Seconds since the start, method, length of the arguments
+METHODS = (
+    "add_label", "remove_label", "update_label", "set_labels", "post",
+    "update", "batch", "commit", "abort", "destroy",
+)
+
+
+class Recorder(object):
+    """
+    Proxy of an Overlay that records every call into a trace file
+
+    Calls are recorded before they are passed on, so that calls that
+    raise an exception are replayed as well. Attributes that are not
+    label methods are passed on to the Overlay without recording.
+
+    :param overlay: Overlay to record the calls of
+    :param path: Path of the trace file to write
+    """
+
+    def __init__(self, overlay: Overlay, path: str):
+        self.overlay = overlay
+        self._file = open(path, "wb")
+        self._lock = Lock()
+        self._start = time.perf_counter()
+        self.records = 0
+        self._file.write(MAGIC)
+        self._write(marshal.dumps((
+            list(getattr(overlay, "_position", (0, 0))),
+            list(getattr(overlay, "_size", (200, 800))),
+            type(overlay).__name__)))
+
+    def add_label(
+            self, row: int, text: str, image: (str, Future) = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None,
+            ttl: float = None, flash: float = None, fade: float = None) -> (str, None):
+        self._record("add_label", (row, text, _image(image), color, font, _style(style), ttl, flash, fade))
+        return self.overlay.add_label(row, text, image, color, font, style, ttl, flash, fade)
+
+    def remove_label(self, ident: str) -> None:
+        self._record("remove_label", (ident,))
+        self.overlay.remove_label(ident)
+
+    def update_label(
+            self, ident: str, text: str = None, image: (str, Future) = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None) -> None:
+        self._record("update_label", (ident, text, _image(image), color, font, _style(style)))
+        self.overlay.update_label(ident, text, image, color, font, style)
+
+    def set_labels(self, labels: dict) -> list:
+        self._record("set_labels", ({row: _label(label) for row, label in labels.items()},))
+        return self.overlay.set_labels(labels)
+
+    def post(
+            self, row: int, text: str, image: (str, Future) = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None) -> str:
+        self._record("post", (row, text, _image(image), color, font, _style(style)))
+        return self.overlay.post(row, text, image, color, font, style)
+
+    def update(self):
+        self._record("update", ())
+        self.overlay.update()
+
+    @contextmanager
+    def batch(self):
+        """Record the start of a batch, and whether it was committed or aborted"""
+        self._record("batch", ())
+        try:
+            with self.overlay.batch():
+                yield
+        except BaseException:
+            self._record("abort", ())
+            raise
+        self._record("commit", ())
+
+    def destroy(self):
+        """Record the destruction of the Overlay and close the trace"""
+        self._record("destroy", ())
+        self.close()
+        self.overlay.destroy()
+
+    def close(self):
+        """Close the trace file"""
+        with self._lock:
+            self._file.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self.overlay, name)
+
+    def _record(self, method: str, args: tuple):
+        """Write a record of a call to the trace"""
+        data = marshal.dumps(args)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(RECORD.pack(time.perf_counter() - self._start, METHODS.index(method), len(data)))
+            self._file.write(data)
+            self.records += 1
+
+    def _write(self, data: bytes):
+        """Write length-prefixed data"""
+        self._file.write(struct.pack("<I", len(data)))
+        self._file.write(data)
+
+
+def _style(style: (Style, None)) -> (tuple, None):
+    """Encode a Style as its color and font"""
+    return None if style is None else (style.color, style.font)
+
+
+def _image(image: (str, Future, None)) -> (str, None):
+    """Encode an image Future as the path it resolved to, if done"""
+    if not isinstance(image, Future):
+        return image
+    return Overlay._resolve_image(image) if image.done() else None
+
+
+def _label(label: (str, dict)) -> (str, dict):
+    """Encode the label of set_labels"""
+    if not isinstance(label, dict):
+        return label
+    label = dict(label)
+    if "style" in label:
+        label["style"] = _style(label["style"])
+    if "image" in label:
+        label["image"] = _image(label["image"])
+    return label
+
+
+def read(path: str) -> (tuple, list):
+    """
+    Read a trace file
+
+    :return: ((position, size, class name), [(seconds, method, args)])
+    """
+    with open(path, "rb") as fi:
+        if fi.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not an Overlay trace: {}".format(path))
+        length, = struct.unpack("<I", fi.read(4))
+        position, size, name = marshal.loads(fi.read(length))
+        records = list()
+        while True:
+            header = fi.read(RECORD.size)
+            if len(header) < RECORD.size:  # A trace of a process that crashed may be truncated
+                break
+            seconds, method, length = RECORD.unpack(header)
+            data = fi.read(length)
+            if len(data) < length:
+                break
+            records.append((seconds, METHODS[method], marshal.loads(data)))
+    return (tuple(position), tuple(size), name), records
+
+
+class Images(object):
+    """Replaces the images of a trace that do not exist by a generated placeholder"""
+
+    def __init__(self):
+        self._placeholder = None
+        self.missing = 0
+
+    def __call__(self, path: (str, None)) -> (str, None):
+        if path is None or os.path.exists(path):
+            return path
+        self.missing += 1
+        if self._placeholder is None:
+            from PIL import Image
+            self._placeholder = os.path.join(tempfile.mkdtemp(), "placeholder.png")
+            Image.new("RGBA", (24, 24), (255, 0, 255, 255)).save(self._placeholder)
+        return self._placeholder
+
+    def close(self):
+        if self._placeholder is not None:
+            os.remove(self._placeholder)
+            os.rmdir(os.path.dirname(self._placeholder))
+
+
+def _arguments(method: str, args: list, images: Images) -> list:
+    """Decode the arguments of a record"""
+    args = list(args)
+    if method in ("add_label", "update_label", "post"):
+        args[2] = images(args[2])
+        args[5] = None if args[5] is None else Style(*args[5])
+    elif method == "set_labels":
+        labels = dict()
+        for row, label in args[0].items():
+            if isinstance(label, dict):
+                label = dict(label)
+                if label.get("style") is not None:
+                    label["style"] = Style(*label["style"])
+                if "image" in label:
+                    label["image"] = images(label["image"])
+            labels[row] = label
+        args[0] = labels
+    return args
+
+
+def _wait(overlay: Overlay, backend, until: float, frames: bool):
+    """Wait until a time, drawing the frames that are due in the meantime"""
+    while True:
+        remaining = until - time.perf_counter()
+        if remaining <= 0:
+            return
+        delay = overlay._scheduler.delay() if frames else None
+        time.sleep(remaining if delay is None else min(delay, remaining))
+        if frames and overlay._scheduler.tick():
+            backend.sync(overlay)
+
+
+def replay(path: str, backend, realtime: bool = False) -> dict:
+    """
+    Replay a trace against an Overlay of a backend of the benchmarks
+
+    Frames are drawn as the FrameScheduler of the Overlay decides after
+    every call, and explicitly for every recorded update. All calls are
+    replayed in a single thread.
+
+    :param backend: Backend of overlays.bench
+    :param realtime: Whether to wait until the recorded time of every
+        call, instead of replaying as fast as possible
+    :return: Metrics in the units of overlays.bench
+    """
+    (position, size, _), records = read(path)
+    overlay = backend.create(position, size)
+    durations = dict()
+    images = Images()
+    batches = list()
+    errors = 0
+    overlay.enable_stats()
+    start = time.perf_counter()
+    try:
+        for seconds, method, args in records:
+            if realtime:
+                _wait(overlay, backend, start + seconds, len(batches) == 0)
+            if method == "destroy":
+                break
+            args = _arguments(method, args, images)
+            call = time.perf_counter()
+            try:
+                if method == "batch":
+                    batches.append(ExitStack())
+                    batches[-1].enter_context(overlay.batch())
+                elif method == "commit":
+                    batches.pop().close()
+                elif method == "abort":
+                    error = RuntimeError("Aborted batch")
+                    batches.pop().__exit__(RuntimeError, error, None)
+                elif method == "update":
+                    backend.sync(overlay)
+                else:
+                    getattr(overlay, method)(*args)
+            except (KeyError, ValueError, OSError):  # Recorded calls that failed fail again
+                errors += 1
+            if method not in durations:
+                durations[method] = Histogram(size=len(records))
+            durations[method].add(time.perf_counter() - call)
+            if len(batches) == 0 and overlay._scheduler.tick():
+                backend.sync(overlay)
+        backend.sync(overlay)
+        duration = time.perf_counter() - start
+        stats = overlay.stats
+    finally:
+        for batch in reversed(batches):
+            batch.close()
+        overlay.destroy()
+        images.close()
+
+    results = {
+        "duration_s": duration,
+        "calls_per_s": len(records) / duration if duration > 0 else 0.0,
+        "errors_count": errors,
+        "missing_images_count": images.missing,
+        "frame_p50_s": stats["frame_time"]["p50"],
+        "frame_p95_s": stats["frame_time"]["p95"],
+        "frame_max_s": stats["frame_time"]["max"],
+    }
+    if stats["paint_time"]["count"] > 0:
+        results.update({"paint_p50_s": stats["paint_time"]["p50"], "paint_p95_s": stats["paint_time"]["p95"]})
+    for method, histogram in durations.items():
+        results.update({
+            "{}_p50_s".format(method): histogram.percentile(50),
+            "{}_p95_s".format(method): histogram.percentile(95),
+            "{}_p99_s".format(method): histogram.percentile(99),
+        })
+    return results
+
+
+def main():
+    from .bench import BACKENDS, compare
+    parser = argparse.ArgumentParser(description="Replay a trace of Overlay calls against a backend")
+    parser.add_argument("trace", help="Trace file written by a Recorder")
+    parser.add_argument("backend", choices=sorted(BACKENDS), help="Backend to replay the trace against")
+    parser.add_argument("-r", "--realtime", action="store_true", help="Replay with the recorded timing")
+    parser.add_argument("-o", "--output", help="File to write the JSON results to instead of stdout")
+    parser.add_argument("-c", "--compare", help="JSON file of a baseline to compare the results to")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="Fraction that counts as regression")
+    args = parser.parse_args()
+
+    backend = BACKENDS[args.backend]()
+    try:
+        results = {args.backend: replay(args.trace, backend, args.realtime)}
+    finally:
+        backend.close()
+    if args.output is not None:
+        with open(args.output, "w") as fo:
+            json.dump(results, fo, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+    if args.compare is None:
+        return
+    with open(args.compare) as fi:
+        regressions = compare(results, json.load(fi), args.threshold)
+    for backend, metric, reference, value, change in regressions:
+        print("REGRESSION {}.{}: {:.4g} -> {:.4g} ({:+.1%})".format(
+            backend, metric, reference, value, change), file=sys.stderr)
+    if len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
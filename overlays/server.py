@@ -0,0 +1,410 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Out-of-process Overlay server. A separate process owns the windows of
+all Overlays, so that their drawing does not compete for the GIL with
+the process that produces the labels.
+
+Clients connect to the server through a control connection, over which
+Overlays are created and destroyed. Label changes are written to a
+shared memory ring buffer per client, which the server reads without
+any system call by the client:
+
+    server = OverlayServer("tkinter")
+    client = server.connect()
+    overlay = client.create((0, 0), (200, 400), "Overlay")
+    overlay.add_label(0, "Label")
+    print(client.stats())
+
+Other processes connect with connect(server.address, server.authkey).
+"""
+# Standard Library
+from concurrent.futures import Future
+from multiprocessing import connection, get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import os
+import pickle
+import struct
+from threading import Event, Lock, Thread
+import time
+# Project Modules
+from ._manager import OverlayManager
+from ._overlay import Overlay
+from ._style import Style
+
+
+class RingBuffer(object):
+    """
+    Single-producer, single-consumer ring buffer of messages in shared memory
+
+    The header holds the capacity and the total number of bytes written
+    and read. Only the producer advances the written count and only the
+    consumer advances the read count, so no lock is shared between the
+    processes. Every message is prefixed with its length.
+    """
+
+    HEADER = struct.Struct("QQQ")  # Capacity, bytes written, bytes read
+    LENGTH = struct.Struct("I")
+
+    def __init__(self, memory: SharedMemory, owner: bool):
+        """Use a created or attached block of shared memory"""
+        self._memory = memory
+        self._owner = owner
+        self._buffer = memory.buf
+        self.capacity = self.HEADER.unpack_from(self._buffer)[0]
+
+    @classmethod
+    def create(cls, capacity: int) -> "RingBuffer":
+        """Create a new ring buffer of capacity bytes"""
+        memory = SharedMemory(create=True, size=cls.HEADER.size + capacity)
+        cls.HEADER.pack_into(memory.buf, 0, capacity, 0, 0)
+        return cls(memory, True)
+
+    @classmethod
+    def attach(cls, name: str) -> "RingBuffer":
+        """Attach to the ring buffer created by another process, which frees it"""
+        try:
+            memory = SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            memory = SharedMemory(name=name)
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(memory, False)
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory to attach to"""
+        return self._memory.name
+
+    @property
+    def depth(self) -> int:
+        """Number of bytes written that have not been read yet"""
+        _, written, read = self.HEADER.unpack_from(self._buffer)
+        return written - read
+
+    def write(self, data: bytes) -> bool:
+        """
+        Write a message if there is room for it
+
+        :return: False if the buffer is too full for the message
+        :raises ValueError: If the message can never fit in the buffer
+        """
+        message = self.LENGTH.pack(len(data)) + data
+        if len(message) > self.capacity:
+            raise ValueError("Message of {} bytes does not fit in the ring buffer".format(len(data)))
+        _, written, read = self.HEADER.unpack_from(self._buffer)
+        if self.capacity - (written - read) < len(message):
+            return False
+        self._copy_in(written, message)
+        struct.pack_into("Q", self._buffer, 8, written + len(message))  # Published after the data
+        return True
+
+    def read(self) -> list:
+        """Read all messages available"""
+        _, written, read = self.HEADER.unpack_from(self._buffer)
+        messages = list()
+        position = read
+        while position < written:
+            length, = self.LENGTH.unpack(self._copy_out(position, self.LENGTH.size))
+            messages.append(self._copy_out(position + self.LENGTH.size, length))
+            position += self.LENGTH.size + length
+        struct.pack_into("Q", self._buffer, 16, position)
+        return messages
+
+    def _copy_in(self, position: int, data: bytes):
+        """Copy data into the buffer at a position, wrapping around the end"""
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        offset = self.HEADER.size
+        self._buffer[offset + start:offset + start + first] = data[:first]
+        self._buffer[offset:offset + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, length: int) -> bytes:
+        """Copy data out of the buffer at a position, wrapping around the end"""
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        offset = self.HEADER.size
+        return bytes(self._buffer[offset + start:offset + start + first]) + \
+            bytes(self._buffer[offset:offset + length - first])
+
+    def close(self):
+        """Detach from the shared memory and free it if it was created here"""
+        self._buffer.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+class RemoteOverlay(Overlay):
+    """
+    Proxy of an Overlay hosted by an OverlayServer
+
+    Label changes and batches are committed to a local LabelStore, so
+    that they are validated as for any Overlay, and written to the ring
+    buffer of the client. The server commits them to the real Overlay.
+    """
+
+    def __init__(self, client: "Client", ident: int, position: tuple, size: tuple, name: str):
+        Overlay.__init__(self, position, size, name)
+        self._client = client
+        self._ident = ident
+
+    def _commit(self, changes: list):
+        """Commit the changes locally and send them to the server"""
+        self._labels.commit(changes)
+        self._client.send(self._ident, changes)
+
+    def _image(self, row: int, image: (str, Future, None)) -> (str, None):
+        """Wait for an image Future, as the server cannot attach it later"""
+        return Overlay._image(self, row, image.result() if isinstance(image, Future) else image)
+
+    def _time(self, row: int, style: Style = None, ttl: float = None, flash: float = None, fade: float = None):
+        """Timed labels are not supported, as the server does not know of timers"""
+        if ttl is not None or flash is not None or fade is not None:
+            raise ValueError("Timed labels are not supported by a RemoteOverlay")
+
+    def post(
+            self, row: int, text: str, image: str = None,
+            color: tuple = None, font: (dict, tuple) = None, style: Style = None) -> str:
+        """Send the contents of a row, which the server coalesces per frame"""
+        return self.add_label(row, text, image, color, font, style)
+
+    def update(self):
+        """Draw the changes sent so far in the server immediately"""
+        self._client.request("update", self._ident)
+
+    def destroy(self):
+        """Destroy the Overlay in the server"""
+        self._client.request("destroy", self._ident)
+
+    @property
+    def rectangle(self) -> tuple:
+        return self._client.request("rectangle", self._ident)
+
+
+class Client(object):
+    """
+    Connection of a process to an OverlayServer
+
+    :param address: Address of the server
+    :param authkey: Authentication key of the server
+    :param capacity: Size of the ring buffer for label changes in bytes
+    """
+
+    FULL_INTERVAL = 0.001  # Seconds to wait for the server when the ring buffer is full
+
+    def __init__(self, address, authkey: bytes, capacity: int = 1 << 20):
+        self._connection = connection.Client(address, authkey=authkey)
+        self._ring = RingBuffer.create(capacity)
+        self._lock, self._write_lock = Lock(), Lock()
+        self.messages = self.bytes = self.stalls = 0
+        self.request("attach", self._ring.name)
+
+    def create(self, position: tuple, size: tuple, name: str, **kwargs) -> RemoteOverlay:
+        """Create a new Overlay in the server"""
+        ident = self.request("create", position, size, name, kwargs)
+        return RemoteOverlay(self, ident, position, size, name)
+
+    def send(self, ident: int, changes: list):
+        """Write label changes to the ring buffer, waiting while it is full"""
+        data = pickle.dumps((ident, changes), pickle.HIGHEST_PROTOCOL)
+        with self._write_lock:
+            while not self._ring.write(data):
+                self.stalls += 1
+                time.sleep(self.FULL_INTERVAL)
+            self.messages += 1
+            self.bytes += len(data)
+
+    def request(self, command: str, *args):
+        """Execute a command in the server and return its result"""
+        with self._lock:
+            self._connection.send((command, args))
+            error, result = self._connection.recv()
+        if error is not None:
+            raise error
+        return result
+
+    def stats(self) -> dict:
+        """Return the counters of all clients of the server, by client number"""
+        return self.request("stats")
+
+    def close(self):
+        """Destroy the Overlays of this client and disconnect"""
+        self.request("close")
+        self._connection.close()
+        self._ring.close()
+
+
+def connect(address, authkey: bytes, capacity: int = 1 << 20) -> Client:
+    """Connect to a running OverlayServer"""
+    return Client(address, authkey, capacity)
+
+
+class Session(object):
+    """
+    Server side of a Client: executes its commands and label changes
+
+    The ring buffer is drained before every command, so that commands
+    like update and destroy see the changes sent before them.
+    """
+
+    def __init__(self, number: int, manager: OverlayManager, sessions: dict):
+        self.number = number
+        self._manager = manager
+        self._sessions = sessions
+        self._ring = None
+        self._overlays = dict()
+        self._ident = 0
+        self._start = time.perf_counter()
+        self.messages = self.changes = self.bytes = self.max_depth = 0
+
+    def drain(self):
+        """Commit the label changes written to the ring buffer"""
+        if self._ring is None:
+            return
+        self.max_depth = max(self.max_depth, self._ring.depth)
+        for data in self._ring.read():
+            ident, changes = pickle.loads(data)
+            self.messages += 1
+            self.changes += len(changes)
+            self.bytes += len(data)
+            overlay = self._overlays.get(ident)
+            if overlay is not None:  # Changes to a destroyed Overlay are dropped
+                overlay._commit(changes)
+
+    def handle(self, command: str, args: tuple):
+        """Execute a command of the client"""
+        if command == "attach":
+            self._ring = RingBuffer.attach(*args)
+        elif command == "create":
+            position, size, name, kwargs = args
+            self._ident += 1
+            self._overlays[self._ident] = self._manager.create(position, size, name, **kwargs)
+            return self._ident
+        elif command == "update":
+            overlay = self._overlays[args[0]]
+            self._manager.call(overlay.update).result()
+        elif command == "destroy":
+            self._manager.destroy(self._overlays.pop(args[0]))
+        elif command == "rectangle":
+            return self._manager.call(lambda: self._overlays[args[0]].rectangle).result()
+        elif command == "stats":
+            return {number: session.snapshot() for number, session in list(self._sessions.items())}
+        elif command == "close":
+            self.close()
+        else:
+            raise ValueError("Unknown command: {}".format(command))
+
+    def snapshot(self) -> dict:
+        """Return the throughput and queue depth counters of the client"""
+        elapsed = time.perf_counter() - self._start
+        return {
+            "overlays": len(self._overlays),
+            "messages": self.messages,
+            "changes": self.changes,
+            "bytes": self.bytes,
+            "messages_per_s": self.messages / elapsed,
+            "bytes_per_s": self.bytes / elapsed,
+            "queue_depth_bytes": self._ring.depth if self._ring is not None else 0,
+            "max_queue_depth_bytes": self.max_depth,
+        }
+
+    def close(self):
+        """Destroy the Overlays of the client and detach from its ring buffer"""
+        self._sessions.pop(self.number, None)
+        for ident in list(self._overlays):
+            self._manager.destroy(self._overlays.pop(ident))
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+
+class OverlayServer(object):
+    """
+    Process that owns the windows of the Overlays of its clients
+
+    :param backend: Backend of the OverlayManager of the server
+    :param manager: OverlayManager (sub)class to host the Overlays
+    """
+
+    POLL_INTERVAL = 1 / 120  # Maximum seconds before changes are read
+
+    def __init__(self, backend: str = "tkinter", manager: type = OverlayManager):
+        """Start the server process and wait until it accepts clients"""
+        self.authkey = os.urandom(32)
+        context = get_context()
+        self._connection, child = context.Pipe()
+        self._process = context.Process(
+            target=serve, args=(backend, manager, self.authkey, child, self.POLL_INTERVAL), daemon=True)
+        self._process.start()
+        error, self.address = self._connection.recv()
+        if error is not None:
+            self._process.join()
+            raise error
+
+    def connect(self, capacity: int = 1 << 20) -> Client:
+        """Connect a Client in this process"""
+        return Client(self.address, self.authkey, capacity)
+
+    def stop(self):
+        """Destroy all Overlays and stop the server process"""
+        self._connection.send("stop")
+        self._process.join()
+
+
+def serve(backend: str, manager: type, authkey: bytes, parent: connection.Connection, interval: float):
+    """Run an OverlayServer until its parent stops it"""
+    try:
+        manager = manager(backend)
+        listener = connection.Listener(authkey=authkey)
+    except Exception as e:
+        parent.send((e, None))
+        return
+    parent.send((None, listener.address))
+    sessions, stopped = dict(), Event()
+    Thread(target=_accept, args=(listener, manager, sessions, interval, stopped), daemon=True).start()
+    try:
+        parent.recv()
+    except EOFError:  # The parent exited
+        pass
+    stopped.set()
+    listener.close()
+    manager.stop()
+
+
+def _accept(listener: connection.Listener, manager: OverlayManager, sessions: dict, interval: float, stopped: Event):
+    """Accept clients and serve each of them in a thread"""
+    number = 0
+    while True:
+        try:
+            client = listener.accept()
+        except (OSError, EOFError, connection.AuthenticationError):
+            if stopped.is_set():
+                return
+            continue
+        number += 1
+        sessions[number] = Session(number, manager, sessions)
+        Thread(target=_session, args=(client, sessions[number], sessions, interval), daemon=True).start()
+
+
+def _session(client: connection.Connection, session: Session, sessions: dict, interval: float):
+    """Read the changes and commands of a client until it disconnects"""
+    try:
+        while True:
+            ready = client.poll(interval)
+            session.drain()
+            if not ready:
+                continue
+            command, args = client.recv()
+            try:
+                client.send((None, session.handle(command, args)))
+            except Exception as e:
+                client.send((e, None))
+            if command == "close":
+                break
+    except (EOFError, OSError):  # The client exited
+        session.close()
+    finally:
+        client.close()
+        sessions.pop(session.number, None)
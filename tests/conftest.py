@@ -0,0 +1,20 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Helpers shared by the tests.
+"""
+
+
+class FakeClock(object):
+    """Clock that only advances when sleeping"""
+
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self) -> float:
+        return self.time
+
+    def sleep(self, seconds: float):
+        self.time += seconds
@@ -0,0 +1,127 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the asyncio facade of the Overlays.
+"""
+# Standard Library
+import asyncio
+from threading import current_thread, Event, Thread
+from unittest import TestCase
+# Project Modules
+from overlays import AsyncOverlay
+from overlays._overlay import Overlay
+from overlays._style import Style
+
+
+class ThreadedOverlay(Overlay, Thread):
+    """Overlay that draws its frames in its own thread"""
+
+    def __init__(self):
+        Overlay.__init__(self, (0, 0), (100, 100), "ThreadedOverlay")
+        Thread.__init__(self, daemon=True)
+        self.applied = list()
+        self.stopped = Event()
+        self.start()
+
+    def _apply(self, changed: dict, removed: set):
+        assert current_thread() is self
+        self.applied.append((sorted(changed), sorted(removed)))
+
+    def run(self):
+        while not self.stopped.is_set():
+            if self._scheduler.wait(0.01):
+                self._scheduler.tick()
+
+    def destroy(self):
+        self.stopped.set()
+        self.join()
+
+
+class TestAsyncOverlay(TestCase):
+    """Test the coroutines and batches of the AsyncOverlay"""
+
+    def setUp(self):
+        self.w = ThreadedOverlay()
+        self.a = AsyncOverlay(self.w)
+
+    def tearDown(self):
+        self.a.destroy()
+
+    def run_async(self, coroutine):
+        return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+    def test_add_label(self):
+        """Test whether a change has been drawn when it completes"""
+        async def coroutine():
+            ident = await self.a.add_label(0, "Label")
+            self.assertEqual(self.w.applied, [([0], [])])
+            await self.a.update_label(ident, text="Changed")
+            self.assertEqual(self.w._labels[0].text, "Changed")
+            await self.a.remove_label(ident)
+            self.assertEqual(self.w.applied[-1], ([], [0]))
+            with self.assertRaises(KeyError):
+                await self.a.remove_label(ident)
+        self.run_async(coroutine())
+
+    def test_batch(self):
+        """Test whether batches are committed at once and per task"""
+        async def other():
+            await self.a.add_label(10, "Other task")
+
+        async def coroutine():
+            async with self.a.batch():
+                for row in range(5):
+                    await self.a.add_label(row, "Row {}".format(row))
+                await asyncio.create_task(other())
+                self.assertIn(10, self.w._labels)
+                self.assertNotIn(0, self.w._labels)
+            self.assertEqual(self.w.applied[-1], ([0, 1, 2, 3, 4], []))
+        self.run_async(coroutine())
+
+    def test_concurrent(self):
+        """Test many producers pushing updates concurrently"""
+        async def producer(row: int):
+            await self.a.add_label(row, "0")
+            for i in range(20):
+                await self.a.update_label(str(row), text=str(i))
+
+        async def coroutine():
+            await asyncio.gather(*(producer(row) for row in range(20)))
+        self.run_async(coroutine())
+        self.assertTrue(all(self.w._labels[row].text == "19" for row in range(20)))
+
+    def test_style(self):
+        """Test whether Styles and timers are passed on to the Overlay"""
+        style = Style((255, 0, 0), ("default", 12))
+
+        async def coroutine():
+            await self.a.add_label(0, "Label", style=style, ttl=60.0)
+            self.assertIs(self.w._labels[0].style, style)
+            self.assertIn(0, self.w._timed)
+            await self.a.update_label("0", style=style.replace(color=(0, 255, 0)))
+            self.assertEqual(self.w._labels[0].color, (0, 255, 0))
+        self.run_async(coroutine())
+
+    def test_abort(self):
+        """Test whether the timers of a discarded batch are not scheduled or cancelled"""
+        async def coroutine():
+            await self.a.add_label(0, "Permanent")
+            with self.assertRaises(RuntimeError):
+                async with self.a.batch():
+                    await self.a.add_label(0, "Discarded", ttl=0.01)
+                    raise RuntimeError()
+            self.assertEqual(len(self.w._timers), 0)
+            self.assertEqual(self.w._labels[0].text, "Permanent")
+            await self.a.add_label(1, "Timed", ttl=60.0)
+            with self.assertRaises(RuntimeError):
+                async with self.a.batch():
+                    await self.a.add_label(1, "Discarded")
+                    raise RuntimeError()
+            self.assertIn(1, self.w._timed)
+            async with self.a.batch():
+                await self.a.add_label(1, "Committed")
+                self.assertIn(1, self.w._timed)
+            self.assertNotIn(1, self.w._timed)
+        self.run_async(coroutine())
@@ -0,0 +1,94 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the lazy import and the selection of the backends.
+"""
+# Standard Library
+import ast
+import os
+import subprocess
+import sys
+from unittest import TestCase
+# Project Modules
+import overlays
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code: str, **environment) -> str:
+    """Run code in a fresh interpreter and return its output"""
+    env = {key: value for key, value in os.environ.items() if key != overlays.ENVIRONMENT_VARIABLE}
+    env.update(PYTHONPATH=ROOT, **environment)
+    return subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+class TestBackends(TestCase):
+    """Test the import and the selection of backends"""
+
+    def test_lazy_import(self):
+        """Test whether importing the package imports no backend"""
+        output = run("import sys, overlays; print(sorted(m for m in {} if m in sys.modules))".format(
+            ("tkinter", "PIL", "numpy", "gi", "asyncio", "overlays._overlay")))
+        self.assertEqual(output.strip(), "[]")
+
+    def test_environment_variable(self):
+        """Test the selection of a backend by the environment variable"""
+        if "tkinter" not in overlays.available_backends():
+            self.skipTest("Tkinter is not available")
+        output = run("import overlays; print(overlays.Overlay.__name__)", OVERLAYS_BACKEND="tkinter")
+        self.assertEqual(output.strip(), "TkinterOverlay")
+
+    def test_get_backend(self):
+        """Test the explicit selection of backends"""
+        with self.assertRaises(ValueError):
+            overlays.get_backend("invalid")
+        for name in overlays.PREFERENCE:
+            if name in overlays.available_backends():
+                self.assertIs(overlays.get_backend(name), getattr(overlays, overlays.BACKENDS[name][1]))
+            else:
+                self.assertRaises(ImportError, overlays.get_backend, name)
+
+    def test_probe_cached(self):
+        """Test whether a failed import is only attempted once"""
+        self.assertIs(overlays._probe("windows"), overlays._probe("windows"))
+
+    def test_exports(self):
+        """Test the lazily imported attributes"""
+        from overlays._manager import OverlayManager
+        self.assertIs(overlays.OverlayManager, OverlayManager)
+        self.assertIn("IMAGE_CACHE", dir(overlays))
+        with self.assertRaises(AttributeError):
+            overlays.invalid
+
+    def test_unavailable(self):
+        """Test whether a missing backend makes Overlay a missing attribute, not an ImportError"""
+        if "windows" in overlays.available_backends():
+            self.skipTest("Windows backend is available")
+        output = run(
+            "import overlays\n"
+            "print(hasattr(overlays, 'Overlay'), getattr(overlays, 'Overlay', None))\n"
+            "try:\n    overlays.get_backend()\nexcept ImportError:\n    print('ImportError')",
+            OVERLAYS_BACKEND="windows")
+        self.assertEqual(output.split(), ["False", "None", "ImportError"])
+
+    def test_shadowed_methods(self):
+        """Test whether no Overlay subclass assigns an attribute named like a method of Overlay"""
+        from overlays._overlay import Overlay
+        shadowed = list()
+        for module in ("_windows", "_gtk", "_tkinter", "_headless", "server"):
+            with open(os.path.join(ROOT, "overlays", module + ".py")) as fi:
+                tree = ast.parse(fi.read())
+            for cls in (node for node in tree.body if isinstance(node, ast.ClassDef)):
+                if not any(isinstance(base, ast.Name) and base.id == "Overlay" for base in cls.bases):
+                    continue
+                for node in ast.walk(cls):
+                    targets = node.targets if isinstance(node, ast.Assign) else ()
+                    for target in (t for tt in targets for t in getattr(tt, "elts", [tt])):
+                        if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) \
+                                and target.value.id == "self" and callable(getattr(Overlay, target.attr, None)):
+                            shadowed.append("{}.{}".format(cls.name, target.attr))
+        self.assertEqual(shadowed, [])
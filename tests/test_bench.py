@@ -0,0 +1,53 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the comparison of benchmark results to a baseline.
+"""
+# Standard Library
+from unittest import TestCase
+# Project Modules
+from overlays.bench import bench_overlay, compare, measure, run
+
+
+class TestBench(TestCase):
+    """Test the helpers of the benchmark suite"""
+
+    BASELINE = {"tkinter": {"add_label_s": 1e-3, "full_update_rows_per_s": 1000.0, "rss_per_label_bytes": 0}}
+
+    def test_compare(self):
+        """Test which changes are flagged as regressions"""
+        results = {"tkinter": {"add_label_s": 1.05e-3, "full_update_rows_per_s": 1500.0, "rss_per_label_bytes": 10}}
+        self.assertEqual(compare(results, self.BASELINE, 0.1), [])
+        results = {"tkinter": {"add_label_s": 2e-3, "full_update_rows_per_s": 800.0}, "gtk": {"add_label_s": 1.0}}
+        regressions = compare(results, self.BASELINE, 0.1)
+        self.assertEqual([r[:2] for r in regressions], [("tkinter", "add_label_s"), ("tkinter", "full_update_rows_per_s")])
+        self.assertAlmostEqual(regressions[1][4], 0.2)
+
+    def test_measure(self):
+        """Test whether measure passes the iteration to the function"""
+        calls = list()
+        self.assertGreaterEqual(measure(calls.append, 3), 0)
+        self.assertEqual(calls, [0, 1, 2])
+
+    def test_overlay_warmup(self):
+        """Test whether the first Overlay, which imports the backend, is created outside of the timing"""
+        events = list()
+
+        class Backend(object):
+            def create(self):
+                events.append("create")
+                return self
+
+            def destroy(self):
+                events.append("destroy")
+
+        bench_overlay(Backend(), 2)
+        self.assertEqual(events, ["create", "destroy", "create", "create", "destroy", "destroy"])
+
+    def test_headless(self):
+        """Test a complete run of the benchmarks of the headless backend"""
+        results = run("headless", rows=4, number=2)
+        self.assertGreater(results["full_update_rows_per_s"], 0)
+        self.assertIn("update_label_s", results)
@@ -0,0 +1,107 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the LRUCache and the ImageCache built upon it.
+"""
+# Standard Library
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+# Project Modules
+from overlays._cache import LRUCache
+from overlays._imaging import ImageCache, to_bitmap
+
+
+class TestLRUCache(TestCase):
+    """Test the budget, eviction order and counters of the LRUCache"""
+
+    def setUp(self):
+        """Create a cache that records released values"""
+        self.released = list()
+        self.cache = LRUCache(budget=10, release=self.released.append)
+
+    def test_hit_miss(self):
+        """Test the hit and miss counters"""
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.put("a", 1, 4)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_eviction(self):
+        """Test whether the least recently used value is evicted"""
+        self.cache.put("a", "A", 4)
+        self.cache.put("b", "B", 4)
+        self.cache.get("a")
+        self.cache.put("c", "C", 4)
+        self.assertNotIn("b", self.cache)
+        self.assertEqual(self.released, ["B"])
+        self.assertEqual(self.cache.size, 8)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_budget(self):
+        """Test shrinking the budget and clearing the cache"""
+        for key in "abc":
+            self.cache.put(key, key, 3)
+        self.cache.budget = 3
+        self.assertEqual(len(self.cache), 1)
+        self.assertIn("c", self.cache)
+        self.cache.put("d", "d", 20)  # Too large, but kept as most recent
+        self.assertEqual(self.cache.get("d"), "d")
+        self.cache.clear()
+        self.assertEqual(self.released, ["a", "b", "c", "d"])
+        self.assertEqual(self.cache.size, 0)
+
+
+class TestImageCache(TestCase):
+    """Test the decoding and invalidation of the ImageCache"""
+
+    def setUp(self):
+        """Copy the test image so that it can be modified"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "image.png")
+        shutil.copy("tests/image.png", self.path)
+        self.cache = ImageCache(budget=1024 ** 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load(self):
+        """Test whether an image is decoded only once"""
+        image = self.cache.load(self.path)
+        self.assertIs(self.cache.load(self.path), image)
+        self.assertEqual(self.cache.stats["misses"], 1)
+        self.assertEqual(self.cache.stats["size"], image.width * image.height * len(image.getbands()))
+
+    def test_variant(self):
+        """Test whether converted variants share the decoded image"""
+        converted = list()
+
+        def convert(image):
+            converted.append(image)
+            return to_bitmap(image)
+
+        bitmap = self.cache.load(self.path, "BGRA", convert)
+        self.assertIs(self.cache.load(self.path, "BGRA", convert), bitmap)
+        self.assertEqual(converted, [self.cache.load(self.path)])
+        self.assertEqual(len(self.cache), 2)
+
+    def test_modified(self):
+        """Test whether a modified file is decoded again"""
+        image = self.cache.load(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNot(self.cache.load(self.path), image)
+
+    def test_size(self):
+        """Test whether shrunk and full images are cached apart, in either order"""
+        image = self.cache.load(self.path)
+        shrunk = self.cache.load(self.path, size=(8, 8))
+        self.assertEqual((image.size, shrunk.size), ((16, 16), (8, 8)))
+        self.cache.clear()
+        shrunk = self.cache.load(self.path, size=[8, 8])
+        self.assertEqual(self.cache.load(self.path).size, (16, 16))
+        self.assertIs(self.cache.load(self.path, size=(8, 8)), shrunk)
+        self.assertEqual(self.cache.stats["misses"], 4)
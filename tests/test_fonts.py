@@ -0,0 +1,98 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the normalized font keys and the FontCache of the backends.
+"""
+# Standard Library
+import tkinter as tk
+from unittest import TestCase
+# Project Modules
+from overlays._fonts import FontCache
+from overlays._overlay import Overlay
+
+
+class TestFontCache(TestCase):
+    """Test the building and releasing of native fonts"""
+
+    def setUp(self):
+        """Create a FontCache building and releasing fake handles"""
+        self.built, self.released = list(), list()
+        self.cache = FontCache(self.build, self.released.append, capacity=2)
+
+    def build(self, *key):
+        self.built.append(key)
+        return key
+
+    def test_key(self):
+        """Test whether equivalent fonts share a normalized key"""
+        font = {"family": "Arial", "size": 12, "italic": True}
+        key = ("Arial", 12, False, True, 1.0)
+        self.assertEqual(Overlay._font_key(font), key)
+        self.assertEqual(Overlay._font_key(("Arial", 12, False, True)), key)
+        self.assertIn("family", font)
+        self.assertEqual(Overlay._font_key(("Arial", 12), 1.5), ("Arial", 12, False, False, 1.5))
+
+    def test_reuse(self):
+        """Test whether a native font is built once per key"""
+        handle = self.cache.font(("Arial", 12))
+        self.assertIs(self.cache.font({"family": "Arial", "size": 12}), handle)
+        self.assertEqual(len(self.built), 1)
+        self.cache.font(("Arial", 12), 2.0)
+        self.assertEqual(len(self.built), 2)
+
+    def test_release(self):
+        """Test whether fonts are released on eviction and on clear"""
+        for size in (10, 11, 12):
+            self.cache.font(("Arial", size))
+        self.assertEqual(self.released, [("Arial", 10, False, False, 1.0)])
+        self.cache.clear()
+        self.assertEqual(len(self.released), 3)
+
+
+class TestTkinterFontCache(TestCase):
+    """Test the FontCache of the TkinterOverlay"""
+
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("No display available")
+        from overlays._tkinter import TkinterOverlay
+        self.w = TkinterOverlay((0, 0), (100, 100), "TestOverlay", master=self.root)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_font(self):
+        """Test whether labels share a Font and it is deleted on destroy"""
+        self.w.add_label(0, "First", font=("Arial", 12, True, False))
+        self.w.add_label(1, "Second", font={"family": "Arial", "size": 12, "bold": True})
+        self.w.update()
+        self.assertEqual(len(self.w._fonts), 1)
+        font = self.w._fonts.font(("Arial", 12, True))
+        self.assertEqual(font.actual("weight"), "bold")
+        self.w.destroy()
+        self.assertNotIn(font.name, self.root.tk.splitlist(self.root.tk.call("font", "names")))
+
+
+class TestGtkFontCache(TestCase):
+    """Test the Pango.FontDescriptions built for the GtkOverlay"""
+
+    def setUp(self):
+        try:
+            from overlays._gtk import GtkOverlay
+        except (ImportError, ValueError):
+            self.skipTest("Gtk is not available")
+        self.cache = FontCache(GtkOverlay._build_font)
+
+    def test_font(self):
+        """Test the properties of a cached Pango.FontDescription"""
+        from gi.repository import Pango
+        description = self.cache.font(("Sans", 12, True, True))
+        self.assertIs(self.cache.font(("Sans", 12, True, True)), description)
+        self.assertEqual(description.get_family(), "Sans")
+        self.assertEqual(description.get_size(), 12 * Pango.SCALE)
+        self.assertEqual(description.get_weight(), Pango.Weight.BOLD)
+        self.assertEqual(description.get_style(), Pango.Style.ITALIC)
@@ -0,0 +1,104 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the cairo drawing mode of the GtkOverlay.
+"""
+# Standard Library
+from unittest import TestCase
+# Packages
+from PIL import Image
+
+
+class TestGtkCairo(TestCase):
+    """Test the rows drawn with PangoCairo"""
+
+    def setUp(self):
+        try:
+            from overlays._gtk import GtkOverlay, Gtk
+        except (ImportError, ValueError):
+            self.skipTest("Gtk is not available")
+        self.GtkOverlay = GtkOverlay
+        if not Gtk.init_check(None)[0]:
+            self.skipTest("No display available")
+        from overlays._manager import GtkLoop
+        self.w = GtkOverlay((0, 0), (100, 100), "TestGtkCairo", loop=GtkLoop(None), mode="cairo")
+        self.addCleanup(self.w.destroy)
+
+    def test_surface(self):
+        """Test the conversion to a premultiplied ARGB32 surface"""
+        surface = self.GtkOverlay._build_image_surface(Image.new("RGBA", (3, 2), (255, 0, 0, 128)))
+        self.assertEqual((surface.get_width(), surface.get_height()), (3, 2))
+        self.assertEqual(bytes(surface.get_data())[:4], b"\x00\x00\x80\x80")
+
+    def test_mode(self):
+        """Test whether an unknown mode is rejected"""
+        with self.assertRaises(ValueError):
+            self.GtkOverlay((0, 0), (100, 100), "TestGtkCairo", mode="invalid")
+
+    def test_offsets(self):
+        """Test whether the rows are stacked in order without widgets"""
+        for row in (2, 0, 1):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        self.assertEqual(len(self.w.get_children()), 0)
+        tops = [self.w._layout[row][0] for row in (0, 1, 2)]
+        self.assertEqual(tops, sorted(tops))
+        self.assertEqual(tops[1], self.w._layout[0][1])
+        self.w.add_label(3, "Row 0")
+        self.w.update_label("1", text="Changed")
+        self.w.update()
+        self.assertIs(self.w._rows[3].text, self.w._rows[0].text)
+        self.assertIsNot(self.w._rows[1].text, self.w._rows[2].text)
+        self.w.remove_label("0")
+        self.w.update()
+        self.assertEqual(self.w._layout[1][0], 0)
+
+    def test_damage(self):
+        """Test whether only the regions of changed rows are invalidated"""
+        for row in range(3):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        damaged = list()
+        self.w.queue_draw_area = lambda x, y, w, h: damaged.append((y, h))
+        self.w.update_label("1", text="Changed")
+        self.w.update()
+        self.assertEqual(damaged, [self.w._layout[1]])
+        del damaged[:]
+        span = self.w._layout[2]
+        self.w.remove_label("2")
+        self.w.update()
+        self.assertEqual(damaged, [span])
+
+
+class TestGtkPool(TestCase):
+    """Test the reuse of the widgets of removed rows"""
+
+    def setUp(self):
+        try:
+            from overlays._gtk import GtkOverlay, Gtk
+        except (ImportError, ValueError):
+            self.skipTest("Gtk is not available")
+        if not Gtk.init_check(None)[0]:
+            self.skipTest("No display available")
+        from overlays._manager import GtkLoop
+        self.w = GtkOverlay((0, 0), (100, 100), "TestGtkPool", loop=GtkLoop(None))
+        self.addCleanup(self.w.destroy)
+
+    def test_reuse(self):
+        """Test whether a removed row's HBox is reused by the next row added"""
+        for row in range(3):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        hbox = self.w._rows[1].widget
+        self.w.remove_label("1")
+        self.w.update()
+        self.assertIsNone(hbox.get_parent())
+        self.w.add_label(5, "Row 5", image="tests/image.png")
+        self.w.update()
+        self.assertIs(self.w._rows[5].widget, hbox)
+        self.assertEqual(self.w._rows[5].text.get_text(), "Row 5")
+        self.assertIsNotNone(self.w._rows[5].image)
+        self.assertEqual(self.w._vbox.get_children()[-1], hbox)
+        self.assertEqual(self.w._pool.stats["hits"], 1)
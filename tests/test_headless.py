@@ -0,0 +1,107 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the HeadlessOverlay that renders into NumPy frame buffers.
+"""
+# Standard Library
+from threading import Event
+from unittest import TestCase
+# Packages
+import numpy as np
+# Project Modules
+from overlays import OverlayManager
+from overlays._headless import blend, HeadlessOverlay
+
+
+class TestBlend(TestCase):
+    """Test the vectorized alpha blending"""
+
+    def test_blend(self):
+        """Test blending over transparent, opaque and translucent pixels"""
+        destination = np.array([[[0, 0, 0, 0], [0, 0, 255, 255], [0, 0, 255, 128]]], dtype=np.uint8)
+        source = np.array([[[255, 0, 0, 128]] * 3], dtype=np.uint8)
+        blend(destination, source)
+        self.assertEqual(destination[0, 0].tolist(), [255, 0, 0, 128])
+        self.assertEqual(destination[0, 1].tolist(), [128, 0, 127, 255])
+        self.assertEqual(destination[0, 2].tolist(), [170, 0, 85, 192])
+
+
+class TestHeadlessOverlay(TestCase):
+    """Test the rendering of labels into the frame buffer"""
+
+    def setUp(self):
+        self.w = HeadlessOverlay((10, 20), (100, 60), "TestHeadless", diff=True)
+
+    def tearDown(self):
+        self.w.destroy()
+
+    def test_frame(self):
+        """Test whether the frame is a read-only view of the frame buffer"""
+        frame = self.w.frame
+        self.assertEqual(frame.shape, (60, 100, 4))
+        self.assertFalse(frame.flags.writeable)
+        self.w.add_label(0, "Label", color=(255, 0, 0))
+        self.w.update()
+        self.assertTrue(frame[..., 3].any())
+        self.assertEqual(self.w.rectangle, (10, 20, 110, 80))
+
+    def test_render(self):
+        """Test the positions and colors of an image and a text"""
+        self.w.add_label(0, "Label", image="tests/image.png", color=(0, 255, 0))
+        self.w.update()
+        width = self.w._rows[0].image.shape[1]
+        self.assertEqual(self.w.damage, [(0, self.w._layout.height)])
+        text = self.w.frame[:, width:]
+        colors = {tuple(pixel) for pixel in text[text[..., 3] == 255][:, :3]}
+        self.assertEqual(colors, {(0, 255, 0)})
+        self.assertFalse(self.w.frame[self.w._layout.height:].any())
+
+    def test_damage(self):
+        """Test whether only the rows that changed are drawn"""
+        for row in range(3):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        top, height = self.w._layout[1]
+        self.w.update_label("1", text="Changed")
+        self.w.update()
+        self.assertEqual(self.w.damage, [(top, height)])
+        changed = np.nonzero(self.w.diff.any(axis=1))[0]
+        self.assertGreaterEqual(changed.min(), top)
+        self.assertLess(changed.max(), top + height)
+        self.w.update()
+        self.assertEqual(self.w.damage, [(top, height)])  # Nothing changed, so nothing was drawn
+
+    def test_remove(self):
+        """Test whether removing the last row clears its span"""
+        self.w.add_label(0, "Label")
+        self.w.update()
+        self.w.remove_label("0")
+        self.w.update()
+        self.assertFalse(self.w.frame.any())
+        self.assertTrue(self.w.diff.any())
+
+    def test_clip(self):
+        """Test whether rows outside of the frame buffer are clipped"""
+        self.w.set_labels({row: "Row {} with a long text that does not fit".format(row) for row in range(10)})
+        self.w.update()
+        self.assertGreater(self.w._layout.height, 60)
+        self.assertEqual(self.w.frame.shape, (60, 100, 4))
+        self.assertTrue(self.w.frame[:, -1].any())
+
+
+class TestHeadlessManager(TestCase):
+    """Test HeadlessOverlays hosted by an OverlayManager"""
+
+    def test_frames(self):
+        """Test whether changes are drawn by the loop of the manager"""
+        manager = OverlayManager("headless")
+        self.addCleanup(manager.stop)
+        overlay = manager.create((0, 0), (100, 100), "Managed")
+        drawn = Event()
+        overlay._scheduler.after_frame(drawn.set)
+        overlay.add_label(0, "Label")
+        self.assertTrue(drawn.wait(5))
+        self.assertTrue(overlay.frame.any())
+        self.assertEqual(overlay._scheduler.frames, 1)
@@ -0,0 +1,50 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the conversion of images into color-keyed pixel buffers.
+"""
+# Standard Library
+from unittest import TestCase
+# Packages
+from PIL import Image
+# Project Modules
+from overlays._imaging import to_bitmap, to_image
+
+
+class TestBitmap(TestCase):
+    """Test the color keying and byte order of to_bitmap"""
+
+    def setUp(self):
+        """Create a 2x1 image with an opaque and a transparent pixel"""
+        self.image = Image.new("RGBA", (2, 1))
+        self.image.putpixel((0, 0), (10, 20, 30, 128))
+        self.image.putpixel((1, 0), (40, 50, 60, 0))
+
+    def test_bgra(self):
+        """Test the default BGRA order with a white color key"""
+        bitmap = to_bitmap(self.image)
+        self.assertEqual(bitmap.shape, (1, 2, 4))
+        self.assertEqual(bitmap.tolist(), [[[30, 20, 10, 255], [255, 255, 255, 0]]])
+        self.assertTrue(bitmap.flags["C_CONTIGUOUS"])
+
+    def test_orders(self):
+        """Test the other byte orders and a custom color key"""
+        key = (1, 2, 3)
+        self.assertEqual(to_bitmap(self.image, key, "RGB").tolist(), [[[10, 20, 30], [1, 2, 3]]])
+        self.assertEqual(to_bitmap(self.image, key, "BGR").tolist(), [[[30, 20, 10], [3, 2, 1]]])
+        self.assertEqual(to_bitmap(self.image, key, "RGBA").tolist(), [[[10, 20, 30, 255], [1, 2, 3, 0]]])
+        self.assertRaises(ValueError, to_bitmap, self.image, key, "ARGB")
+
+    def test_alpha(self):
+        """Test whether pixels below an alpha threshold are keyed"""
+        bitmap = to_bitmap(self.image, alpha=129)
+        self.assertEqual(bitmap.tolist(), [[[255, 255, 255, 0], [255, 255, 255, 0]]])
+
+    def test_mode(self):
+        """Test the conversion of images without alpha channel"""
+        image = to_image(Image.open("tests/image.png").convert("RGB"), (0, 0, 0))
+        self.assertEqual(image.mode, "RGB")
+        self.assertEqual(to_bitmap(image).shape[2], 4)
+        self.assertTrue((to_bitmap(image)[..., 3] == 255).all())
@@ -0,0 +1,199 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the backend-neutral LabelStore that keeps track of the rows
+of an Overlay and computes the rows changed between updates.
+"""
+# Standard Library
+from threading import Thread
+from unittest import TestCase
+# Project Modules
+from overlays._overlay import Label, LabelStore, Overlay, Row
+from overlays._style import Style
+
+
+class RecordingOverlay(Overlay):
+    """Overlay that records the diffs passed to the backend"""
+
+    def __init__(self):
+        Overlay.__init__(self, (0, 0), (100, 100), "RecordingOverlay")
+        self.applied = list()
+
+    def _apply(self, changed: dict, removed: set):
+        self.applied.append((sorted(changed), sorted(removed)))
+
+
+class TestLabelStore(TestCase):
+    """Test the versioning and diffing of the LabelStore"""
+
+    FONT = ("default", 11, False, False)
+
+    def setUp(self):
+        """Create a LabelStore with two rows"""
+        self.store = LabelStore()
+        self.store.set(0, "Row 0", None, (0, 0, 0), self.FONT)
+        self.store.set(1, "Row 1", None, (0, 0, 0), self.FONT)
+
+    def test_initial_diff(self):
+        """Test whether all rows are reported on the first diff"""
+        changed, removed = self.store.diff()
+        self.assertEqual(set(changed), {0, 1})
+        self.assertEqual(removed, set())
+
+    def test_unchanged(self):
+        """Test whether setting identical contents is not a change"""
+        self.store.diff()
+        version = self.store[0].version
+        self.store.set(0, "Row 0", None, (0, 0, 0), self.FONT)
+        self.assertEqual(self.store[0].version, version)
+        self.assertEqual(self.store.diff(), (dict(), set()))
+
+    def test_changed(self):
+        """Test whether only the changed row is reported"""
+        self.store.diff()
+        self.store.set(1, "Changed", None, (0, 0, 0), self.FONT)
+        changed, removed = self.store.diff()
+        self.assertEqual(list(changed), [1])
+        self.assertEqual(changed[1].text, "Changed")
+        self.assertEqual(removed, set())
+
+    def test_removed(self):
+        """Test whether removed and re-added rows are reported"""
+        self.store.diff()
+        self.store.remove(0)
+        self.assertEqual(self.store.diff(), (dict(), {0}))
+        self.store.set(0, "Row 0", None, (0, 0, 0), self.FONT)
+        self.store.remove(1)
+        self.store.set(1, "Row 1", None, (0, 0, 0), self.FONT)
+        changed, removed = self.store.diff()
+        self.assertEqual(set(changed), {0, 1})
+        self.assertEqual(removed, set())
+
+    def test_order(self):
+        """Test the ordering of the rows in the store"""
+        self.store.set(5, "Row 5", None, (0, 0, 0), self.FONT)
+        self.assertEqual([label.row for label in self.store.rows()], [0, 1, 5])
+        self.assertEqual(self.store.index(5), 2)
+
+
+class TestBatch(TestCase):
+    """Test the transactional batch and set_labels API"""
+
+    def setUp(self):
+        self.w = RecordingOverlay()
+
+    def test_batch(self):
+        """Test whether batched changes are committed at once"""
+        self.w.add_label(0, "Existing")
+        self.w.update()
+        with self.w.batch():
+            for row in range(1, 30):
+                self.w.add_label(row, "Row {}".format(row))
+            self.w.remove_label("0")
+            self.assertEqual(len(self.w._labels), 1)
+            self.assertFalse(self.w._flush())
+        self.assertTrue(self.w._scheduler.invalidated)
+        self.w.update()
+        self.assertEqual(self.w.applied[-1], (list(range(1, 30)), [0]))
+        self.assertEqual(len(self.w.applied), 2)
+
+    def test_other_thread(self):
+        """Test whether changes from other threads are not batched"""
+        with self.w.batch():
+            self.w.add_label(0, "Batched")
+            thread = Thread(target=self.w.add_label, args=(1, "Direct"))
+            thread.start()
+            thread.join()
+            self.assertNotIn(0, self.w._labels)
+            self.assertIn(1, self.w._labels)
+        self.assertIn(0, self.w._labels)
+
+    def test_exception(self):
+        """Test whether a failing batch is discarded"""
+        with self.assertRaises(ValueError):
+            with self.w.batch():
+                self.w.add_label(0, "Discarded")
+                raise ValueError()
+        self.assertEqual(len(self.w._labels), 0)
+        self.assertRaises(KeyError, self.w.remove_label, "0")
+
+    def test_set_labels(self):
+        """Test whether set_labels replaces all labels"""
+        self.w.set_labels({0: "Zero", 1: "One", 2: "Two"})
+        self.w.update()
+        identifiers = self.w.set_labels({1: "One", 2: {"text": "Two", "color": (255, 0, 0)}, 3: "Three"})
+        self.assertEqual(identifiers, ["1", "2", "3"])
+        self.w.update()
+        self.assertEqual(self.w.applied, [([0, 1, 2], []), ([2, 3], [0])])
+        self.assertEqual(self.w._labels[2].color, (255, 0, 0))
+
+
+class TestUpdateLabel(TestCase):
+    """Test changing the properties of a label in place"""
+
+    def setUp(self):
+        self.w = RecordingOverlay()
+        self.w.add_label(0, "DPS: 0", color=(255, 255, 255))
+        self.w.update()
+
+    def test_update_label(self):
+        """Test whether only the given properties are changed"""
+        previous = self.w._labels[0]
+        self.w.update_label("0", text="DPS: 10")
+        label = self.w._labels[0]
+        self.assertEqual(label.content, ("DPS: 10", None, (255, 255, 255), Overlay.DEFAULT_FONT))
+        self.assertEqual(label.changed(previous), {"text"})
+        self.w.update()
+        self.assertEqual(self.w.applied[-1], ([0], []))
+
+    def test_missing(self):
+        """Test updating a label that does not exist"""
+        self.assertRaises(KeyError, self.w.update_label, "1", text="Missing")
+        with self.w.batch():
+            self.w.update_label("1", text="Ignored")
+        self.assertNotIn(1, self.w._labels)
+
+    def test_batch(self):
+        """Test whether updates are applied on top of batched changes"""
+        with self.w.batch():
+            self.w.add_label(1, "HPS: 0")
+            self.w.update_label("1", color=(0, 255, 0))
+            self.w.update_label("0", text="DPS: 20")
+        self.assertEqual(self.w._labels[1].content[:3], ("HPS: 0", None, (0, 255, 0)))
+        self.assertEqual(self.w._labels[0].text, "DPS: 20")
+
+
+class TestRow(TestCase):
+    """Test the ownership of the resources of a Row"""
+
+    def setUp(self):
+        self.released = list()
+        self.row = Row(Label(0, "Label", None, Style((255, 255, 255), ("default", 11)), 0))
+
+    def test_release(self):
+        """Test whether owned resources are released once, in reverse order"""
+        shared = object()
+        self.row.image = shared
+        first = self.row.own(object(), self.released.append)
+        second = self.row.own(object(), self.released.append)
+        self.assertIsNone(self.row.own(None, self.released.append))
+        self.assertEqual(self.row.owned, [first, second])
+        self.row.release()
+        self.assertEqual(self.released, [second, first])
+        self.row.release()
+        self.assertEqual(len(self.released), 2)
+
+    def test_transfer(self):
+        """Test whether a resource is transferred without releasing it"""
+        resource = self.row.own(object(), self.released.append)
+        other = self.row.own(object(), self.released.append)
+        row = Row(self.row.label)
+        row.own(resource, self.row.disown(resource))
+        self.assertIsNone(self.row.disown(resource))
+        self.row.release()
+        self.assertEqual(self.released, [other])
+        row.release(resource)
+        self.assertEqual(self.released, [other, resource])
+        self.assertEqual(row.owned, [])
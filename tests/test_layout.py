@@ -0,0 +1,48 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the row offsets and the damaged regions of the RowLayout.
+"""
+# Standard Library
+from unittest import TestCase
+# Project Modules
+from overlays._layout import RowLayout
+
+
+class TestRowLayout(TestCase):
+    """Test which rows and spans are damaged by changes"""
+
+    def setUp(self):
+        self.layout = RowLayout()
+        self.heights = {0: 10, 1: 20, 2: 10}
+        self.layout.update(self.heights, set(self.heights))
+
+    def test_offsets(self):
+        """Test whether rows are stacked in order of their index"""
+        self.assertEqual([self.layout[row] for row in range(3)], [(0, 10), (10, 20), (30, 10)])
+        self.assertEqual(self.layout.height, 40)
+        self.assertEqual([r[0] for r in self.layout.rows(15, 35)], [1, 2])
+        self.assertEqual(self.layout.rows(40, 50), [])
+
+    def test_change(self):
+        """Test whether a change in place only damages its own row"""
+        self.assertEqual(self.layout.update(self.heights, {1}), ({1}, [(10, 20)]))
+        self.assertEqual(self.layout.update(self.heights, set()), (set(), []))
+
+    def test_resize(self):
+        """Test whether a change of height damages the rows below it"""
+        self.heights[1] = 30
+        self.assertEqual(self.layout.update(self.heights, {1}), ({1, 2}, [(10, 40)]))
+
+    def test_remove(self):
+        """Test whether removing a row damages its former span"""
+        del self.heights[2]
+        self.assertEqual(self.layout.update(self.heights, set()), (set(), [(30, 10)]))
+        del self.heights[0]
+        self.assertEqual(self.layout.update(self.heights, set()), ({1}, [(0, 30)]))
+
+    def test_merge(self):
+        """Test whether separate changes produce separate spans"""
+        self.assertEqual(self.layout.update(self.heights, {0, 2}), ({0, 2}, [(0, 10), (30, 10)]))
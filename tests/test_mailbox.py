@@ -0,0 +1,104 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the latest-value-wins Mailbox of posted label contents.
+"""
+# Standard Library
+from threading import Event, Thread
+from unittest import TestCase
+# Project Modules
+from overlays import OverlayManager
+from overlays._headless import HeadlessOverlay
+from overlays._mailbox import Mailbox
+
+
+class TestMailbox(TestCase):
+    """Test the coalescing of the contents of rows"""
+
+    def test_latest(self):
+        """Test whether only the latest content of a row is drained"""
+        mailbox = Mailbox()
+        self.assertTrue(mailbox.put(0, "a"))
+        self.assertFalse(mailbox.put(0, "b"))
+        self.assertFalse(mailbox.put(1, "c"))
+        mailbox.discard(1)
+        self.assertEqual(mailbox.drain(), [(0, "b")])
+        self.assertEqual(mailbox.drain(), [])
+        self.assertTrue(mailbox.put(0, "d"))
+        self.assertEqual(mailbox.stats, {"posted": 4, "superseded": 2, "drained": 1, "pending": 1})
+
+    def test_post(self):
+        """Test whether posted rows are committed when a frame is drawn"""
+        overlay = HeadlessOverlay((0, 0), (100, 100), "TestMailbox")
+        self.addCleanup(overlay.destroy)
+        for i in range(10):
+            overlay.post(0, "DPS: {}".format(i), color=(255, 0, 0))
+        self.assertNotIn(0, overlay._labels)
+        self.assertTrue(overlay._scheduler.invalidated)
+        overlay.update()
+        self.assertEqual(overlay._labels[0].text, "DPS: 9")
+        overlay.post(1, "Removed")
+        overlay.remove_label("1")
+        overlay.update()
+        self.assertNotIn(1, overlay._labels)
+
+    def test_order(self):
+        """Test whether a later add_label or update_label is not overridden by an older post"""
+        overlay = HeadlessOverlay((0, 0), (100, 100), "TestMailbox")
+        self.addCleanup(overlay.destroy)
+        overlay.post(0, "Old", color=(255, 0, 0))
+        overlay.add_label(0, "New")
+        overlay.update()
+        self.assertEqual(overlay._labels[0].text, "New")
+        overlay.post(0, "Posted", color=(255, 0, 0))
+        overlay.update_label("0", text="Updated")
+        overlay.post(1, "Only posted", color=(0, 255, 0))
+        overlay.update_label("1", text="Updated")
+        overlay.update()
+        self.assertEqual(overlay._labels[0].text, "Updated")
+        self.assertEqual(overlay._labels[0].color, (255, 0, 0))
+        self.assertEqual(overlay._labels[1].text, "Updated")
+        self.assertEqual(overlay._labels[1].color, (0, 255, 0))
+        self.assertEqual(len(overlay._mailbox), 0)
+
+
+class TestStress(TestCase):
+    """Test many threads posting to the same rows of a managed Overlay"""
+
+    THREADS = 16
+    POSTS = 2000
+    ROWS = 5
+
+    def test_producers(self):
+        """Test whether the frames only draw the latest contents of the rows"""
+        manager = OverlayManager("headless")
+        self.addCleanup(manager.stop)
+        overlay = manager.create((0, 0), (200, 200), "Stress")
+        frames = list()
+        overlay.enable_stats(lambda _, frame: frames.append(frame["rows"]))
+
+        def produce(thread: int):
+            for i in range(self.POSTS):
+                overlay.post(i % self.ROWS, "Thread {}: {}".format(thread, i))
+            for row in range(self.ROWS):
+                overlay.post(row, "Done")
+
+        threads = [Thread(target=produce, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        drawn = Event()
+        overlay._scheduler.after_frame(drawn.set)
+        overlay._invalidate()
+        self.assertTrue(drawn.wait(5))
+
+        self.assertEqual([label.text for label in overlay._labels.rows()], ["Done"] * self.ROWS)
+        stats = overlay.stats["mailbox"]
+        self.assertEqual(stats["posted"], self.THREADS * (self.POSTS + self.ROWS))
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(stats["posted"], stats["superseded"] + stats["drained"])
+        self.assertLessEqual(max(frames), self.ROWS)
+        self.assertLess(sum(frames), stats["posted"] // 10)
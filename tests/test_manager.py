@@ -0,0 +1,108 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the OverlayManager that hosts Overlays on a single thread.
+"""
+# Standard Library
+from queue import Queue
+from threading import current_thread
+import tkinter as tk
+from unittest import TestCase
+# Project Modules
+from overlays import OverlayManager
+from overlays._overlay import Overlay
+
+
+class ThreadOverlay(Overlay):
+    """Overlay that records the thread it was created and destroyed in"""
+
+    def __init__(self, *args):
+        Overlay.__init__(self, *args)
+        self.created, self.destroyed = current_thread(), None
+
+    def _apply(self, changed: dict, removed: set):
+        pass
+
+    def destroy(self):
+        self.destroyed = current_thread()
+
+
+class QueueLoop(object):
+    """Loop that executes callbacks from a Queue"""
+
+    def __init__(self, manager: OverlayManager):
+        self._callbacks = Queue()
+
+    def run(self, ready: callable):
+        ready()
+        for callback in iter(self._callbacks.get, None):
+            callback()
+
+    def wakeup(self, callback: callable):
+        self._callbacks.put(callback)
+
+    def create(self, position: tuple, size: tuple, name: str) -> Overlay:
+        if name == "":
+            raise ValueError("Invalid name")
+        return ThreadOverlay(position, size, name)
+
+    def quit(self):
+        self._callbacks.put(None)
+
+
+class QueueManager(OverlayManager):
+    LOOPS = {"queue": QueueLoop}
+
+
+class TestOverlayManager(TestCase):
+    """Test the execution of commands in the GUI thread"""
+
+    def setUp(self):
+        self.manager = QueueManager("queue")
+
+    def tearDown(self):
+        if self.manager.is_alive():
+            self.manager.stop()
+
+    def test_create(self):
+        """Test whether Overlays are created and destroyed in the GUI thread"""
+        overlays = [self.manager.create((0, 0), (100, 100), "Overlay{}".format(i)) for i in range(10)]
+        self.assertTrue(all(overlay.created is self.manager for overlay in overlays))
+        self.assertEqual(self.manager.overlays, overlays)
+        self.manager.destroy(overlays[0])
+        self.assertIs(overlays[0].destroyed, self.manager)
+        self.manager.stop()
+        self.assertFalse(self.manager.is_alive())
+        self.assertTrue(all(overlay.destroyed is self.manager for overlay in overlays))
+
+    def test_error(self):
+        """Test whether exceptions are raised in the calling thread"""
+        self.assertRaises(ValueError, self.manager.create, (0, 0), (100, 100), "")
+        self.assertEqual(self.manager.call(sum, (1, 2)).result(), 3)
+
+    def test_backend(self):
+        self.assertRaises(ValueError, OverlayManager, "unknown")
+
+
+class TestTkinterManager(TestCase):
+    """Test hosting TkinterOverlays on a single Tcl interpreter"""
+
+    def setUp(self):
+        try:
+            self.manager = OverlayManager("tkinter")
+        except tk.TclError:
+            self.skipTest("No display available")
+
+    def tearDown(self):
+        self.manager.stop()
+
+    def test_overlays(self):
+        """Test whether all Overlays share the Tk root of the manager"""
+        overlays = [self.manager.create((0, 100 * i), (100, 100), "Overlay{}".format(i)) for i in range(10)]
+        for overlay in overlays:
+            overlay.add_label(0, "Label", color=(255, 255, 255))
+        self.assertEqual(len({str(overlay.master) for overlay in overlays}), 1)
+        self.manager.destroy(overlays[0])
+        self.assertEqual(len(self.manager.overlays), 9)
@@ -0,0 +1,50 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the RowPool in which backends keep the Rows of removed labels.
+"""
+# Standard Library
+from unittest import TestCase
+# Project Modules
+from overlays._overlay import Label, Row
+from overlays._pool import RowPool
+from overlays._style import Style
+
+
+class TestRowPool(TestCase):
+    """Test the reuse and release of pooled Rows"""
+
+    def setUp(self):
+        self.released = list()
+        self.pool = RowPool(2)
+
+    def row(self, text: str) -> Row:
+        """Return a Row owning its text"""
+        row = Row(Label(0, text, None, Style((0, 0, 0), ("default", 11)), 0))
+        row.text = row.own(text, self.released.append)
+        return row
+
+    def test_reuse(self):
+        """Test whether the most recently removed Row is reused"""
+        self.assertIsNone(self.pool.get())
+        first, second = self.row("first"), self.row("second")
+        self.pool.put(first)
+        self.pool.put(second)
+        self.assertIs(self.pool.get(), second)
+        self.assertEqual(self.pool.stats, {
+            "entries": 1, "capacity": 2, "hits": 1, "misses": 1, "evictions": 0, "hit_rate": 0.5})
+        self.assertEqual(self.released, [])
+
+    def test_release(self):
+        """Test whether Rows that do not fit are released"""
+        for text in ("a", "b", "c"):
+            self.pool.put(self.row(text))
+        self.assertEqual(self.released, ["c"])
+        self.assertEqual(self.pool.evictions, 1)
+        self.pool.capacity = 1
+        self.assertEqual(self.released, ["c", "b"])
+        self.pool.clear()
+        self.assertEqual(self.released, ["c", "b", "a"])
+        self.assertEqual(len(self.pool), 0)
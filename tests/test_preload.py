@@ -0,0 +1,94 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the parallel preloading of images and image Futures of labels.
+"""
+# Standard Library
+from concurrent.futures import Future
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+# Packages
+from PIL import Image
+# Project Modules
+import overlays
+from overlays._headless import HeadlessOverlay
+from overlays._imaging import IMAGE_CACHE
+
+
+class TestPreload(TestCase):
+    """Test the decoding of images on a thread pool"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.paths = list()
+        for i in range(20):
+            path = os.path.join(self.directory, "icon{}.png".format(i))
+            Image.new("RGBA", (32 + i, 32), (i, 0, 0, 255)).save(path)
+            self.paths.append(path)
+
+    def test_preload(self):
+        """Test whether all images are decoded, shrunk and timed"""
+        preload = overlays.preload(self.paths + self.paths[:1], size=(16, 16), workers=4)
+        self.assertTrue(preload.wait(10))
+        self.assertEqual(preload[self.paths[3]].result(), self.paths[3])
+        stats = preload.stats
+        self.assertEqual((stats["images"], stats["errors"]), (20, 0))
+        self.assertEqual(stats["latency"]["count"], 20)
+        self.assertGreaterEqual(stats["duration"], stats["latency"]["max"])
+        self.assertEqual(IMAGE_CACHE.load(self.paths[19], size=(16, 16)).size, (16, 10))
+
+    def test_errors(self):
+        """Test whether a missing file fails its Future only"""
+        missing = os.path.join(self.directory, "missing.png")
+        preload = overlays.preload([missing, self.paths[0]])
+        self.assertTrue(preload.wait(10))
+        self.assertIsInstance(preload[missing].exception(), FileNotFoundError)
+        self.assertEqual(preload.stats["errors"], 1)
+        self.assertEqual(overlays.preload([]).stats["duration"], 0.0)
+
+
+class TestImageFuture(TestCase):
+    """Test labels with the Future of an image"""
+
+    def setUp(self):
+        self.w = HeadlessOverlay((0, 0), (100, 100), "TestImageFuture")
+        self.addCleanup(self.w.destroy)
+
+    def test_attach(self):
+        """Test whether the row is shown first and its image once it is done"""
+        future = Future()
+        self.w.add_label(0, "Icon", image=future)
+        self.w.update()
+        self.assertIsNone(self.w._labels[0].image)
+        self.w._scheduler.tick()
+        self.assertFalse(self.w._scheduler.invalidated)
+        future.set_result("tests/image.png")
+        self.assertTrue(self.w._scheduler.invalidated)
+        self.w.update()
+        self.assertEqual(self.w._labels[0].image, "tests/image.png")
+        self.assertEqual(self.w._labels[0].text, "Icon")
+
+    def test_replaced(self):
+        """Test whether the image of a replaced or failed Future is not attached"""
+        replaced, failed = Future(), Future()
+        self.w.add_label(0, "Replaced", image=replaced)
+        self.w.add_label(0, "Text")
+        self.w.add_label(1, "Failed", image=failed)
+        replaced.set_result("tests/image.png")
+        failed.set_exception(OSError())
+        self.w.update()
+        self.assertEqual([label.image for label in self.w._labels.rows()], [None, None])
+        self.assertEqual(self.w._images, {})
+
+    def test_done(self):
+        """Test whether the image of a Future that is done is used directly"""
+        future = Future()
+        future.set_result("tests/image.png")
+        self.w.add_label(0, "Icon", image=future)
+        self.w.update()
+        self.assertEqual(self.w._labels[0].image, "tests/image.png")
@@ -0,0 +1,93 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the recording and replay of traces of Overlay calls.
+"""
+# Standard Library
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+# Packages
+from PIL import Image
+# Project Modules
+from overlays._headless import HeadlessOverlay
+from overlays._style import Style
+from overlays.bench import HeadlessBackend
+from overlays.replay import read, Recorder, replay
+
+
+class RecordingBackend(HeadlessBackend):
+    """HeadlessBackend that keeps the Overlays it created"""
+
+    def __init__(self):
+        self.overlays = list()
+
+    def create(self, position: tuple = (0, 0), size: tuple = (200, 800)):
+        self.overlays.append(HeadlessBackend.create(position, size))
+        return self.overlays[-1]
+
+
+class TestReplay(TestCase):
+    """Test whether a recorded session is replayed exactly"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.trace = os.path.join(self.directory, "session.trace")
+        self.icon = os.path.join(self.directory, "icon.png")
+        Image.new("RGBA", (8, 8), (0, 255, 0, 255)).save(self.icon)
+        self.style = Style((255, 0, 0), {"family": "default", "size": 12, "bold": True})
+
+        overlay = Recorder(HeadlessOverlay((10, 20), (120, 80), "Recorded"), self.trace)
+        overlay.add_label(0, "DPS: 0", style=self.style, ttl=60.0)
+        overlay.add_label(1, "Icon", image=self.icon, color=(0, 0, 255))
+        with overlay.batch():
+            overlay.update_label("0", text="DPS: 10")
+            overlay.post(2, "Posted")
+        with self.assertRaises(RuntimeError):
+            with overlay.batch():
+                overlay.remove_label("0")
+                raise RuntimeError()
+        with self.assertRaises(KeyError):
+            overlay.remove_label("5")
+        overlay.set_labels({0: "DPS: 20", 1: {"text": "Icon", "image": self.icon, "style": self.style}, 2: "Posted"})
+        overlay.update()
+        self.assertEqual(overlay.rectangle, (10, 20, 130, 100))
+        self.records = overlay.records
+        overlay.destroy()
+
+    def test_read(self):
+        """Test the header and the records of the trace"""
+        (position, size, name), records = read(self.trace)
+        self.assertEqual((position, size, name), ((10, 20), (120, 80), "HeadlessOverlay"))
+        self.assertEqual([method for _, method, _ in records], [
+            "add_label", "add_label", "batch", "update_label", "post", "commit",
+            "batch", "remove_label", "abort", "remove_label", "set_labels", "update", "destroy"])
+        self.assertEqual(len(records), self.records + 1)  # And the destroy
+        self.assertEqual([seconds for seconds, _, _ in records], sorted(seconds for seconds, _, _ in records))
+        self.assertEqual(records[0][2], (0, "DPS: 0", None, None, None, ((255, 0, 0), ("default", 12, True, False)), 60.0, None, None))
+
+    def test_replay(self):
+        """Test whether the replayed Overlay ends up with the recorded labels"""
+        backend = RecordingBackend()
+        results = replay(self.trace, backend)
+        labels = backend.overlays[0]._labels.rows()
+        self.assertEqual([label.text for label in labels], ["DPS: 20", "Icon", "Posted"])
+        self.assertIs(labels[1].style, self.style)
+        self.assertEqual(labels[1].image, self.icon)
+        self.assertEqual(results["errors_count"], 1)
+        self.assertEqual(results["missing_images_count"], 0)
+        self.assertGreater(results["calls_per_s"], 0)
+        self.assertIn("add_label_p95_s", results)
+        self.assertGreater(results["frame_max_s"], 0)
+
+    def test_missing(self):
+        """Test whether missing images are replaced in a real-time replay"""
+        os.remove(self.icon)
+        backend = RecordingBackend()
+        results = replay(self.trace, backend, realtime=True)
+        self.assertEqual(results["missing_images_count"], 2)
+        self.assertIsNotNone(backend.overlays[0]._labels[1].image)
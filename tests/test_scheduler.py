@@ -0,0 +1,84 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the pacing of frames by the FrameScheduler using a fake clock.
+"""
+# Standard Library
+from unittest import TestCase
+# Project Modules
+from overlays._scheduler import FrameScheduler
+from conftest import FakeClock
+
+
+class TestFrameScheduler(TestCase):
+    """Test the invalidation and frame rate limiting"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.drawn = list()
+        self.scheduler = FrameScheduler(
+            lambda: self.drawn.append(self.clock.time), 10, self.clock, self.clock.sleep)
+
+    def test_idle(self):
+        """Test whether no frame is drawn without invalidation"""
+        self.assertIsNone(self.scheduler.delay())
+        self.assertFalse(self.scheduler.tick())
+        self.assertFalse(self.scheduler.wait(0))
+        self.assertEqual(self.drawn, [])
+
+    def test_invalidate(self):
+        """Test whether multiple invalidations cause a single frame"""
+        self.scheduler.invalidate()
+        self.scheduler.invalidate()
+        self.assertEqual(self.scheduler.delay(), 0.0)
+        self.assertTrue(self.scheduler.tick())
+        self.assertFalse(self.scheduler.tick())
+        self.assertEqual(self.scheduler.frames, 1)
+
+    def test_rate(self):
+        """Test whether frames are limited to the frame rate"""
+        self.scheduler.invalidate()
+        self.scheduler.tick()
+        self.clock.sleep(0.04)
+        self.scheduler.invalidate()
+        self.assertAlmostEqual(self.scheduler.delay(), 0.06)
+        self.assertFalse(self.scheduler.tick())
+        self.assertTrue(self.scheduler.wait(1.0))
+        self.assertTrue(self.scheduler.tick())
+        self.assertEqual(len(self.drawn), 2)
+        self.assertAlmostEqual(self.drawn[1] - self.drawn[0], 0.1)
+
+    def test_wait_timeout(self):
+        """Test whether wait sleeps no longer than the timeout"""
+        self.scheduler.invalidate()
+        self.scheduler.tick()
+        self.scheduler.invalidate()
+        self.assertFalse(self.scheduler.wait(0.05))
+        self.assertAlmostEqual(self.clock.time, 100.05)
+        self.assertTrue(self.scheduler.wait(0.05))
+
+    def test_frames_per_second(self):
+        """Test the number of frames drawn under continuous invalidation"""
+        self.scheduler.fps = 20
+        for _ in range(20):
+            self.scheduler.invalidate()
+            self.scheduler.wait(1.0)
+            self.scheduler.tick()
+        self.assertEqual(self.scheduler.frames, 20)
+        self.assertAlmostEqual(self.clock.time, 100.95)
+
+    def test_deadline(self):
+        """Test whether a frame is drawn at a deadline without invalidation"""
+        self.scheduler.invalidate_at(100.5)
+        self.scheduler.invalidate_at(100.3)
+        self.assertAlmostEqual(self.scheduler.delay(), 0.3)
+        self.assertFalse(self.scheduler.tick())
+        self.scheduler.invalidate()
+        self.assertTrue(self.scheduler.tick())  # Invalidation before the deadline is not delayed
+        self.assertAlmostEqual(self.scheduler.delay(), 0.3)
+        self.clock.sleep(0.3)
+        self.assertTrue(self.scheduler.tick())
+        self.assertIsNone(self.scheduler.delay())
+        self.assertEqual(self.drawn, [100.0, 100.3])
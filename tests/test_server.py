@@ -0,0 +1,147 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the out-of-process OverlayServer and its ring buffers.
+"""
+# Standard Library
+from queue import Queue
+import tkinter as tk
+from unittest import TestCase
+# Project Modules
+from overlays import OverlayManager
+from overlays._overlay import Overlay
+from overlays.server import OverlayServer, RingBuffer
+
+
+class RecordingOverlay(Overlay):
+    """Overlay that draws nothing and reports its number of labels as rectangle"""
+
+    def _apply(self, changed: dict, removed: set):
+        pass
+
+    def destroy(self):
+        pass
+
+    @property
+    def rectangle(self) -> tuple:
+        return tuple(len(self._labels) for _ in range(4))
+
+
+class QueueLoop(object):
+    """Loop that executes callbacks from a Queue"""
+
+    def __init__(self, manager: OverlayManager):
+        self._callbacks = Queue()
+
+    def run(self, ready: callable):
+        ready()
+        for callback in iter(self._callbacks.get, None):
+            callback()
+
+    def wakeup(self, callback: callable):
+        self._callbacks.put(callback)
+
+    def create(self, position: tuple, size: tuple, name: str) -> Overlay:
+        return RecordingOverlay(position, size, name)
+
+    def quit(self):
+        self._callbacks.put(None)
+
+
+class QueueManager(OverlayManager):
+    LOOPS = {"queue": QueueLoop}
+
+
+class TestRingBuffer(TestCase):
+    """Test the messages written to and read from shared memory"""
+
+    def setUp(self):
+        self.ring = RingBuffer.create(64)
+        self.addCleanup(self.ring.close)
+
+    def test_messages(self):
+        """Test whether messages wrap around the end of the buffer"""
+        reader = RingBuffer.attach(self.ring.name)
+        self.addCleanup(reader.close)
+        for i in range(20):
+            messages = [bytes([i]) * 10, bytes([i]) * 13]
+            for message in messages:
+                self.assertTrue(self.ring.write(message))
+            self.assertEqual(reader.depth, 31)
+            self.assertEqual(reader.read(), messages)
+            self.assertEqual(self.ring.depth, 0)
+
+    def test_full(self):
+        """Test whether a message is refused when the buffer is full"""
+        self.assertTrue(self.ring.write(b"a" * 40))
+        self.assertFalse(self.ring.write(b"b" * 40))
+        self.assertEqual(self.ring.read(), [b"a" * 40])
+        self.assertTrue(self.ring.write(b"b" * 40))
+        with self.assertRaises(ValueError):
+            self.ring.write(b"c" * 64)
+
+
+class TestOverlayServer(TestCase):
+    """Test the Overlays hosted by a server process"""
+
+    def setUp(self):
+        self.server = OverlayServer("queue", QueueManager)
+        self.addCleanup(self.server.stop)
+        self.client = self.server.connect(capacity=256)
+
+    def test_labels(self):
+        """Test whether label changes reach the server in order"""
+        overlay = self.client.create((0, 0), (100, 100), "Remote")
+        for i in range(100):
+            overlay.add_label(i % 10, "Label {}".format(i))
+        with overlay.batch():
+            overlay.remove_label("0")
+            overlay.update_label("1", text="Changed")
+        overlay.update()
+        self.assertEqual(overlay.rectangle, (9, 9, 9, 9))
+        self.assertGreater(self.client.stalls, 0)
+        stats = self.client.stats()[1]
+        self.assertEqual(stats["messages"], 101)
+        self.assertEqual(stats["changes"], 102)
+        self.assertEqual(stats["queue_depth_bytes"], 0)
+        self.assertLessEqual(stats["max_queue_depth_bytes"], 256)
+        overlay.destroy()
+        with self.assertRaises(KeyError):
+            overlay.destroy()
+        self.client.close()
+
+    def test_clients(self):
+        """Test whether every client has its own counters"""
+        other = self.server.connect()
+        other.create((0, 0), (100, 100), "Other").add_label(0, "Label")
+        other.request("update", 1)
+        stats = self.client.stats()
+        self.assertEqual(sorted(stats), [1, 2])
+        self.assertEqual((stats[1]["messages"], stats[2]["messages"]), (0, 1))
+        self.assertEqual(stats[2]["overlays"], 1)
+        other.close()
+        self.assertEqual(sorted(self.client.stats()), [1])
+        self.client.close()
+
+
+class TestTkinterServer(TestCase):
+    """Test a server hosting TkinterOverlays"""
+
+    def setUp(self):
+        try:
+            tk.Tk().destroy()
+        except tk.TclError:
+            self.skipTest("No display available")
+        self.server = OverlayServer("tkinter")
+        self.addCleanup(self.server.stop)
+
+    def test_overlay(self):
+        """Test whether a TkinterOverlay is created and drawn in the server"""
+        client = self.server.connect()
+        overlay = client.create((0, 0), (100, 100), "Remote")
+        overlay.add_label(0, "Label")
+        overlay.update()
+        self.assertEqual(overlay.rectangle, (0, 0, 100, 100))
+        client.close()
@@ -0,0 +1,49 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Memory soak test of the Overlay backends. By default, only a short
+smoke run of the soak is made. Run the soak of the headless backend with
+OVERLAYS_SOAK=1, or a long soak of another backend with:
+
+    OVERLAYS_SOAK=1 OVERLAYS_SOAK_BACKEND=tkinter OVERLAYS_SOAK_CYCLES=1000000 \
+        xvfb-run python -m pytest tests/test_soak.py
+"""
+# Standard Library
+import os
+from unittest import TestCase
+# Project Modules
+from overlays.bench import BACKENDS, bench_soak
+
+
+class TestSoak(TestCase):
+    """Test whether memory stays bounded over add, update and remove cycles"""
+
+    ENABLED = os.environ.get("OVERLAYS_SOAK", "") not in ("", "0")
+    CYCLES = int(os.environ.get("OVERLAYS_SOAK_CYCLES", 300))
+    BACKEND = os.environ.get("OVERLAYS_SOAK_BACKEND", "headless")
+
+    def setUp(self):
+        try:
+            self.backend = BACKENDS[self.BACKEND]()
+        except Exception as error:  # No display available, or missing packages
+            self.skipTest("Backend {} not available: {}".format(self.BACKEND, error))
+        self.addCleanup(self.backend.close)
+
+    def test_smoke(self):
+        """Test whether the soak runs and reports its metrics, in a few cycles"""
+        results = bench_soak(self.backend, 10, warmup=5)
+        self.assertGreater(results["soak_cycle_s"], 0)
+        self.assertIn("soak_traced_growth_bytes", results)
+        self.assertIn("soak_objects_growth_count", results)
+
+    def test_soak(self):
+        """Test the growth of traced memory, objects and resident memory"""
+        if not self.ENABLED:
+            self.skipTest("Set OVERLAYS_SOAK=1 to run the soak")
+        results = bench_soak(self.backend, self.CYCLES, warmup=200)
+        self.assertLess(results["soak_traced_growth_bytes"], 64 * 1024)
+        self.assertLess(results["soak_objects_growth_count"], 100)
+        if "soak_rss_growth_bytes" in results:
+            self.assertLess(results["soak_rss_growth_bytes"], 8 * 1024 ** 2)
@@ -0,0 +1,58 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the rendering and caching of text sprites.
+"""
+# Standard Library
+from unittest import TestCase
+# Packages
+import numpy as np
+# Project Modules
+from overlays._sprites import SpriteCache, render_text
+
+
+class TestSpriteCache(TestCase):
+    """Test the reuse of the sprites of recurring text"""
+
+    def setUp(self):
+        self.renders = list()
+        self.cache = SpriteCache(budget=64 * 1024)
+
+    def render(self, *args):
+        self.renders.append(args)
+        return render_text(*args)
+
+    def test_render(self):
+        """Test the size and color of a rendered sprite"""
+        image = render_text("DPS:", ("default", 12, False, False, 1.0), (255, 0, 0))
+        self.assertEqual(image.mode, "RGBA")
+        self.assertGreater(image.width, 12)
+        self.assertEqual(render_text("A\nB", ("default", 12, False, False, 1.0), (0, 0, 0)).height, 2 * image.height)
+        pixels = np.array(image)
+        self.assertEqual({tuple(pixel) for pixel in pixels[pixels[..., 3] > 0][:, :3]}, {(255, 0, 0)})
+        self.assertEqual(render_text("", ("default", 12, False, False, 2.0), (0, 0, 0)).width, 1)
+
+    def test_reuse(self):
+        """Test whether a text is rendered once per font and color"""
+        sprite = self.cache.sprite("Healing:", ("Arial", 12), (0, 0, 0), render=self.render)
+        font = {"family": "Arial", "size": 12}
+        self.assertIs(self.cache.sprite("Healing:", font, [0, 0, 0], render=self.render), sprite)
+        self.cache.sprite("Healing:", ("Arial", 12), (255, 0, 0), render=self.render)
+        self.cache.sprite("Healing:", ("Arial", 12), (0, 0, 0), variant="other", render=self.render)
+        self.assertEqual(len(self.renders), 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+        self.assertEqual(self.renders[0], ("Healing:", ("Arial", 12, False, False, 1.0), (0, 0, 0)))
+
+    def test_normalized(self):
+        """Test whether equivalent Unicode strings share a sprite"""
+        sprite = self.cache.sprite("Café", ("Arial", 12), (0, 0, 0))
+        self.assertIs(self.cache.sprite("Café", ("Arial", 12), (0, 0, 0)), sprite)
+
+    def test_budget(self):
+        """Test whether the memory of the sprites is bounded"""
+        for i in range(200):
+            self.cache.sprite("Player {}".format(i), ("Arial", 12), (0, 0, 0))
+        self.assertLessEqual(self.cache.size, self.cache.budget)
+        self.assertGreater(self.cache.evictions, 0)
@@ -0,0 +1,70 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the runtime statistics of instrumented Overlays.
+"""
+# Standard Library
+from unittest import TestCase
+# Project Modules
+from overlays._overlay import Overlay
+from overlays._stats import Histogram
+
+
+class StatsOverlay(Overlay):
+    """Overlay without a window"""
+
+    def __init__(self):
+        Overlay.__init__(self, (0, 0), (100, 100), "StatsOverlay")
+
+    def _apply(self, changed: dict, removed: set):
+        pass
+
+
+class TestHistogram(TestCase):
+    def test_percentiles(self):
+        """Test the percentiles and the maximum of a Histogram"""
+        histogram = Histogram(size=100)
+        self.assertEqual(histogram.percentile(50), 0.0)
+        for value in range(1, 201):
+            histogram.add(value / 1000)
+        self.assertEqual(histogram.snapshot, {"count": 200, "p50": 0.151, "p95": 0.196, "max": 0.2})
+
+
+class TestStats(TestCase):
+    """Test the recording of statistics by an Overlay"""
+
+    def setUp(self):
+        self.w = StatsOverlay()
+        self.frames = list()
+
+    def draw(self):
+        self.w._scheduler.tick()
+        self.w._scheduler._last = None  # Ignore the frame rate
+
+    def test_disabled(self):
+        """Test whether nothing is recorded when disabled"""
+        self.w.add_label(0, "Label")
+        self.draw()
+        self.assertIsNone(self.w.stats)
+        self.assertIsNone(self.w._stats)
+
+    def test_stats(self):
+        """Test the counters, timings and hook of an instrumented Overlay"""
+        self.w.enable_stats(lambda overlay, frame: self.frames.append(frame))
+        with self.w.batch():
+            for row in range(3):
+                self.w.add_label(row, "Label")
+        self.draw()
+        self.w.update_label("0", text="Changed")
+        self.w.remove_label("1")
+        self.draw()
+        stats = self.w.stats
+        self.assertEqual(stats["frames"], 2)
+        self.assertEqual(stats["labels"], {"added": 3, "removed": 1, "updated": 1})
+        self.assertEqual(stats["frame_time"]["count"], 2)
+        self.assertIn("hit_rate", stats["image_cache"])
+        self.assertEqual([(f["frame"], f["rows"]) for f in self.frames], [(1, 3), (2, 2)])
+        self.w.disable_stats()
+        self.assertIsNone(self.w.stats)
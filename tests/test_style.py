@@ -0,0 +1,76 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the interned Style of labels.
+"""
+# Standard Library
+import pickle
+from unittest import TestCase
+# Project Modules
+from overlays._style import Style
+from overlays._headless import HeadlessOverlay
+
+
+class TestStyle(TestCase):
+    """Test the interning and the resolved forms of Styles"""
+
+    def test_interned(self):
+        """Test whether equal Styles are the same object"""
+        style = Style((255, 128, 0), ("Arial", 12))
+        self.assertIs(Style([255, 128, 0], {"family": "Arial", "size": 12}), style)
+        self.assertIs(Style((255, 128, 0), ("Arial", 12, False, False)), style)
+        self.assertIsNot(Style((255, 128, 0), ("Arial", 12, True)), style)
+        self.assertIs(pickle.loads(pickle.dumps(style)), style)
+        self.assertEqual(len({style, Style((255, 128, 0), ("Arial", 12))}), 1)
+
+    def test_forms(self):
+        """Test the color and font forms resolved by a Style"""
+        style = Style((255, 128, 0), {"family": "Arial", "size": 12, "italic": True})
+        self.assertEqual(style.font, ("Arial", 12, False, True))
+        self.assertEqual(style.hex, "#ff8000")
+        self.assertEqual(style.colorref, 0x0080ff)
+        self.assertEqual(style.rgba, (1.0, 128 / 255, 0.0, 1.0))
+        self.assertEqual(Style((0, 0, 255, 128), ("Arial", 12)).colorref, 0x80ff0000)
+
+    def test_immutable(self):
+        """Test whether the attributes of a Style cannot be changed"""
+        style = Style((0, 0, 0), ("Arial", 12))
+        with self.assertRaises(AttributeError):
+            style.color = (255, 255, 255)
+        with self.assertRaises(AttributeError):
+            del style.hex
+
+    def test_legacy(self):
+        """Test whether legacy forms are memoized and left unmodified"""
+        font = {"family": "Arial", "size": 12, "bold": True}
+        style = Style.of([0, 255, 0], font)
+        self.assertIs(Style.of([0, 255, 0], dict(font)), style)
+        self.assertEqual(font, {"family": "Arial", "size": 12, "bold": True})
+        self.assertIs(style.replace(color=(0, 0, 0)).replace(color=(0, 255, 0)), style)
+
+
+class TestStyleLabels(TestCase):
+    """Test labels created and updated with Styles"""
+
+    def setUp(self):
+        self.w = HeadlessOverlay((0, 0), (100, 100), "TestStyle")
+
+    def tearDown(self):
+        self.w.destroy()
+
+    def test_labels(self):
+        """Test whether Styles and legacy forms of labels are equivalent"""
+        style = Style((255, 0, 0), ("Arial", 12))
+        self.w.add_label(0, "Style", style=style)
+        self.w.add_label(1, "Legacy", color=(255, 0, 0), font=("Arial", 12))
+        self.assertIs(self.w._labels[1].style, style)
+        self.w.update()
+        self.w.update_label("0", font=("Arial", 14))
+        self.assertEqual(self.w._labels[0].font, ("Arial", 14, False, False))
+        self.assertEqual(self.w._labels[0].color, (255, 0, 0))
+        self.w.update_label("1", style=Style((0, 0, 255), ("Arial", 12)), color=(0, 255, 0))
+        self.assertEqual(self.w._labels[1].color, (0, 255, 0))
+        changed, _ = self.w._labels.diff()
+        self.assertEqual(changed[0].changed(self.w._labels[1]), {"text", "color", "font"})
@@ -0,0 +1,191 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the TimerWheel and the timed labels of Overlays, using a fake
+clock.
+"""
+# Standard Library
+import random
+from unittest import TestCase
+# Project Modules
+from overlays._headless import HeadlessOverlay
+from overlays._scheduler import FrameScheduler
+from overlays._style import Style
+from overlays._timers import TimerWheel
+from conftest import FakeClock
+
+
+class TestTimerWheel(TestCase):
+    """Test the scheduling, cancellation and expiry of timers"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_expire(self):
+        """Test whether timers expire in order once their deadline has passed"""
+        wheel = TimerWheel(clock=self.clock)
+        self.assertIsNone(wheel.next_deadline())
+        wheel.schedule(0.5, "b")
+        wheel.schedule(0.25, "a")
+        handle = wheel.schedule(0.3, "cancelled")
+        self.assertEqual(len(wheel), 3)
+        self.assertTrue(wheel.cancel(handle))
+        self.assertFalse(wheel.cancel(handle))
+        self.assertAlmostEqual(wheel.next_deadline(), 100.25)
+        self.clock.sleep(0.2)
+        self.assertEqual(wheel.advance(), [])
+        self.clock.sleep(0.4)
+        self.assertEqual(wheel.advance(), ["a", "b"])
+        self.assertEqual(len(wheel), 0)
+        self.assertIsNone(wheel.next_deadline())
+
+    def test_cascade(self):
+        """Test whether timers of the higher levels expire within a tick of their deadline"""
+        wheel = TimerWheel(0.01, 4, 3, self.clock)
+        random.seed(2018)
+        delays = [random.uniform(0, 5) for _ in range(200)]  # Up to 500 ticks, beyond the 64 of the levels
+        handles = [wheel.schedule(delay, i) for i, delay in enumerate(delays)]
+        for handle in handles[::4]:
+            wheel.cancel(handle)
+        start, expired, wakeups = self.clock.time, dict(), 0
+        while wheel.next_deadline() is not None:
+            self.clock.time = max(self.clock.time, wheel.next_deadline())
+            wakeups += 1
+            for i in wheel.advance():
+                expired[i] = self.clock.time - start
+        self.assertEqual(sorted(expired), [i for i in range(len(delays)) if i % 4 != 0])
+        for i, after in expired.items():
+            self.assertGreaterEqual(after, delays[i] - 1e-9)
+            self.assertLessEqual(after, delays[i] + 0.01 + 1e-9)
+        self.assertLess(wakeups, 2 * len(delays))
+
+    def test_idle(self):
+        """Test whether advancing an empty wheel over a long time is instant"""
+        wheel = TimerWheel(clock=self.clock)
+        self.clock.sleep(3600 * 24)
+        self.assertEqual(wheel.advance(), [])
+        wheel.schedule(0.01, "a")
+        self.clock.sleep(0.01)
+        self.assertEqual(wheel.advance(), ["a"])
+
+
+class TestTimedLabels(TestCase):
+    """Test the expiry, flashing and fading of labels of a HeadlessOverlay"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.overlay = HeadlessOverlay((0, 0), (200, 400), "TestTimedLabels")
+        self.addCleanup(self.overlay.destroy)
+        self.overlay._scheduler = FrameScheduler(self.overlay._draw_frame, 30, self.clock, self.clock.sleep)
+        self.overlay._timers = TimerWheel(clock=self.clock)
+        self.frames = list()
+        self.overlay.enable_stats(lambda _, frame: self.frames.append((self.clock.time, frame["rows"])))
+
+    def run_until(self, seconds: float):
+        """Draw the frames the FrameScheduler requires until the clock has advanced"""
+        end = self.clock.time + seconds
+        while True:
+            delay = self.overlay._scheduler.delay()
+            if delay is None or self.clock.time + delay > end:
+                self.clock.time = end
+                return
+            self.clock.sleep(delay)
+            self.overlay._scheduler.tick()
+
+    def test_ttl(self):
+        """Test whether labels that expire at the same time are removed in a single frame"""
+        for row in range(50):
+            self.overlay.add_label(row, "Buff {}".format(row), ttl=5.0)
+        self.overlay.add_label(50, "Permanent")
+        self.run_until(4.9)
+        self.assertEqual(len(self.overlay._labels), 51)
+        del self.frames[:]
+        self.run_until(0.2)
+        self.assertEqual(self.overlay._labels.rows()[0].row, 50)
+        self.assertEqual(len(self.overlay._labels), 1)
+        self.assertEqual([rows for _, rows in self.frames if rows > 0], [50])
+        self.assertEqual(len(self.overlay._timers), 0)
+        self.run_until(60.0)
+        self.assertIsNone(self.overlay._scheduler.delay())
+
+    def test_replace(self):
+        """Test whether replacing or removing a timed label cancels its timers"""
+        self.overlay.add_label(0, "Replaced", ttl=1.0)
+        self.overlay.add_label(0, "Permanent")
+        self.overlay.add_label(1, "Removed", ttl=1.0, flash=0.1)
+        self.overlay.remove_label("1")
+        self.overlay.add_label(2, "Posted", ttl=1.0)
+        self.overlay.post(2, "Posted")
+        with self.assertRaises(RuntimeError):
+            with self.overlay.batch():
+                self.overlay.add_label(3, "Discarded", ttl=1.0)
+                raise RuntimeError()
+        self.assertEqual(len(self.overlay._timers), 0)
+        self.run_until(2.0)
+        self.assertEqual([label.text for label in self.overlay._labels.rows()], ["Permanent", "Posted"])
+
+    def test_batch(self):
+        """Test whether the timers of a batch are only replaced when it is committed"""
+        self.overlay.add_label(0, "Timed", ttl=1.0)
+        with self.assertRaises(RuntimeError):
+            with self.overlay.batch():
+                self.overlay.add_label(0, "Discarded")
+                self.overlay.remove_label("0")
+                raise RuntimeError()
+        self.assertEqual(len(self.overlay._timers), 1)
+        with self.overlay.batch():
+            self.overlay.add_label(1, "Committed", ttl=1.0)
+            self.assertEqual(len(self.overlay._timers), 1)
+        self.assertEqual(len(self.overlay._timers), 2)
+        self.run_until(1.1)
+        self.assertEqual(len(self.overlay._labels), 0)
+
+    def test_idle(self):
+        """Test whether the first timed label after a long idle time does not replay the idle ticks"""
+        self.overlay.add_label(0, "Permanent")
+        self.run_until(3600 * 3)
+        self.overlay.add_label(1, "Buff", ttl=1.0)
+        self.assertGreater(self.overlay._timers.next_deadline(), self.clock.time)
+        del self.frames[:]
+        self.run_until(0.9)
+        self.assertIn(1, self.overlay._labels)
+        self.run_until(0.2)
+        self.assertNotIn(1, self.overlay._labels)
+        self.assertLessEqual(len(self.frames), 3)
+
+    def test_flash(self):
+        """Test whether a flashing label switches between its color and the flash color"""
+        style = Style((255, 0, 0), ("default", 12))
+        self.overlay.add_label(0, "Proc", style=style, ttl=1.2, flash=0.25)
+        self.run_until(0.3)
+        self.assertEqual(self.overlay._labels[0].color, HeadlessOverlay.FLASH_COLOR)
+        self.assertEqual(self.overlay._labels[0].font, style.font)
+        self.run_until(0.25)
+        self.assertIs(self.overlay._labels[0].style, style)
+        self.overlay.update_label("0", color=(0, 255, 0))
+        self.assertEqual(self.overlay._labels[0].color, (0, 255, 0))
+        self.run_until(0.25)
+        self.assertEqual(self.overlay._labels[0].color, HeadlessOverlay.FLASH_COLOR)
+        self.run_until(0.25)
+        self.assertEqual(self.overlay._labels[0].color, (0, 255, 0))
+        self.run_until(0.25)
+        self.assertNotIn(0, self.overlay._labels)
+
+    def test_fade(self):
+        """Test whether a label fades out in steps before it expires"""
+        self.overlay.add_label(0, "Cooldown", color=(0, 0, 255), ttl=2.0, fade=0.8)
+        self.run_until(1.25)
+        self.assertEqual(self.overlay._labels[0].color, (0, 0, 255))
+        alphas = list()
+        for _ in range(7):
+            self.run_until(0.1)
+            alphas.append(self.overlay._labels[0].color[3])
+        self.assertEqual(alphas, [round(255 * (8 - step) / 8) for step in range(1, 8)])
+        self.run_until(0.1)
+        self.assertNotIn(0, self.overlay._labels)
+        with self.assertRaises(ValueError):
+            self.overlay.add_label(0, "Fade without ttl", fade=1.0)
+        with self.assertRaises(ValueError):
+            self.overlay.add_label(0, "Fade longer than ttl", ttl=1.0, fade=2.0)
@@ -0,0 +1,137 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the canvas drawing mode of the TkinterOverlay.
+"""
+# Standard Library
+import os
+import time
+import tkinter as tk
+from unittest import TestCase
+# Project Modules
+from overlays._tkinter import TkinterOverlay
+
+
+class TestTkinterCanvas(TestCase):
+    """Test the rows drawn as canvas items"""
+
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("No display available")
+        self.w = TkinterOverlay((0, 0), (100, 100), "TestTkinterCanvas", master=self.root, mode="canvas")
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def top(self, row: int) -> float:
+        """Return the vertical position of the text item of a row"""
+        return self.w._canvas.coords(self.w._rows[row].text)[1]
+
+    def test_mode(self):
+        """Test whether an unknown mode is rejected"""
+        with self.assertRaises(ValueError):
+            TkinterOverlay((0, 0), (100, 100), "TestTkinterCanvas", master=self.root, mode="invalid")
+
+    def test_items(self):
+        """Test whether rows are items that are changed in place"""
+        for row in (2, 0, 1):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        self.assertEqual(self.w.winfo_children(), [self.w._canvas])
+        self.assertLess(self.top(0), self.top(1))
+        self.assertLess(self.top(1), self.top(2))
+        items = (self.w._rows[1].text, self.w._rows[1].widget)
+        self.w.update_label("1", text="Changed", color=(255, 0, 0))
+        self.w.update()
+        self.assertEqual(self.w._rows[1].owned, list(items))
+        self.assertEqual(self.w._canvas.itemcget(items[0], "text"), "Changed")
+        self.assertEqual(self.w._canvas.itemcget(items[0], "fill"), "#ff0000")
+
+    def test_move(self):
+        """Test whether the rows below a removed row move up"""
+        for row in range(3):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        first, second = self.top(0), self.top(1)
+        self.w.remove_label("0")
+        self.w.update()
+        self.assertEqual(self.top(1), first)
+        self.assertEqual(self.top(2), second)
+        self.assertEqual(len(self.w._canvas.find_all()), 6)  # The items of row 0 are pooled
+
+    def test_pool(self):
+        """Test whether the hidden items of a removed row are reused"""
+        self.w.add_label(0, "Removed", color=(255, 0, 0))
+        self.w.update()
+        items = self.w._rows[0].owned
+        self.w.remove_label("0")
+        self.w.update()
+        self.assertEqual(self.w._canvas.itemcget(items[0], "state"), "hidden")
+        self.w.add_label(3, "Added")
+        self.w.update()
+        self.assertEqual(self.w._rows[3].owned, items)
+        self.assertEqual(self.w._canvas.itemcget(items[0], "state"), "normal")
+        self.assertEqual(self.w._canvas.itemcget(items[0], "text"), "Added")
+        self.assertEqual(self.w._pool.stats["hits"], 1)
+
+
+class TestTkinterPool(TestCase):
+    """Test the reuse of the tk.Labels of removed rows"""
+
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("No display available")
+        self.w = TkinterOverlay((0, 0), (100, 100), "TestTkinterPool", master=self.root)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_pool(self):
+        """Test whether a removed tk.Label is reused and gridded at the new row"""
+        for row in range(2):
+            self.w.add_label(row, "Row {}".format(row))
+        self.w.update()
+        widget = self.w._rows[0].text
+        self.w.remove_label("0")
+        self.w.update()
+        self.assertEqual(widget.grid_info(), {})
+        self.w.add_label(2, "Row 2", color=(0, 255, 0))
+        self.w.update()
+        self.assertIs(self.w._rows[2].text, widget)
+        self.assertEqual(int(widget.grid_info()["row"]), 2)
+        self.assertEqual(widget.cget("text"), "Row 2")
+        self.assertEqual(widget.cget("foreground"), "#00ff00")
+        self.w._pool.capacity = 0
+        self.w.remove_label("2")
+        self.w.update()
+        self.assertFalse(widget.winfo_exists())
+
+
+class TestTkinterThread(TestCase):
+    """Test a TkinterOverlay that runs Tk in its own thread"""
+
+    def test_destroy(self):
+        """Test whether destroying from another thread tears down in the Tk thread"""
+        try:
+            tk.Tk().destroy()
+        except tk.TclError:
+            self.skipTest("No display available")
+        w = TkinterOverlay((0, 0), (100, 100), "TestTkinterThread")
+        for _ in range(500):
+            if w._ready or not w.is_alive():
+                break
+            time.sleep(0.01)
+        self.assertTrue(w._ready)
+        pipe = w._pipe
+        w.destroy()
+        self.assertFalse(w.is_alive())
+        self.assertIsNone(w._pipe)
+        for fd in pipe or ():
+            with self.assertRaises(OSError):
+                os.fstat(fd)
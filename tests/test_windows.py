@@ -0,0 +1,44 @@
+"""
+Author: RedFantom
+License: GNU GPLv3
+Copyright (c) 2018 RedFantom
+
+Tests for the native bitmaps of the WindowsOverlay.
+"""
+# Standard Library
+import ctypes
+from unittest import TestCase
+# Packages
+import numpy as np
+
+
+class TestWindowsBitmap(TestCase):
+    """Test the DIB sections built from BGRA pixel buffers"""
+
+    def setUp(self):
+        try:
+            from overlays._windows import WindowsOverlay, gui
+        except (ImportError, OSError, AttributeError):
+            self.skipTest("pywin32 is not available")
+        self.WindowsOverlay, self.gui = WindowsOverlay, gui
+
+    def test_build_bitmap(self):
+        """Test whether the bitmap holds the pixels top-down and is released"""
+        pixels = np.zeros((2, 3, 4), dtype=np.uint8)
+        pixels[0, 0] = (255, 0, 0, 255)  # Blue in the top left
+        pixels[1, 2] = (0, 0, 255, 255)  # Red in the bottom right
+        bitmap = self.WindowsOverlay._build_bitmap(pixels)
+        handle, w, h = bitmap
+        self.assertEqual((w, h), (3, 2))
+        info = self.gui.GetObject(handle)
+        self.assertEqual((info.bmWidth, abs(info.bmHeight), info.bmBitsPixel), (3, 2, 32))
+        self.assertEqual(ctypes.string_at(info.bmBits, pixels.nbytes), pixels.tobytes())
+        self.WindowsOverlay._release_bitmap(bitmap)
+
+    def test_text_sprite(self):
+        """Test whether sprites, which are not contiguous, are copied into the bitmap"""
+        pixels = np.arange(4 * 4 * 4, dtype=np.uint8).reshape((4, 4, 4))[:, 1:3]
+        bitmap = self.WindowsOverlay._build_bitmap(pixels)
+        info = self.gui.GetObject(bitmap[0])
+        self.assertEqual(ctypes.string_at(info.bmBits, pixels.nbytes), np.ascontiguousarray(pixels).tobytes())
+        self.WindowsOverlay._release_bitmap(bitmap)